@@ -0,0 +1,83 @@
+import json
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse as DjangoJsonResponse, StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+class JsonResponse(DjangoJsonResponse):
+    # JsonResponse that remembers how long encoding the payload took, so the
+    # profiling middleware can report serialization time separately from the view.
+
+    def __init__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        super().__init__(*args, **kwargs)
+        self.serialize_seconds = time.perf_counter() - t0
+
+def json_body(request):
+    # The request body parsed as JSON, cached on the request so middleware and the view
+    # share one parse. Invalid JSON raises on every call, as json.loads would.
+    try:
+        return request._json_body
+    except AttributeError:
+        request._json_body = json.loads(request.body.decode('utf-8'))
+        return request._json_body
+
+async def iterate_in_thread(iterator):
+    # Async view of a sync iterator whose steps run in the request's sync worker thread
+    # (where its database connection lives). Under ASGI Django would otherwise read a
+    # sync streaming body to the end before sending the first byte.
+    done = object()
+    step = sync_to_async(next)
+    while True:
+        chunk = await step(iterator, done)
+        if chunk is done:
+            break
+        yield chunk
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    # Streams {"ok": true, **head, "<key>": [items...], **tail()} while items is consumed,
+    # so a long list is never held in memory. tail is called after the last item (for
+    # values like a next-page cursor). The status is sent before the items are read, so
+    # an error part-way closes the document with "ok": false and an "error" message.
+    # serialize_seconds accumulates while the body is produced; the profiling middleware
+    # records it (and the queries run by items) once the body has been sent.
+
+    chunk_bytes = 64 * 1024
+    profile_body = True
+
+    def __init__(self, key, items, head=None, tail=None, encoder=DjangoJSONEncoder, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        self.serialize_seconds = 0.0
+        super().__init__(self._chunks(key, items, head or {}, tail, encoder), **kwargs)
+
+    async def __aiter__(self):
+        async for part in iterate_in_thread(iter(self.streaming_content)):
+            yield part
+
+    def _chunks(self, key, items, head, tail, encoder):
+        def dumps(value):
+            t0 = time.perf_counter()
+            try:
+                return json.dumps(value, cls=encoder)
+            finally:
+                self.serialize_seconds += time.perf_counter() - t0
+
+        buf = [dumps({'ok': True, **head})[:-1] + ', ' + dumps(key) + ': [']
+        size = 0
+        try:
+            for i, item in enumerate(items):
+                part = (', ' if i else '') + dumps(item)
+                buf.append(part)
+                size += len(part)
+                if size >= self.chunk_bytes:
+                    yield ''.join(buf).encode('utf-8')
+                    buf, size = [], 0
+            end = tail() if tail else {}
+            buf.append(']' + ''.join(f', {dumps(k)}: {dumps(v)}' for k, v in end.items()) + '}')
+        except Exception as e:
+            logger.exception('Streaming %s failed', key)
+            buf.append(f'], "ok": false, "error": {dumps(str(e))}}}')
+        yield ''.join(buf).encode('utf-8')
@@ -0,0 +1,64 @@
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+STATIC_RE = re.compile(r"""\{%\s*static\s+['"]([^'"]+)['"]\s*%\}""")
+INLINE_SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.S)
+
+
+def shipped_size(path):
+    # Bytes a browser downloads for a collected asset: the smallest of the hashed file and
+    # its pre-compressed copies (WhiteNoise picks .br/.gz by Accept-Encoding)
+    full = staticfiles_storage.path(staticfiles_storage.stored_name(path))
+    if not os.path.exists(full):
+        return None
+    return min(os.path.getsize(p) for p in (full, full + '.gz', full + '.br') if os.path.exists(p))
+
+
+class Command(BaseCommand):
+    help = 'Page weight per template: static assets as sources (before) vs. as collected and compressed (after).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('templates', nargs='*', help='Template paths relative to a template dir (default: all)')
+
+    def handle(self, *args, **opts):
+        if not os.path.isdir(settings.STATIC_ROOT):
+            raise CommandError('Run "manage.py collectstatic" first')
+        template_dirs = [str(d) for t in settings.TEMPLATES for d in t.get('DIRS', [])]
+        pages = []
+        for root in template_dirs:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.endswith('.html'):
+                        rel = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+                        if not opts['templates'] or rel in opts['templates']:
+                            pages.append((rel, os.path.join(dirpath, filename)))
+
+        self.stdout.write(f"{'template':<80}{'html':>9}{'inline js':>11}{'assets before':>15}{'assets after':>14}")
+        total_before = total_after = 0
+        for rel, full in sorted(pages):
+            with open(full, encoding='utf-8') as fh:
+                html = fh.read()
+            assets = sorted(set(STATIC_RE.findall(html)))
+            inline = sum(len(m.encode()) for m in INLINE_SCRIPT_RE.findall(html))
+            if not assets and not inline:
+                continue
+            before = after = 0
+            for asset in assets:
+                source = finders.find(asset)
+                if not source:
+                    continue
+                shipped = shipped_size(asset)
+                if shipped is None:
+                    raise CommandError(f'{asset} is not collected; run "manage.py collectstatic"')
+                before += os.path.getsize(source)
+                after += shipped
+            total_before += before
+            total_after += after
+            self.stdout.write(f'{rel:<80}{len(html.encode()):>9}{inline:>11}{before:>15}{after:>14}')
+        self.stdout.write(f"{'total':<80}{'':>9}{'':>11}{total_before:>15}{total_after:>14}")
+        self.stdout.write('Assets after collectstatic are cached as immutable, so repeat visits only fetch the html.')
@@ -0,0 +1,112 @@
+import logging
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+class ProfilingMiddleware:
+    # Counts SQL queries and DB time for every request, adds the JSON encoding time
+    # reported by core.http.JsonResponse, and records them with the total latency per
+    # endpoint (URL name). With PROFILING_HEADERS the numbers are also sent back as
+    # X-Query-Count / Server-Timing. Requests running more than PROFILING_QUERY_BUDGET
+    # queries are logged and counted. For responses that set profile_body (StreamingJsonResponse)
+    # the queries and time spent producing the body are counted as well and recorded once it
+    # has been sent; their headers, which go out first, only cover the view. Other streaming
+    # responses (event streams) are measured until the response object is returned.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        timings = {'queries': 0, 'db_seconds': 0.0}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self._wrap_connections(stack, timings)
+            response = self.get_response(request)
+        return self._finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return await self.get_response(request)
+        timings = {'queries': 0, 'db_seconds': 0.0}
+        started = time.perf_counter()
+        # Connections are thread-local and async views run their queries in the
+        # request's sync worker thread, so install the wrappers from that thread
+        stack = ExitStack()
+        await sync_to_async(self._wrap_connections)(stack, timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, timings, started)
+
+    def _wrap_connections(self, stack, timings):
+        def wrapper(execute, sql, params, many, context):
+            t0 = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timings['db_seconds'] += time.perf_counter() - t0
+                timings['queries'] += 1
+
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(wrapper))
+
+    def _profile_body(self, request, response, content, timings, started):
+        # Iterated by the server (or by StreamingJsonResponse.__aiter__ in the request's
+        # sync thread under ASGI), so the wrappers land on the connections the body uses
+        try:
+            with ExitStack() as stack:
+                self._wrap_connections(stack, timings)
+                yield from content
+        finally:
+            self._record(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, started):
+        latency = time.perf_counter() - started
+        if getattr(response, 'profile_body', False):
+            self._add_headers(response, timings, latency, False)
+            response.streaming_content = self._profile_body(request, response, response.streaming_content, timings, started)
+            return response
+        over_budget = self._record(request, response, timings, latency)
+        self._add_headers(response, timings, latency, over_budget)
+        return response
+
+    def _record(self, request, response, timings, latency):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.view_name if match else '') or 'unmatched'
+        serialize_seconds = getattr(response, 'serialize_seconds', 0.0)
+        budget = settings.PROFILING_QUERY_BUDGET
+        over_budget = bool(budget) and timings['queries'] > budget
+        if over_budget:
+            logger.warning('%s %s ran %d queries (budget %d)', request.method, endpoint, timings['queries'], budget)
+
+        profiling.record(
+            endpoint, request.method, response.status_code, timings['queries'],
+            timings['db_seconds'], serialize_seconds, latency, over_budget,
+        )
+        return over_budget
+
+    def _add_headers(self, response, timings, latency, over_budget):
+        if not settings.PROFILING_HEADERS:
+            return
+        serialize_seconds = getattr(response, 'serialize_seconds', 0.0)
+        response['X-Query-Count'] = str(timings['queries'])
+        response['Server-Timing'] = 'db;dur=%.1f, serialize;dur=%.1f, total;dur=%.1f' % (
+            timings['db_seconds'] * 1000, serialize_seconds * 1000, latency * 1000,
+        )
+        if over_budget:
+            response['X-Query-Budget-Exceeded'] = str(settings.PROFILING_QUERY_BUDGET)
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Keyset pagination for list endpoints, newest first over (<datetime field>, id).
+# A cursor is "<iso datetime>|<id>" of the last row served and the next page starts
+# strictly after it, so pages stay stable while rows are added and no OFFSET scan is
+# needed. Rows are read with .iterator() in STREAMING_CHUNK_SIZE batches.
+
+def decode_cursor(raw):
+    raw = (raw or '').strip()
+    if not raw or '|' not in raw:
+        return None
+    ts_raw, _, id_raw = raw.rpartition('|')
+    ts = parse_datetime(ts_raw)
+    try:
+        pk = int(id_raw)
+    except ValueError:
+        return None
+    if ts is None:
+        return None
+    return ts, pk
+
+def encode_cursor(obj, field):
+    if obj is None:
+        return ''
+    return f'{getattr(obj, field).isoformat()}|{obj.pk}'
+
+def parse_limit(raw, maximum=None):
+    # 0 means "no limit"; raises ValueError for junk so views can answer 400
+    limit = int(raw or 0)
+    if limit < 0:
+        raise ValueError('limit must be >= 0')
+    return min(limit, maximum or settings.PAGINATION_MAX_LIMIT)
+
+class KeysetPage:
+    def __init__(self, qs, field, after=None, limit=0):
+        qs = qs.order_by(f'-{field}', '-pk')
+        if after:
+            ts, pk = after
+            qs = qs.filter(Q(**{f'{field}__lt': ts}) | Q(**{field: ts, 'pk__lt': pk}))
+        self.qs = qs[:limit + 1] if limit else qs
+        self.field = field
+        self.limit = limit
+        self.first = None
+        self.last = None
+        self.has_more = False
+
+    def __iter__(self):
+        for i, obj in enumerate(self.qs.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE)):
+            if self.limit and i == self.limit:
+                self.has_more = True
+                break
+            if self.first is None:
+                self.first = obj
+            self.last = obj
+            yield obj
+
+    @property
+    def next_cursor(self):
+        # Only meaningful once iteration has finished
+        return encode_cursor(self.last, self.field) if self.has_more else ''
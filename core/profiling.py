@@ -0,0 +1,87 @@
+import threading
+
+# In-process request statistics per endpoint (URL name), fed by ProfilingMiddleware and
+# rendered in the Prometheus text format by core.views.metrics. Each worker process keeps
+# its own counters, so scrape every worker (or sum them) when running several.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_stats = {}
+
+def _new_entry():
+    return {
+        'requests': 0,
+        'errors': 0,
+        'queries': 0,
+        'queries_max': 0,
+        'db_seconds': 0.0,
+        'serialize_seconds': 0.0,
+        'latency_seconds': 0.0,
+        'latency_buckets': [0] * len(LATENCY_BUCKETS),
+        'over_budget': 0,
+    }
+
+def record(endpoint, method, status, queries, db_seconds, serialize_seconds, latency_seconds, over_budget):
+    with _lock:
+        entry = _stats.get((endpoint, method))
+        if entry is None:
+            entry = _stats[(endpoint, method)] = _new_entry()
+        entry['requests'] += 1
+        if status >= 500:
+            entry['errors'] += 1
+        entry['queries'] += queries
+        entry['queries_max'] = max(entry['queries_max'], queries)
+        entry['db_seconds'] += db_seconds
+        entry['serialize_seconds'] += serialize_seconds
+        entry['latency_seconds'] += latency_seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency_seconds <= bound:
+                entry['latency_buckets'][i] += 1
+                break
+        if over_budget:
+            entry['over_budget'] += 1
+
+def snapshot():
+    with _lock:
+        return {key: {**entry, 'latency_buckets': list(entry['latency_buckets'])} for key, entry in _stats.items()}
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def _labels(endpoint, method, **extra):
+    pairs = [('endpoint', endpoint), ('method', method), *extra.items()]
+    return '{' + ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs) + '}'
+
+_COUNTERS = (
+    ('requests', 'http_requests_total', 'counter', 'Requests handled'),
+    ('errors', 'http_request_errors_total', 'counter', 'Requests answered with a 5xx status'),
+    ('queries', 'db_queries_total', 'counter', 'SQL queries executed'),
+    ('queries_max', 'db_queries_per_request_max', 'gauge', 'Most SQL queries seen in a single request'),
+    ('db_seconds', 'db_query_seconds_total', 'counter', 'Time spent executing SQL'),
+    ('serialize_seconds', 'json_serialize_seconds_total', 'counter', 'Time spent encoding JSON responses'),
+    ('over_budget', 'query_budget_exceeded_total', 'counter', 'Requests that ran more queries than PROFILING_QUERY_BUDGET'),
+)
+
+def render_prometheus(prefix='betterta_'):
+    stats = sorted(snapshot().items())
+    lines = []
+    for field, name, kind, help_text in _COUNTERS:
+        lines.append(f'# HELP {prefix}{name} {help_text}')
+        lines.append(f'# TYPE {prefix}{name} {kind}')
+        for (endpoint, method), entry in stats:
+            lines.append(f'{prefix}{name}{_labels(endpoint, method)} {entry[field]}')
+
+    name = f'{prefix}http_request_duration_seconds'
+    lines.append(f'# HELP {name} Total request latency as seen by the middleware')
+    lines.append(f'# TYPE {name} histogram')
+    for (endpoint, method), entry in stats:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, entry['latency_buckets']):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(endpoint, method, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(endpoint, method, le="+Inf")} {entry["requests"]}')
+        lines.append(f'{name}_sum{_labels(endpoint, method)} {entry["latency_seconds"]}')
+        lines.append(f'{name}_count{_labels(endpoint, method)} {entry["requests"]}')
+    return '\n'.join(lines) + '\n'
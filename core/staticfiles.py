@@ -0,0 +1,62 @@
+import logging
+
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import rjsmin
+except ImportError:  # optional; files are shipped unminified (still hashed and compressed)
+    rjsmin = None
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+# Static files storage used by collectstatic.
+# Collected JS/CSS are minified in STATIC_ROOT first; WhiteNoise's manifest storage then
+# names every file by content hash (so a changed file gets a new URL), writes .gz/.br
+# copies next to it, and serves hashed names with far-future immutable Cache-Control.
+# Templates reference assets through {% static %}, which resolves the hashed name.
+
+
+def minify(path, source):
+    # Minified text for a .js/.css file, or None when it should be left alone
+    if path.endswith(('.min.js', '.min.css')):
+        return None
+    if path.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(source)
+    if path.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin(source)
+    return None
+
+
+class MinifiedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for path in list(paths):
+                if not path.endswith(('.js', '.css')):
+                    continue
+                full = self.path(path)
+                try:
+                    with open(full, encoding='utf-8') as fh:
+                        source = fh.read()
+                except UnicodeDecodeError:
+                    continue
+                minified = minify(path, source)
+                if minified is not None and len(minified) < len(source):
+                    with open(full, 'w', encoding='utf-8') as fh:
+                        fh.write(minified)
+                # Hashing reads from the given storage; point it at the copy in STATIC_ROOT,
+                # which is already minified when collectstatic skipped an unchanged file
+                paths[path] = (self, path)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.manifest_strict:
+                raise
+            return name  # not collected yet (tests, a fresh checkout): the unhashed name
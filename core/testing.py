@@ -0,0 +1,59 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from students_dash.models import Student
+from teachers_dash.models import Teacher, Course, Exercise, ExerciseQuestion
+from teachers_assistants_dash.models import TeachingAssistant, CourseAssistant, TAExerciseSession
+from teachers_assistants_dash.structure import compile_structure, from_counts
+
+# Shared fixtures for the app test suites: a teacher (Supabase id "sb-ada"), an
+# assistant (code "TA-1") and helpers for courses, exercises, students and sessions.
+# The cache is cleared per test because identity lookups and snapshots live there.
+
+
+class FixtureTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.teacher = Teacher.objects.create(
+            first_name='Ada', last_name='Lovelace', title='Ms', special_code='T-1', email='ada@example.com'
+        )
+        self.teacher.user_id = 'sb-ada'
+        self.teacher.save()
+        self.assistant = TeachingAssistant.objects.create(name='Tim', special_code='TA-1')
+
+    def make_course(self, title='Algebra', exercises=0, questions=3, assign=False):
+        course = Course.objects.create(teacher=self.teacher, title=title, description='d')
+        if assign:
+            CourseAssistant.objects.create(course=course, assistant=self.assistant)
+        for i in range(exercises):
+            self.make_exercise(course, f'{title} Ex {i}', questions if isinstance(questions, int) else questions(i))
+        return course
+
+    def make_exercise(self, course, title, questions=0):
+        ex = Exercise.objects.create(course=course, title=title)
+        for q in range(questions):
+            ExerciseQuestion.objects.create(exercise=ex, question_text=f'Q{q}', points=1, order=q + 1)
+        return ex
+
+    def make_student(self, student_id, name=None, course=None):
+        student = Student.objects.create(name=name or student_id, email=f'{student_id.lower()}@example.com', student_id=student_id)
+        if course is not None:
+            course.students.add(student)
+        return student
+
+    def make_session(self, course, exercise=None, slug=None, questions=0, subparts=None, **fields):
+        # questions/subparts compile a from_counts() structure into the session's path index
+        slug = slug or f'sess-{TAExerciseSession.objects.count()}'
+        if questions:
+            struct, index, next_id = compile_structure(from_counts(questions, subparts))
+            fields.update(structure_json=struct, path_index=index, next_path_id=next_id, checkable_count=len(index))
+        return TAExerciseSession.objects.create(slug=slug, assistant=self.assistant, course=course, exercise=exercise, **fields)
+
+    def post_json(self, name, payload=None, status=200, **extra):
+        resp = self.client.post(reverse(name), json.dumps(payload or {}), content_type='application/json', **extra)
+        self.assertEqual(resp.status_code, status, getattr(resp, 'content', b'')[:300])
+        return resp
@@ -1,3 +1,55 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+
+class MinifiedStaticFilesTests(SimpleTestCase):
+    SOURCE = 'function add(first, second) {\n    // sum\n    return first + second;\n}\n'
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        with open(os.path.join(self.source, 'app.js'), 'w', encoding='utf-8') as fh:
+            fh.write(self.SOURCE)
+        override = override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _collect(self):
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=io.StringIO())
+        with open(os.path.join(self.root, staticfiles_storage.stored_name('app.js')), encoding='utf-8') as fh:
+            return fh.read()
+
+    def test_hashed_copy_is_minified_on_every_run(self):
+        first = self._collect()
+        self.assertLess(len(first), len(self.SOURCE))
+        # The second run skips the unchanged file; its STATIC_ROOT copy is already minified
+        self.assertEqual(self._collect(), first)
+
+
+class MetricsEndpointTests(TestCase):
+    def test_not_served_without_a_token(self):
+        with override_settings(PROFILING_METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics/').status_code, 404)
+
+    @override_settings(PROFILING_METRICS_TOKEN='s3cret')
+    def test_requires_the_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 401)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer nope').status_code, 401)
+        resp = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('http_requests_total', resp.content.decode())
+
+    def test_profiling_headers_are_off_by_default(self):
+        resp = self.client.get('/metrics/')
+        self.assertNotIn('X-Query-Count', resp)
@@ -1,3 +1,14 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from . import profiling
 
-# Create your views here.
+def metrics(request):
+    # Prometheus scrape endpoint, only served once PROFILING_METRICS_TOKEN is configured;
+    # send "Authorization: Bearer <PROFILING_METRICS_TOKEN>"
+    token = settings.PROFILING_METRICS_TOKEN
+    if not token:
+        raise Http404
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(profiling.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
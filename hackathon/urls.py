@@ -2,7 +2,6 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
 from django.conf import settings
-from django.conf.urls.static import static
 from teachers_dash.views import dashboard as teachers_dashboard
 from teachers_assistants_dash.views import (
     validate_ta_code,
@@ -10,14 +9,17 @@ from teachers_assistants_dash.views import (
     resend_ta_confirmation,
     confirm_ta_signup,
 )
+from core.views import metrics
 from students_dash.views import (
     dashboard as students_dashboard,
     students_login_page,
     students_login_api,
+    serve_evidence,
 )
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
 
     path(
         '',
@@ -130,8 +132,7 @@ urlpatterns = [
 
     path('dashboard/assistants/', include('teachers_assistants_dash.urls')),
 
-]
+    # Uploaded evidence, in every environment, behind signed URLs (students_dash.serving)
+    path(settings.MEDIA_URL.strip('/') + '/<path:name>', serve_evidence, name='evidence_file'),
 
-# Serve uploaded media in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]
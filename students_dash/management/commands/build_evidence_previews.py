@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from students_dash import previews
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+
+
+class Command(BaseCommand):
+    help = 'Build evidence previews/thumbnails for submissions that have none (e.g. uploads from before previews existed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild previews that already exist as well')
+
+    def handle(self, *args, **opts):
+        if previews.Image is None:
+            raise CommandError('Evidence previews require Pillow (pip install Pillow)')
+        subs = TAExerciseSessionSubmission.objects.exclude(evidence_file='').exclude(evidence_file__isnull=True)
+        if not opts['all']:
+            subs = subs.filter(Q(evidence_thumbnail__isnull=True) | Q(evidence_thumbnail=''))
+        built = skipped = 0
+        for sub_id in subs.order_by('id').values_list('id', flat=True).iterator():
+            if previews.process(sub_id):
+                built += 1
+            else:
+                skipped += 1
+        self.stdout.write(f'Built previews for {built} submissions ({skipped} skipped: not images)')
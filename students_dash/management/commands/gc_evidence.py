@@ -0,0 +1,86 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from students_dash import uploads
+from students_dash.storage import evidence_storage
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+
+FIELDS = ('evidence_file', 'evidence_preview', 'evidence_thumbnail')
+
+
+def referenced_names():
+    # Every evidence name still pointed at by a submission (blobs are shared between rows)
+    names = set()
+    rows = TAExerciseSessionSubmission.objects.filter(
+        Q(evidence_file__gt='') | Q(evidence_preview__gt='') | Q(evidence_thumbnail__gt='')
+    ).values_list(*FIELDS)
+    for row in rows.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE):
+        names.update(n for n in row if n)
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Delete evidence files no submission references any more (replaced uploads, stale previews).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=settings.EVIDENCE_GC_GRACE_HOURS,
+                            help='Keep unreferenced files younger than this (uploads still being attached)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **opts):
+        storage = evidence_storage()
+        root = storage.path('evidence')
+        if not opts['dry_run']:
+            uploads.expire_stale()  # abandoned resumable uploads as well
+        if not os.path.isdir(root):
+            self.stdout.write('No evidence directory; nothing to do')
+            return
+
+        # Files are listed before references are read, so a blob written in between is
+        # younger than the grace period. An existing blob can still be re-used by an upload
+        # after it was listed (the storage touches it before the submission row points at
+        # it), so each file is stat'ed again right before removal and kept when its mtime
+        # has moved past the cutoff. Only a re-use landing between that stat and the
+        # remove itself is not caught.
+        cutoff = time.time() - opts['grace_hours'] * 3600
+        candidates = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if st.st_mtime < cutoff:
+                    name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                    candidates.append((name, path, st.st_size))
+        referenced = referenced_names()
+
+        removed = freed = 0
+        for name, path, size in candidates:
+            if name in referenced:
+                continue
+            if opts['dry_run']:
+                self.stdout.write(f'would delete {name}')
+            else:
+                try:
+                    if os.stat(path).st_mtime >= cutoff:
+                        continue  # re-used since it was listed
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            removed += 1
+            freed += size
+        if not opts['dry_run']:
+            for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+                if dirpath != root and not dirnames and not filenames:
+                    try:
+                        os.rmdir(dirpath)
+                    except OSError:
+                        pass
+        verb = 'Would delete' if opts['dry_run'] else 'Deleted'
+        self.stdout.write(f'{verb} {removed} unreferenced files ({freed} bytes); {len(referenced)} referenced')
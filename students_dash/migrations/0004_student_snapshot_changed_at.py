@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students_dash', '0003_evidenceupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='snapshot_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 
@@ -7,6 +8,8 @@ class Student(models.Model):
     student_id = models.CharField(max_length=50, unique=True)
     password_hash = models.CharField(max_length=128)  # Django hasher length
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    snapshot_changed_at = models.DateTimeField(null=True, blank=True)  # part of the dashboard snapshot key (snapshot.py)
 
     def set_password(self, raw_password: str):
         self.password_hash = make_password(raw_password)
@@ -27,4 +30,25 @@ class StudentExerciseGroupSelection(models.Model):
         unique_together = ('student', 'exercise')
 
     def __str__(self):
-        return f'{self.student.student_id} → {self.exercise.title} @ {self.group_time.scheduled_at}'
\ No newline at end of file
+        return f'{self.student.student_id} → {self.exercise.title} @ {self.group_time.scheduled_at}'
+class EvidenceUpload(models.Model):
+    # A resumable evidence upload in progress (see students_dash.uploads). Chunks are
+    # appended to a part file on disk; "received" is the next byte offset expected.
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+    ]
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    student = models.ForeignKey('students_dash.Student', on_delete=models.CASCADE, related_name='evidence_uploads')
+    submission = models.ForeignKey('teachers_assistants_dash.TAExerciseSessionSubmission', on_delete=models.CASCADE, related_name='evidence_uploads')
+    filename = models.CharField(max_length=200)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)  # expected digest of the whole file, if the client sent one
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size}) — {self.student.student_id}'
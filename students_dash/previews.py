@@ -0,0 +1,103 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from teachers_assistants_dash import feed
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:  # Pillow missing: evidence is served without previews
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Evidence previews.
+# After evidence is attached, a background worker writes a downscaled preview
+# (EVIDENCE_PREVIEW_SIZE) and a thumbnail (EVIDENCE_THUMBNAIL_SIZE) through the evidence
+# storage, as WebP (JPEG where Pillow lacks WebP), and stores their names on the submission.
+# Review pages then load the small files and only open the original on demand. Files
+# that are not images are left without previews.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='evidence-previews')
+        return _executor
+
+
+def schedule(submission_id):
+    # Process after the surrounding transaction commits, off the request thread
+    if Image is None or not settings.EVIDENCE_PREVIEWS:
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, submission_id))
+
+
+def _run(submission_id):
+    close_old_connections()  # worker threads never see request_finished
+    try:
+        process(submission_id)
+    except Exception:
+        logger.exception('Could not build evidence previews for submission %s', submission_id)
+    finally:
+        close_old_connections()
+
+
+def _encode(img, size, fmt):
+    copy = img.copy()
+    copy.thumbnail((size, size), Image.LANCZOS)
+    out = io.BytesIO()
+    if fmt == 'WEBP':
+        copy.save(out, 'WEBP', quality=settings.EVIDENCE_PREVIEW_QUALITY, method=4)
+    else:
+        copy.save(out, 'JPEG', quality=settings.EVIDENCE_PREVIEW_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def process(submission_id):
+    # Build previews for one submission's current evidence file. Returns True when written.
+    if Image is None:
+        return False
+    sub = TAExerciseSessionSubmission.objects.filter(pk=submission_id).only('id', 'session_id', 'evidence_file').first()
+    if not sub or not sub.evidence_file:
+        return False
+    original = sub.evidence_file.name
+    storage = sub.evidence_file.storage
+    preview_size = settings.EVIDENCE_PREVIEW_SIZE
+    try:
+        with storage.open(original, 'rb') as fh:
+            img = Image.open(fh)
+            img.draft('RGB', (preview_size, preview_size))  # lets JPEG decode at reduced scale
+            img = ImageOps.exif_transpose(img)
+            img = img.convert('RGB')
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.info('Evidence %s is not a usable image (%s); no previews', original, e)
+        return False
+
+    fmt = 'WEBP' if features.check('webp') else 'JPEG'
+    ext = '.webp' if fmt == 'WEBP' else '.jpg'
+    stem = os.path.splitext(original)[0]
+    preview_name = storage.save(f'{stem}.preview{ext}', ContentFile(_encode(img, preview_size, fmt)))
+    thumb_name = storage.save(f'{stem}.thumb{ext}', ContentFile(_encode(img, settings.EVIDENCE_THUMBNAIL_SIZE, fmt)))
+
+    # Only attach them if the evidence was not replaced meanwhile; bump updated_at so
+    # live TA feeds pick up the new URLs
+    updated = TAExerciseSessionSubmission.objects.filter(pk=sub.pk, evidence_file=original).update(
+        evidence_preview=preview_name, evidence_thumbnail=thumb_name, updated_at=timezone.now(),
+    )
+    if not updated:
+        return False  # the unreferenced copies are left to gc_evidence, like replaced blobs
+    feed.bump(sub.session_id)
+    return True
@@ -0,0 +1,170 @@
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.signing import Signer
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+
+# Evidence downloads.
+# Evidence URLs carry a signature over (name, expiry): the API that hands a URL out
+# has already authorised its caller (student session, TA code, teacher id), and an
+# <img>/<a> request cannot repeat those POST credentials. Expiry is rounded up to a
+# whole EVIDENCE_URL_MAX_AGE window, so a URL stays byte-identical (and browser-cacheable)
+# for at least one window and at most two.
+# Files are sent either by the front proxy (EVIDENCE_SENDFILE_HEADER = X-Accel-Redirect
+# for nginx, X-Sendfile for Apache/lighttpd), or by the app: a FileResponse under WSGI
+# (gunicorn's sync workers use sendfile for whole files), and under ASGI an async
+# iterator that reads one block at a time off the event loop, since Django would read
+# a sync iterator to the end into memory before sending anything. Setting the sendfile
+# header keeps large files off the app workers in either mode. Single byte ranges,
+# ETag/Last-Modified revalidation and private, immutable caching (content-addressed
+# blobs never change) are handled here.
+
+_signer = Signer(salt='students_dash.evidence')
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _signature(name, expires):
+    return _signer.signature(f'{name}:{expires}')
+
+
+def signed_url(name):
+    window = settings.EVIDENCE_URL_MAX_AGE
+    expires = (int(time.time()) // window + 2) * window
+    query = urlencode({'e': expires, 's': _signature(name, expires)})
+    return f"{reverse('evidence_file', args=[name])}?{query}"
+
+
+def verify(name, expires, signature):
+    # Returns the expiry timestamp when the signature is valid and current, else None
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return None
+    if expires < time.time() or not constant_time_compare(signature or '', _signature(name, expires)):
+        return None
+    return expires
+
+
+def _etag(name, st):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if name.startswith('evidence/blobs/'):
+        return f'"{stem}"'  # the content hash
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _parse_range(header, size):
+    # A single "bytes=a-b" / "bytes=a-" / "bytes=-n" range -> (start, end) inclusive.
+    # None means serve the whole file (no or unsupported header); False means unsatisfiable.
+    m = _RANGE_RE.match(header.strip()) if header else None
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        start, end = max(size - int(m.group(2)), 0), size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class _FileSlice:
+    # File-like view of [start, start + length) for FileResponse
+    def __init__(self, fh, start, length):
+        self.fh = fh
+        self.remaining = length
+        fh.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+class _AsyncFileSlice(_FileSlice):
+    # Async iterable over the same slice for ASGI; close() is registered by the response
+    block_size = FileResponse.block_size
+
+    async def __aiter__(self):
+        read = sync_to_async(self.read, thread_sensitive=False)
+        while chunk := await read(self.block_size):
+            yield chunk
+
+
+def serve(request, storage, name, expires):
+    path = storage.path(name)
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    etag = _etag(name, st)
+    max_age = max(0, min(expires - int(time.time()), 365 * 24 * 3600))
+    cache_control = f'private, max-age={max_age}'
+    if name.startswith('evidence/blobs/'):
+        cache_control += ', immutable'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(st.st_mtime)
+        response['Cache-Control'] = cache_control
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if not_modified is not None:
+        return finish(not_modified)
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    filename = os.path.basename(name)
+    # Anything a browser could run as a page (HTML, SVG, ...) is only offered as a download
+    inline = content_type == 'application/pdf' or (content_type.startswith('image/') and content_type != 'image/svg+xml')
+    disposition = f'{"inline" if inline else "attachment"}; filename="{filename}"'
+    if settings.EVIDENCE_SENDFILE_HEADER:
+        # The proxy reads the file itself and handles Range; only headers go back through it
+        response = HttpResponse(content_type=content_type)
+        if settings.EVIDENCE_SENDFILE_HEADER.lower() == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.EVIDENCE_SENDFILE_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response[settings.EVIDENCE_SENDFILE_HEADER] = path
+        response['Content-Disposition'] = disposition
+        return finish(response)
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range == etag:
+        byte_range = _parse_range(request.headers.get('Range'), st.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{st.st_size}'
+        return finish(response)
+
+    start, end = byte_range or (0, st.st_size - 1)
+    length = end - start + 1
+    status = 200 if byte_range is None else 206
+    fh = open(path, 'rb')
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_AsyncFileSlice(fh, start, length), status=status, content_type=content_type)
+    elif byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        response = FileResponse(_FileSlice(fh, start, length), status=status, content_type=content_type)
+    response['Content-Length'] = str(length)
+    if byte_range is not None:
+        response['Content-Range'] = f'bytes {start}-{end}/{st.st_size}'
+    response['Content-Disposition'] = disposition
+    return finish(response)
@@ -0,0 +1,56 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from teachers_dash.models import Course, Exercise, ExerciseQuestion, ExerciseGroupTime
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+from .models import Student, StudentExerciseGroupSelection
+from . import snapshot
+
+# Move students to a new dashboard snapshot (see students_dash.snapshot) when its inputs change.
+
+def _course_student_ids(course_ids):
+    return Student.objects.filter(courses__in=course_ids).values_list('student_id', flat=True).distinct()
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'snapshot_changed_at', 'password_hash', 'updated_at'}:
+        return  # nothing the snapshot shows
+    snapshot.invalidate([instance.student_id])
+
+@receiver(post_save, sender=StudentExerciseGroupSelection)
+@receiver(post_delete, sender=StudentExerciseGroupSelection)
+def selection_changed(sender, instance, **kwargs):
+    snapshot.invalidate([instance.student.student_id])
+
+@receiver(post_save, sender=TAExerciseSessionSubmission)
+@receiver(post_delete, sender=TAExerciseSessionSubmission)
+def submission_changed(sender, instance, **kwargs):
+    snapshot.invalidate([instance.student_id])
+
+@receiver(post_save, sender=Course)
+@receiver(pre_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    snapshot.invalidate(_course_student_ids([instance.pk]))
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def exercise_changed(sender, instance, **kwargs):
+    snapshot.invalidate(_course_student_ids([instance.course_id]))
+
+@receiver(post_save, sender=ExerciseQuestion)
+@receiver(post_delete, sender=ExerciseQuestion)
+@receiver(post_save, sender=ExerciseGroupTime)
+@receiver(post_delete, sender=ExerciseGroupTime)
+def exercise_part_changed(sender, instance, **kwargs):
+    snapshot.invalidate(Student.objects.filter(courses__exercises=instance.exercise_id).values_list('student_id', flat=True))
+
+@receiver(m2m_changed, sender=Course.students.through)
+def enrollment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # student.courses.add(...) / remove / clear
+        snapshot.invalidate([instance.student_id])
+    elif action == 'pre_clear':
+        snapshot.invalidate(_course_student_ids([instance.pk]))
+    else:
+        snapshot.invalidate(Student.objects.filter(pk__in=pk_set or []).values_list('student_id', flat=True))
@@ -0,0 +1,208 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from teachers_dash.models import Course, Exercise, ExerciseGroupTime, ExerciseQuestion
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+from .models import Student, StudentExerciseGroupSelection
+
+# Per-student dashboard snapshot.
+# api_dashboard_summary and api_exercises_full are both served from one cached
+# snapshot built with a fixed set of queries. The cache key includes the student's
+# snapshot_changed_at, which the views read with the student row on every request.
+# Signals in students_dash.signals stamp it whenever something the snapshot was built
+# from changes, so every worker moves to a new key even when each has its own cache.
+# A timestamp rather than a counter: a stale Student.save() writing an old value back
+# is followed by its own post_save stamp, so a key is never reused. The timeout only
+# bounds staleness for changes no signal sees (e.g. a TA renaming themselves).
+# invalidate() matches the canonical student_id (the snapshot reads submissions by it,
+# and it is unique, so indexed) and stamps once the surrounding transaction commits, so
+# the write never runs under a caller's locks, such as record_submission's session row.
+
+def _key(student):
+    changed = student.snapshot_changed_at.timestamp() if student.snapshot_changed_at else 0
+    return f'students_dash:snapshot:{student.pk}:{changed}'
+
+def get_snapshot(student):
+    key = _key(student)
+    snap = cache.get(key)
+    if snap is None:
+        snap = build_snapshot(student)
+        cache.set(key, snap, settings.STUDENT_SNAPSHOT_TIMEOUT)
+    return snap
+
+def invalidate(student_ids):
+    ids = {sid for sid in student_ids if sid}  # read now: a pending delete may remove the rows
+    if ids:
+        transaction.on_commit(lambda: Student.objects.filter(student_id__in=ids).update(snapshot_changed_at=timezone.now()))
+
+def build_snapshot(student):
+    def dt_str(dt):
+        return dt.isoformat() if dt else None
+
+    # Courses enrolled
+    courses_qs = Course.objects.filter(students=student).select_related('teacher').order_by('title')
+    courses = [{
+        'id': c.id,
+        'title': c.title,
+        'description': c.description,
+        'teacher_email': getattr(c.teacher, 'email', ''),
+        'enrolled_count': c.enrolled_count,
+        'created_at': dt_str(c.created_at),
+    } for c in courses_qs]
+
+    # All exercises in enrolled courses, with group times and questions prefetched
+    # so the query count does not grow with the number of exercises
+    exercises_qs = Exercise.objects.filter(course__in=list(courses_qs)).select_related('course').prefetch_related(
+        Prefetch('group_times', queryset=ExerciseGroupTime.objects.order_by('scheduled_at')),
+        Prefetch('questions', queryset=ExerciseQuestion.objects.order_by('order')),
+    ).order_by('-created_at')
+
+    # Student sign-ups (group time selections)
+    selections = StudentExerciseGroupSelection.objects.filter(student=student)
+    selection_map = {s.exercise_id: s.group_time_id for s in selections}
+
+    # Group times and questions per exercise
+    group_times_map = {}
+    questions_map = {}
+    gt_map = {}
+    for ex in exercises_qs:
+        times = list(ex.group_times.all())
+        gt_map.update((t.id, t) for t in times)
+        group_times_map[ex.id] = [{'id': t.id, 'name': t.name, 'scheduled_at': dt_str(t.scheduled_at)} for t in times]
+        questions_map[ex.id] = [{'id': q.id, 'text': q.question_text, 'points': q.points, 'order': q.order} for q in ex.questions.all()]
+
+    # Sessions attended by this student (with grades)
+    subs_qs = TAExerciseSessionSubmission.objects.filter(
+        student_id=student.student_id
+    ).select_related('session__course', 'session__exercise', 'session__assistant').order_by('-updated_at', '-created_at')
+
+    sessions_attended = []
+    for s in subs_qs:
+        sess = s.session
+        ex = sess.exercise
+        sessions_attended.append({
+            'id': s.id,
+            'slug': sess.slug,
+            'course': {
+                'id': sess.course_id,
+                'title': sess.course.title if sess.course else '',
+            },
+            'exercise': {
+                'id': ex.id if ex else None,
+                'title': ex.title if ex else None,
+                'total_points': ex.total_points if ex else None,
+            },
+            'assistant_name': getattr(sess.assistant, 'name', None),
+            'answers': s.answer_labels(sess.path_index),
+            'total_checked_count': s.total_checked_count,
+            'score': s.score,
+            'group_index': s.group_index,
+            'submitted_at': dt_str(s.updated_at),
+            'evidence_requested_at': dt_str(getattr(s, 'evidence_requested_at', None)),
+            'evidence_received_at': dt_str(getattr(s, 'evidence_received_at', None)),
+        })
+
+    # Build exercises payload
+    exercises = []
+    signed_up_ids = set(selection_map.keys())
+    for e in exercises_qs:
+        selected_gt_id = selection_map.get(e.id)
+        exercises.append({
+            'id': e.id,
+            'title': e.title,
+            'details': e.details,
+            'total_points': e.total_points,
+            'start_time': dt_str(e.start_time),
+            'deadline': dt_str(e.deadline),
+            'created_at': dt_str(e.created_at),
+            'course': {
+                'id': e.course_id,
+                'title': e.course.title,
+                'description': e.course.description,
+            },
+            'questions': questions_map.get(e.id, []),
+            'group_times': group_times_map.get(e.id, []),
+            'selected_group_time_id': selected_gt_id,
+        })
+
+    not_signed_up = [ex for ex in exercises if ex['id'] not in signed_up_ids]
+    signed_up = []
+    if signed_up_ids:
+        # Expand signed-up with selected group time details (already prefetched above)
+        for ex in exercises:
+            if ex['id'] in signed_up_ids:
+                gt_id = ex['selected_group_time_id']
+                gt = gt_map.get(gt_id)
+                signed_up.append({
+                    'exercise_id': ex['id'],
+                    'exercise_title': ex['title'],
+                    'course_title': ex['course']['title'],
+                    'group_time': {
+                        'id': gt_id,
+                        'name': getattr(gt, 'name', None),
+                        'scheduled_at': dt_str(getattr(gt, 'scheduled_at', None)),
+                    }
+                })
+
+    stats = {
+        'courses_count': len(courses),
+        'exercises_count': len(exercises),
+        'signed_up_count': len(signed_up),
+        'not_signed_up_count': len(not_signed_up),
+        'sessions_attended_count': len(sessions_attended),
+        'avg_score': (sum([s['score'] for s in sessions_attended if s['score'] is not None]) / max(1, len([s for s in sessions_attended if s['score'] is not None]))) if sessions_attended else None,
+    }
+
+    # Dashboard summary, derived from the same rows
+    submitted_ex_ids = {s.session.exercise_id for s in subs_qs if s.session.exercise_id}
+    uncompleted = [{
+        'id': e.id,
+        'title': e.title,
+        'course_id': e.course_id,
+        'course_title': e.course.title,
+        'deadline': dt_str(e.deadline),
+        'start_time': dt_str(e.start_time),
+    } for e in exercises_qs if e.id not in submitted_ex_ids]
+
+    no_time_selected = [{
+        'id': e.id,
+        'title': e.title,
+        'course_id': e.course_id,
+        'course_title': e.course.title,
+    } for e in exercises_qs if e.id not in selection_map]
+
+    evidence_reqs = sorted(
+        (s for s in subs_qs if s.evidence_requested_at and not s.evidence_received_at),
+        key=lambda s: s.evidence_requested_at,
+        reverse=True,
+    )
+    evidence_requests = [{
+        'session_slug': s.session.slug,
+        'course_title': s.session.course.title,
+        'exercise_title': s.session.exercise.title if s.session.exercise else '',
+        'requested_at': dt_str(s.evidence_requested_at),
+    } for s in evidence_reqs]
+
+    return {
+        'full': {
+            'stats': stats,
+            'courses': courses,
+            'exercises': exercises,
+            'signed_up': signed_up,
+            'not_signed_up': not_signed_up,
+            'sessions_attended': sessions_attended,
+        },
+        'summary': {
+            'courses': [{
+                'id': c['id'],
+                'title': c['title'],
+                'teacher_email': c['teacher_email'],
+                'enrolled_count': c['enrolled_count'],
+            } for c in courses],
+            'exercises_uncompleted': uncompleted,
+            'exercises_no_time_selected': no_time_selected,
+            'evidence_requests': evidence_requests,
+        },
+    }
@@ -0,0 +1,68 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+from . import serving
+
+# Content-addressed storage for evidence files.
+# A saved file is named after the SHA-256 of its bytes, "evidence/blobs/ab/<sha256><ext>",
+# so uploading the same file again (a retry after a failed request, the same photo for
+# two submissions) reuses the existing blob instead of writing another copy. Blobs are
+# shared, so nothing deletes them on replace; they are reference counted from the
+# submission's evidence fields by the "gc_evidence" command, which removes unreferenced
+# blobs after a grace period. Names written by the older date-based layout stay readable.
+# url() returns a signed download link (see serving.py), never a public MEDIA_URL path.
+
+BLOB_PREFIX = 'evidence/blobs'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()[:10]
+        root = self.path(BLOB_PREFIX)
+        os.makedirs(root, exist_ok=True)
+
+        # Hash while spooling to a temp file in the same filesystem, then move into place
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=root, prefix='.incoming-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    fh.write(chunk)
+            sha = digest.hexdigest()
+            blob = f'{BLOB_PREFIX}/{sha[:2]}/{sha}{ext}'
+            path = self.path(blob)
+            if os.path.exists(path):
+                try:
+                    os.utime(path)  # re-referenced: restart the gc grace period
+                    return blob
+                except FileNotFoundError:
+                    pass  # removed by gc_evidence just now; write it again
+            os.makedirs(os.path.dirname(path), exist_ok=True, mode=self.directory_permissions_mode or 0o777)
+            os.replace(tmp, path)
+            tmp = None
+            if self.file_permissions_mode is not None:
+                os.chmod(path, self.file_permissions_mode)
+            return blob
+        finally:
+            if tmp is not None:
+                os.remove(tmp)
+
+    def get_available_name(self, name, max_length=None):
+        return name  # the final name comes from the content in _save
+
+    def url(self, name):
+        return serving.signed_url(name)  # served by students_dash.views.serve_evidence
+
+
+_evidence_storage = ContentAddressedStorage()  # MEDIA_ROOT / MEDIA_URL
+
+
+def evidence_storage():
+    # Callable for FileField(storage=...) so migrations don't serialize the instance
+    return _evidence_storage
@@ -1,3 +1,392 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import FixtureTestCase
+from teachers_dash.models import Course, Exercise, ExerciseGroupTime
+from teachers_assistants_dash import feed
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+from teachers_assistants_dash.submissions import record_submission
+from . import previews, snapshot, uploads
+from .models import Student, StudentExerciseGroupSelection
+
+
+class ExercisesFullQueryCountTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.make_student('S100', name='Sam')
+        self.student.set_password('pw')
+        self.student.save()
+
+        session = self.client.session
+        session['student_pk'] = self.student.pk
+        session.save()
+
+    def _add_course(self, title, exercises):
+        with self.captureOnCommitCallbacks(execute=True):  # snapshot stamps are written on commit
+            course = self.make_course(title, exercises)
+            course.students.add(self.student)
+            now = timezone.now()
+            for i, ex in enumerate(course.exercises.order_by('id')):
+                gts = [
+                    ExerciseGroupTime.objects.create(exercise=ex, name=f'G{g}', scheduled_at=now + timedelta(days=g))
+                    for g in range(2)
+                ]
+                StudentExerciseGroupSelection.objects.create(student=self.student, exercise=ex, group_time=gts[1])
+                sess = self.make_session(course, ex, slug=f'{title}-{i}', status='closed')
+                TAExerciseSessionSubmission.objects.create(
+                    session=sess, student_id=self.student.student_id, student_name=self.student.name, score=3
+                )
+
+    def _fetch(self):
+        return self.post_json('students_exercises_full').json()
+
+    def test_query_count_is_constant(self):
+        self._add_course('Algebra', 1)
+        # session, student, courses, exercises, group times, questions, selections, submissions
+        with self.assertNumQueries(8):
+            small = self._fetch()
+
+        self._add_course('Biology', 20)
+        self._add_course('Chemistry', 20)
+        with self.assertNumQueries(8):
+            large = self._fetch()
+
+        self.assertEqual(small['stats']['exercises_count'], 1)
+        self.assertEqual(large['stats']['exercises_count'], 41)
+        self.assertEqual(len(large['signed_up']), 41)
+
+    def test_payload_uses_prefetched_rows(self):
+        self._add_course('Algebra', 2)
+        data = self._fetch()
+        ex = data['exercises'][0]
+        self.assertEqual([q['order'] for q in ex['questions']], [1, 2, 3])
+        self.assertEqual([g['name'] for g in ex['group_times']], ['G0', 'G1'])
+        signed = {s['exercise_id']: s for s in data['signed_up']}
+        self.assertEqual(signed[ex['id']]['group_time']['name'], 'G1')
+        self.assertEqual(signed[ex['id']]['group_time']['id'], ex['selected_group_time_id'])
+
+    def test_snapshot_is_cached_and_invalidated(self):
+        self._add_course('Algebra', 2)
+        self._fetch()
+        # session + student, then everything else comes from the cached snapshot
+        with self.assertNumQueries(2):
+            self._fetch()
+        with self.assertNumQueries(2):
+            summary = self.post_json('students_dashboard_summary').json()
+        self.assertEqual(summary['exercises_uncompleted'], [])
+
+        course = Course.objects.get(title='Algebra')
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.create(course=course, title='Late addition')
+        summary = self.post_json('students_dashboard_summary').json()
+        self.assertEqual([e['title'] for e in summary['exercises_uncompleted']], ['Late addition'])
+        self.assertEqual([e['title'] for e in summary['exercises_no_time_selected']], ['Late addition'])
+
+        sub = TAExerciseSessionSubmission.objects.filter(student_id=self.student.student_id).first()
+        sub.evidence_requested_at = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            sub.save(update_fields=['evidence_requested_at', 'updated_at'])
+        summary = self.post_json('students_dashboard_summary').json()
+        self.assertEqual([r['session_slug'] for r in summary['evidence_requests']], [sub.session.slug])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.students.remove(self.student)
+        self.assertEqual(self._fetch()['stats']['courses_count'], 0)
+
+    def test_change_stamped_by_another_worker_rebuilds_snapshot(self):
+        self._add_course('Algebra', 1)
+        self._fetch()
+        # Another worker's signal only touches the row; this process's cache keeps its entry
+        TAExerciseSessionSubmission.objects.filter(student_id='S100').update(score=9)
+        Student.objects.filter(pk=self.student.pk).update(snapshot_changed_at=timezone.now())
+        with self.assertNumQueries(8):
+            data = self._fetch()
+        self.assertEqual(data['stats']['avg_score'], 9)
+        self.assertTrue(cache.get(snapshot._key(Student.objects.get(pk=self.student.pk))))
+
+    def test_submission_stamps_the_student_after_commit(self):
+        Student.objects.filter(pk=self.student.pk).update(snapshot_changed_at=None)
+        sess = self.make_session(self.make_course(), questions=1)
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            record_submission(sess, self.student, [1])
+        # Nothing is written to the student table while the session row is locked
+        self.assertFalse([q for q in queries if 'UPDATE "students_dash_student"' in q['sql']])
+        self.assertIsNone(Student.objects.get(pk=self.student.pk).snapshot_changed_at)
+        for callback in callbacks:
+            callback()
+        self.assertIsNotNone(Student.objects.get(pk=self.student.pk).snapshot_changed_at)
+
+    def test_saves_of_fields_the_snapshot_ignores_do_not_stamp(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.student.snapshot_changed_at = timezone.now()
+            self.student.save(update_fields=['snapshot_changed_at'])
+            self.student.set_password('new')
+            self.student.save(update_fields=['password_hash', 'updated_at'])
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.student.name = 'Samuel'
+            self.student.save(update_fields=['name'])
+        self.assertEqual(len(callbacks), 1)
+
+
+class EvidenceStorageTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media, EVIDENCE_PREVIEWS=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        sess = self.make_session(self.make_course(), slug='algebra-1')
+        self.a = TAExerciseSessionSubmission.objects.create(session=sess, student_id='S1', student_name='One')
+        self.b = TAExerciseSessionSubmission.objects.create(session=sess, student_id='S2', student_name='Two')
+
+    def _blobs(self):
+        return sorted(f for _, _, files in os.walk(os.path.join(self.media, 'evidence')) for f in files)
+
+    def test_identical_uploads_share_a_blob_and_gc_keeps_referenced(self):
+        uploads.attach(self.a, ContentFile(b'scan'), 'scan.pdf')
+        uploads.attach(self.a, ContentFile(b'scan'), 'retry.pdf')
+        uploads.attach(self.b, ContentFile(b'scan'), 'scan.pdf')
+        self.assertEqual(self.a.evidence_file.name, self.b.evidence_file.name)
+        self.assertEqual(len(self._blobs()), 1)
+
+        uploads.attach(self.a, ContentFile(b'better scan'), 'scan.pdf')
+        call_command('gc_evidence', '--grace-hours', '0', stdout=io.StringIO())
+        self.assertEqual(len(self._blobs()), 2)  # still referenced by b
+
+        uploads.attach(self.b, ContentFile(b'better scan'), 'scan.pdf')
+        call_command('gc_evidence', '--grace-hours', '1', stdout=io.StringIO())
+        self.assertEqual(len(self._blobs()), 2)  # within the grace period
+        call_command('gc_evidence', '--grace-hours', '0', stdout=io.StringIO())
+        self.assertEqual(self._blobs(), [os.path.basename(self.a.evidence_file.name)])
+
+    def test_gc_keeps_blob_reused_after_listing(self):
+        uploads.attach(self.a, ContentFile(b'scan'), 'scan.pdf')
+        path = os.path.join(self.media, self.a.evidence_file.name)
+        old = time.time() - 7200
+        os.utime(path, (old, old))
+        self.a.evidence_file = ''
+        self.a.save(update_fields=['evidence_file'])
+
+        def reuse_while_listing():
+            # An upload of the same bytes lands after the listing; its row is not saved yet
+            uploads.attach(self.b, ContentFile(b'scan'), 'scan.pdf')
+            return set()
+
+        with mock.patch('students_dash.management.commands.gc_evidence.referenced_names', reuse_while_listing):
+            call_command('gc_evidence', '--grace-hours', '1', stdout=io.StringIO())
+        self.assertTrue(os.path.exists(path))
+
+    def test_signed_download_supports_ranges_and_revalidation(self):
+        uploads.attach(self.a, ContentFile(b'0123456789' * 10), 'scan.pdf')
+        url = self.a.evidence_file.url
+        self.assertEqual(self.client.get(url.replace('s=', 's=x')).status_code, 403)
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b''.join(resp.streaming_content), b'0123456789' * 10)
+        self.assertIn('immutable', resp['Cache-Control'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+
+        part = self.client.get(url, HTTP_RANGE='bytes=10-14')
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part['Content-Range'], 'bytes 10-14/100')
+        self.assertEqual(b''.join(part.streaming_content), b'01234')
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=200-').status_code, 416)
+
+    async def test_asgi_download_streams_asynchronously(self):
+        await sync_to_async(uploads.attach)(self.a, ContentFile(b'0123456789' * 10), 'scan.pdf')
+        url = await sync_to_async(lambda: self.a.evidence_file.url)()
+
+        resp = await self.async_client.get(url)
+        self.assertTrue(resp.is_async)
+        self.assertEqual(resp['Content-Length'], '100')
+        self.assertEqual(b''.join([chunk async for chunk in resp.streaming_content]), b'0123456789' * 10)
+
+        part = await self.async_client.get(url, headers={'Range': 'bytes=-5'})
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(b''.join([chunk async for chunk in part.streaming_content]), b'56789')
+
+
+class ResumableUploadTests(FixtureTestCase):
+    DATA = b'0123456789' * 3
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=self.media, EVIDENCE_UPLOAD_DIR=os.path.join(self.media, 'parts'),
+            EVIDENCE_CHUNK_MAX_BYTES=16, EVIDENCE_PREVIEWS=False,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.student = self.make_student('S1', name='One')
+        sess = self.make_session(self.make_course(), slug='algebra-1')
+        self.sub = TAExerciseSessionSubmission.objects.create(session=sess, student_id='S1', student_name='One')
+        session = self.client.session
+        session['student_pk'] = self.student.pk
+        session.save()
+
+    def _init(self, **fields):
+        payload = {
+            'submission_id': self.sub.id, 'filename': 'scan.pdf', 'size': len(self.DATA),
+            'sha256': hashlib.sha256(self.DATA).hexdigest(), **fields,
+        }
+        return self.post_json('students_evidence_upload_init', payload).json()
+
+    def _chunk(self, upload_id, offset, data, status=200, checksum=None):
+        url = reverse('students_evidence_upload_chunk') + f'?upload_id={upload_id}&offset={offset}'
+        resp = self.client.post(url, data, content_type='application/octet-stream', headers={
+            'X-Chunk-SHA256': checksum if checksum is not None else hashlib.sha256(data).hexdigest(),
+        })
+        self.assertEqual(resp.status_code, status, resp.content[:300])
+        return resp.json()
+
+    def test_upload_resumes_from_the_server_offset(self):
+        upload = self._init()
+        self.assertEqual(upload['received'], 0)
+        upload_id = upload['upload_id']
+        self.assertEqual(self._chunk(upload_id, 0, self.DATA[:16])['received'], 16)
+
+        # The response to the first chunk was lost and the client sends it again
+        stale = self._chunk(upload_id, 0, self.DATA[:16], status=409)
+        self.assertEqual(stale['received'], 16)
+        # A corrupted chunk is refused without moving the offset
+        self._chunk(upload_id, 16, self.DATA[16:], status=400, checksum='0' * 64)
+        # Completing early reports where to carry on
+        self.assertEqual(self.post_json('students_evidence_upload_complete', {'upload_id': upload_id}, status=409).json()['received'], 16)
+
+        # After a reload the client re-initialises the same file and gets the same upload back
+        resumed = self._init()
+        self.assertEqual(resumed['upload_id'], upload_id)
+        self.assertEqual(resumed['received'], 16)
+        self.assertEqual(self.post_json('students_evidence_upload_status', {'upload_id': upload_id}).json()['received'], 16)
+
+        self.assertEqual(self._chunk(upload_id, 16, self.DATA[16:])['received'], len(self.DATA))
+        with self.captureOnCommitCallbacks(execute=True):
+            done = self.post_json('students_evidence_upload_complete', {'upload_id': upload_id}).json()
+        self.assertEqual(done['status'], 'complete')
+        self.sub.refresh_from_db()
+        with self.sub.evidence_file.open('rb') as fh:
+            self.assertEqual(fh.read(), self.DATA)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'parts')), [])
+
+        # A retried complete (lost response) succeeds without attaching again
+        retry = self.post_json('students_evidence_upload_complete', {'upload_id': upload_id}).json()
+        self.assertEqual(retry['evidence_url'], done['evidence_url'])
+        self._chunk(upload_id, len(self.DATA), b'x', status=409)
+
+    def test_reinit_with_a_different_file_starts_a_new_upload(self):
+        first = self._init()
+        self._chunk(first['upload_id'], 0, self.DATA[:16])
+        other = self._init(size=len(self.DATA) - 1, sha256='')
+        self.assertNotEqual(other['upload_id'], first['upload_id'])
+        self.assertEqual(other['received'], 0)
+
+    def test_mismatched_file_checksum_restarts_the_upload(self):
+        upload_id = self._init(sha256='f' * 64)['upload_id']
+        self._chunk(upload_id, 0, self.DATA[:16])
+        self._chunk(upload_id, 16, self.DATA[16:])
+        self.post_json('students_evidence_upload_complete', {'upload_id': upload_id}, status=422)
+        self.post_json('students_evidence_upload_status', {'upload_id': upload_id}, status=404)
+        self.sub.refresh_from_db()
+        self.assertFalse(self.sub.evidence_file)
+
+
+@skipIf(previews.Image is None, 'Pillow is not installed')
+@override_settings(EVIDENCE_PREVIEWS=True, EVIDENCE_PREVIEW_SIZE=64, EVIDENCE_THUMBNAIL_SIZE=16)
+class EvidencePreviewTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        sess = self.make_session(self.make_course(), slug='algebra-1')
+        self.sub = TAExerciseSessionSubmission.objects.create(session=sess, student_id='S1', student_name='One')
+        executor = mock.patch('students_dash.previews._get_executor')
+        self.executor = executor.start().return_value
+        self.addCleanup(executor.stop)
+
+    def _png(self, size=(200, 100)):
+        out = io.BytesIO()
+        previews.Image.new('RGB', size, (200, 30, 30)).save(out, 'PNG')
+        return ContentFile(out.getvalue())
+
+    def test_scheduled_on_the_executor_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            uploads.attach(self.sub, self._png(), 'scan.png')
+            self.executor.submit.assert_not_called()
+        for callback in callbacks:
+            callback()
+        self.executor.submit.assert_called_once_with(previews._run, self.sub.id)
+
+    def test_not_scheduled_when_disabled(self):
+        with override_settings(EVIDENCE_PREVIEWS=False), self.captureOnCommitCallbacks(execute=True):
+            uploads.attach(self.sub, self._png(), 'scan.png')
+        self.executor.submit.assert_not_called()
+
+    def test_process_writes_downscaled_preview_and_thumbnail(self):
+        with self.captureOnCommitCallbacks():
+            uploads.attach(self.sub, self._png(), 'scan.png')
+        before = feed.version(self.sub.session_id)
+        self.assertTrue(previews.process(self.sub.id))
+        self.sub.refresh_from_db()
+        for field, longest in ((self.sub.evidence_preview, 64), (self.sub.evidence_thumbnail, 16)):
+            with field.open('rb') as fh, previews.Image.open(fh) as img:
+                self.assertEqual(max(img.size), longest)
+        self.assertEqual(feed.version(self.sub.session_id), before + 1)
+
+        # A new upload clears the previews until they are rebuilt for it
+        with self.captureOnCommitCallbacks():
+            uploads.attach(self.sub, self._png((50, 50)), 'other.png')
+        self.sub.refresh_from_db()
+        self.assertFalse(self.sub.evidence_preview)
+        self.assertFalse(self.sub.evidence_thumbnail)
+
+    def test_non_image_evidence_gets_no_previews(self):
+        with self.captureOnCommitCallbacks():
+            uploads.attach(self.sub, ContentFile(b'%PDF-1.4 not an image'), 'scan.pdf')
+        self.assertFalse(previews.process(self.sub.id))
+        self.sub.refresh_from_db()
+        self.assertFalse(self.sub.evidence_preview)
+
+    def test_previews_for_replaced_evidence_are_not_attached(self):
+        with self.captureOnCommitCallbacks():
+            uploads.attach(self.sub, self._png(), 'scan.png')
+        encode = previews._encode
+
+        def replace_while_encoding(*args):
+            TAExerciseSessionSubmission.objects.filter(pk=self.sub.pk).update(evidence_file='evidence/other.png')
+            return encode(*args)
+
+        with mock.patch('students_dash.previews._encode', side_effect=replace_while_encoding):
+            self.assertFalse(previews.process(self.sub.id))
+        self.sub.refresh_from_db()
+        self.assertFalse(self.sub.evidence_preview)
+
+    def test_worker_logs_failures(self):
+        with mock.patch('students_dash.previews.process', side_effect=OSError('disk full')), \
+                mock.patch('students_dash.previews.close_old_connections'), \
+                self.assertLogs('students_dash.previews', 'ERROR'):
+            previews._run(self.sub.id)
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from . import previews
+from .models import EvidenceUpload
+
+# Resumable evidence uploads.
+#   init     -> an EvidenceUpload row and an empty part file under EVIDENCE_UPLOAD_DIR
+#   chunk    -> bytes for [offset, offset + len) appended to the part file; the offset must
+#               equal "received", so a retried or duplicated chunk cannot corrupt the file
+#   status   -> "received", for resuming after a dropped connection
+#   complete -> whole-file checksum verified, file attached to the submission's evidence
+# A chunk is read and checked before any lock is taken, so a slow client never holds a
+# database transaction open. Open uploads older than EVIDENCE_UPLOAD_EXPIRY_HOURS are
+# removed when a new one starts.
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def part_path(upload):
+    return os.path.join(settings.EVIDENCE_UPLOAD_DIR, f'{upload.upload_id}.part')
+
+
+def _clean_sha256(value):
+    value = (value or '').strip().lower()
+    if value and not _SHA256_RE.match(value):
+        raise UploadError('sha256 must be 64 hex characters')
+    return value
+
+
+def attach(sub, fh, filename):
+    # Store a file as the submission's evidence and reset the review state
+    sub.evidence_file.save(filename, fh, save=False)
+    sub.evidence_received_at = timezone.now()
+    sub.evidence_decision = ''  # pending review
+    sub.evidence_preview = None  # rebuilt for the new file by previews.schedule
+    sub.evidence_thumbnail = None
+    sub.save(update_fields=['evidence_file', 'evidence_received_at', 'evidence_decision',
+                            'evidence_preview', 'evidence_thumbnail', 'updated_at'])
+    previews.schedule(sub.id)
+
+
+def expire_stale():
+    cutoff = timezone.now() - timedelta(hours=settings.EVIDENCE_UPLOAD_EXPIRY_HOURS)
+    stale = list(EvidenceUpload.objects.filter(status='open', updated_at__lt=cutoff))
+    for upload in stale:
+        _remove(part_path(upload))
+    EvidenceUpload.objects.filter(id__in=[u.id for u in stale]).delete()
+
+
+def start(student, sub, filename, size, content_type='', sha256=''):
+    if size <= 0:
+        raise UploadError('size must be > 0')
+    if size > settings.EVIDENCE_MAX_BYTES:
+        raise UploadError(f'File is larger than {settings.EVIDENCE_MAX_BYTES} bytes', status=413)
+    sha256 = _clean_sha256(sha256)
+    filename = get_valid_filename(os.path.basename(filename or '')[:150]) or 'evidence'
+    expire_stale()
+
+    # Re-initialising the same file (e.g. after a page reload) resumes the open upload
+    existing = EvidenceUpload.objects.filter(
+        student=student, submission=sub, status='open', filename=filename, size=size, sha256=sha256
+    ).order_by('-created_at').first()
+    if existing and os.path.exists(part_path(existing)):
+        return existing
+
+    upload = EvidenceUpload.objects.create(
+        student=student, submission=sub, filename=filename, size=size,
+        content_type=(content_type or '')[:100], sha256=sha256,
+    )
+    os.makedirs(settings.EVIDENCE_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def get(student, upload_id):
+    upload = EvidenceUpload.objects.filter(upload_id=upload_id, student=student).first()
+    if not upload:
+        raise UploadError('Upload not found', status=404)
+    return upload
+
+
+def write_chunk(student, upload_id, offset, stream, length, chunk_sha256=''):
+    if length <= 0:
+        raise UploadError('Empty chunk')
+    if length > settings.EVIDENCE_CHUNK_MAX_BYTES:
+        raise UploadError(f'Chunks may be at most {settings.EVIDENCE_CHUNK_MAX_BYTES} bytes', status=413)
+    chunk_sha256 = _clean_sha256(chunk_sha256)
+
+    pieces = []
+    remaining = length
+    while remaining:
+        piece = stream.read(min(remaining, 64 * 1024))
+        if not piece:
+            break
+        pieces.append(piece)
+        remaining -= len(piece)
+    data = b''.join(pieces)
+    if len(data) != length:
+        raise UploadError('Chunk was cut off; resend it', received=offset)
+    if chunk_sha256 and hashlib.sha256(data).hexdigest() != chunk_sha256:
+        raise UploadError('Chunk checksum mismatch; resend it', received=offset)
+
+    with transaction.atomic():
+        upload = EvidenceUpload.objects.select_for_update().filter(upload_id=upload_id, student=student).first()
+        if not upload:
+            raise UploadError('Upload not found', status=404)
+        if upload.status != 'open':
+            raise UploadError('Upload already completed', status=409, received=upload.received)
+        if offset != upload.received:
+            raise UploadError(f'Expected offset {upload.received}', status=409, received=upload.received)
+        if offset + length > upload.size:
+            raise UploadError('Chunk goes past the declared size')
+        with open(part_path(upload), 'r+b') as fh:
+            fh.seek(offset)
+            fh.write(data)
+            fh.truncate()
+            fh.flush()
+            os.fsync(fh.fileno())
+        upload.received = offset + length
+        upload.save(update_fields=['received', 'updated_at'])
+    return upload
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete(student, upload_id):
+    upload = get(student, upload_id)
+    if upload.status == 'complete':
+        return upload  # a retried "complete" after a lost response
+    if upload.received != upload.size:
+        raise UploadError('Upload is not finished', status=409, received=upload.received)
+    path = part_path(upload)
+    if upload.sha256 and _file_sha256(path) != upload.sha256:
+        # Something went wrong that per-chunk checks did not catch; start over
+        _remove(path)
+        upload.delete()
+        raise UploadError('File checksum mismatch; start the upload again', status=422)
+
+    with transaction.atomic():
+        upload = EvidenceUpload.objects.select_for_update().select_related('submission').get(pk=upload.pk)
+        if upload.status == 'complete':
+            return upload
+        with open(path, 'rb') as fh:
+            attach(upload.submission, File(fh), upload.filename)
+        upload.status = 'complete'
+        upload.save(update_fields=['status', 'updated_at'])
+        transaction.on_commit(lambda: _remove(path))
+    return upload
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import dashboard, students_logout_api, api_dashboard_summary, api_exercise_group_times, api_select_group_time
 from .views import exercises_page, api_exercises_full, grades_page
-from .views import api_evidence_upload
+from .views import api_evidence_upload, api_evidence_upload_init, api_evidence_upload_chunk, api_evidence_upload_status, api_evidence_upload_complete
 from .views import extras_page
 
 urlpatterns = [
@@ -14,5 +14,9 @@ urlpatterns = [
     path('api/exercise/group-times/', api_exercise_group_times, name='students_exercise_group_times'),
     path('api/exercise/select-group-time/', api_select_group_time, name='students_select_group_time'),
     path('api/evidence/upload/', api_evidence_upload, name='students_evidence_upload'),
+    path('api/evidence/upload/init/', api_evidence_upload_init, name='students_evidence_upload_init'),
+    path('api/evidence/upload/chunk/', api_evidence_upload_chunk, name='students_evidence_upload_chunk'),
+    path('api/evidence/upload/status/', api_evidence_upload_status, name='students_evidence_upload_status'),
+    path('api/evidence/upload/complete/', api_evidence_upload_complete, name='students_evidence_upload_complete'),
     path('extras/', extras_page, name='students_extras'),
 ]
\ No newline at end of file
@@ -1,12 +1,17 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from core.http import JsonResponse
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from .models import Student
 from teachers_dash.models import Course, Exercise, ExerciseGroupTime
 from teachers_assistants_dash.models import TAExerciseSession, TAExerciseSessionSubmission
 from .models import StudentExerciseGroupSelection
-from django.utils import timezone
+from .snapshot import get_snapshot
+from . import serving, uploads
+from .storage import evidence_storage
+from django.conf import settings
+import json
+import uuid
 
 def dashboard(request):
     return render(request, 'students_dash/students_dash.html', {
@@ -42,124 +47,7 @@ def api_exercises_full(request):
     if not student:
         return JsonResponse({'ok': False, 'error': 'Student not found'}, status=404)
 
-    def dt_str(dt):
-        return dt.isoformat() if dt else None
-
-    # Courses enrolled
-    courses_qs = Course.objects.filter(students=student).select_related('teacher').order_by('title')
-    courses = [{
-        'id': c.id,
-        'title': c.title,
-        'description': c.description,
-        'teacher_email': getattr(c.teacher, 'email', ''),
-        'enrolled_count': c.enrolled_count,
-        'created_at': dt_str(c.created_at),
-    } for c in courses_qs]
-
-    # All exercises in enrolled courses
-    exercises_qs = Exercise.objects.filter(course__in=list(courses_qs)).select_related('course').order_by('-created_at')
-
-    # Student sign-ups (group time selections)
-    selections = StudentExerciseGroupSelection.objects.filter(student=student)
-    selection_map = {s.exercise_id: s.group_time_id for s in selections}
-
-    # Group times per exercise
-    group_times_map = {}
-    for ex in exercises_qs:
-        times = ExerciseGroupTime.objects.filter(exercise=ex).order_by('scheduled_at')
-        group_times_map[ex.id] = [{'id': t.id, 'name': t.name, 'scheduled_at': dt_str(t.scheduled_at)} for t in times]
-
-    # Questions per exercise
-    questions_map = {}
-    from teachers_dash.models import ExerciseQuestion
-    for ex in exercises_qs:
-        qs = ExerciseQuestion.objects.filter(exercise=ex).order_by('order')
-        questions_map[ex.id] = [{'id': q.id, 'text': q.question_text, 'points': q.points, 'order': q.order} for q in qs]
-
-    # Sessions attended by this student (with grades)
-    subs_qs = TAExerciseSessionSubmission.objects.filter(
-        student_id=student.student_id
-    ).select_related('session__course', 'session__exercise', 'session__assistant').order_by('-updated_at', '-created_at')
-
-    sessions_attended = []
-    for s in subs_qs:
-        sess = s.session
-        ex = sess.exercise
-        sessions_attended.append({
-            'id': s.id,
-            'slug': sess.slug,
-            'course': {
-                'id': sess.course_id,
-                'title': sess.course.title if sess.course else '',
-            },
-            'exercise': {
-                'id': ex.id if ex else None,
-                'title': ex.title if ex else None,
-                'total_points': ex.total_points if ex else None,
-            },
-            'assistant_name': getattr(sess.assistant, 'name', None),
-            'answers': s.answers_json,
-            'total_checked_count': s.total_checked_count,
-            'score': s.score,
-            'group_index': s.group_index,
-            'submitted_at': dt_str(s.updated_at),
-            'evidence_requested_at': dt_str(getattr(s, 'evidence_requested_at', None)),
-            'evidence_received_at': dt_str(getattr(s, 'evidence_received_at', None)),
-        })
-
-    # Build exercises payload
-    exercises = []
-    signed_up_ids = set(selection_map.keys())
-    for e in exercises_qs:
-        selected_gt_id = selection_map.get(e.id)
-        exercises.append({
-            'id': e.id,
-            'title': e.title,
-            'details': e.details,
-            'total_points': e.total_points,
-            'start_time': dt_str(e.start_time),
-            'deadline': dt_str(e.deadline),
-            'created_at': dt_str(e.created_at),
-            'course': {
-                'id': e.course_id,
-                'title': e.course.title,
-                'description': e.course.description,
-            },
-            'questions': questions_map.get(e.id, []),
-            'group_times': group_times_map.get(e.id, []),
-            'selected_group_time_id': selected_gt_id,
-        })
-
-    not_signed_up = [ex for ex in exercises if ex['id'] not in signed_up_ids]
-    signed_up = []
-    if signed_up_ids:
-        # Expand signed-up with selected group time details
-        gt_qs = ExerciseGroupTime.objects.filter(id__in=list(selection_map.values()))
-        gt_map = {gt.id: gt for gt in gt_qs}
-        for ex in exercises:
-            if ex['id'] in signed_up_ids:
-                gt_id = ex['selected_group_time_id']
-                gt = gt_map.get(gt_id)
-                signed_up.append({
-                    'exercise_id': ex['id'],
-                    'exercise_title': ex['title'],
-                    'course_title': ex['course']['title'],
-                    'group_time': {
-                        'id': gt_id,
-                        'name': getattr(gt, 'name', None),
-                        'scheduled_at': dt_str(getattr(gt, 'scheduled_at', None)),
-                    }
-                })
-
-    stats = {
-        'courses_count': len(courses),
-        'exercises_count': len(exercises),
-        'signed_up_count': len(signed_up),
-        'not_signed_up_count': len(not_signed_up),
-        'sessions_attended_count': len(sessions_attended),
-        'avg_score': (sum([s['score'] for s in sessions_attended if s['score'] is not None]) / max(1, len([s for s in sessions_attended if s['score'] is not None]))) if sessions_attended else None,
-    }
-
+    snap = get_snapshot(student)
     return JsonResponse({
         'ok': True,
         'student': {
@@ -168,12 +56,7 @@ def api_exercises_full(request):
             'email': student.email,
             'student_id': student.student_id,
         },
-        'stats': stats,
-        'courses': courses,
-        'exercises': exercises,
-        'signed_up': signed_up,
-        'not_signed_up': not_signed_up,
-        'sessions_attended': sessions_attended,
+        **snap['full'],
     })
 
 @csrf_exempt
@@ -199,18 +82,126 @@ def api_evidence_upload(request):
     if not submission_id or not file_obj:
         return JsonResponse({'ok': False, 'error': 'submission_id and evidence file required'}, status=400)
 
+    if file_obj.size > settings.EVIDENCE_MAX_BYTES:
+        return JsonResponse({'ok': False, 'error': f'File is larger than {settings.EVIDENCE_MAX_BYTES} bytes'}, status=413)
+
     sub = TAExerciseSessionSubmission.objects.filter(id=submission_id, student_id=student.student_id).first()
     if not sub:
         return JsonResponse({'ok': False, 'error': 'Submission not found'}, status=404)
 
-    sub.evidence_file = file_obj
-    sub.evidence_received_at = timezone.now()
-    # Optional: mark state for teacher review
-    sub.evidence_decision = ''  # pending review
-    sub.save(update_fields=['evidence_file', 'evidence_received_at', 'evidence_decision', 'updated_at'])
+    uploads.attach(sub, file_obj, file_obj.name)
 
     evidence_url = sub.evidence_file.url if sub.evidence_file else None
     return JsonResponse({'ok': True, 'evidence_url': evidence_url})
+
+# Resumable evidence uploads (protocol in students_dash.uploads). init/status/complete
+# take JSON; a chunk is the raw request body with upload_id and offset in the query
+# string and an optional X-Chunk-SHA256 header.
+
+def _session_student(request):
+    student_pk = request.session.get('student_pk')
+    if not student_pk:
+        return None, JsonResponse({'ok': False, 'error': 'Not authenticated'}, status=401)
+    student = Student.objects.filter(pk=student_pk).first()
+    if not student:
+        return None, JsonResponse({'ok': False, 'error': 'Student not found'}, status=404)
+    return student, None
+
+def _upload_payload(upload):
+    return {
+        'upload_id': str(upload.upload_id),
+        'size': upload.size,
+        'received': upload.received,
+        'status': upload.status,
+        'chunk_size': settings.EVIDENCE_CHUNK_MAX_BYTES,
+    }
+
+def _upload_error(e):
+    return JsonResponse({'ok': False, 'error': str(e), **e.extra}, status=e.status)
+
+@csrf_exempt
+def api_evidence_upload_init(request):
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Invalid method'}, status=405)
+    student, error = _session_student(request)
+    if error:
+        return error
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        submission_id = int(data.get('submission_id') or 0)
+        size = int(data.get('size') or 0)
+    except (ValueError, TypeError):
+        return JsonResponse({'ok': False, 'error': 'submission_id and size must be integers'}, status=400)
+    if not submission_id:
+        return JsonResponse({'ok': False, 'error': 'submission_id required'}, status=400)
+    sub = TAExerciseSessionSubmission.objects.filter(id=submission_id, student_id=student.student_id).first()
+    if not sub:
+        return JsonResponse({'ok': False, 'error': 'Submission not found'}, status=404)
+    try:
+        upload = uploads.start(
+            student, sub, data.get('filename') or '', size,
+            content_type=data.get('content_type') or '', sha256=data.get('sha256') or '',
+        )
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return JsonResponse({'ok': True, **_upload_payload(upload)})
+
+@csrf_exempt
+def api_evidence_upload_chunk(request):
+    if request.method not in ('POST', 'PUT'):
+        return JsonResponse({'ok': False, 'error': 'Invalid method'}, status=405)
+    student, error = _session_student(request)
+    if error:
+        return error
+    try:
+        upload_id = uuid.UUID(request.GET.get('upload_id') or '')
+        offset = int(request.GET.get('offset') or '')
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'upload_id, offset and Content-Length required'}, status=400)
+    try:
+        upload = uploads.write_chunk(student, upload_id, offset, request, length, request.headers.get('X-Chunk-SHA256', ''))
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return JsonResponse({'ok': True, **_upload_payload(upload)})
+
+@csrf_exempt
+def api_evidence_upload_status(request):
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Invalid method'}, status=405)
+    student, error = _session_student(request)
+    if error:
+        return error
+    try:
+        upload_id = uuid.UUID(json.loads(request.body.decode('utf-8')).get('upload_id') or '')
+        upload = uploads.get(student, upload_id)
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'upload_id required'}, status=400)
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return JsonResponse({'ok': True, **_upload_payload(upload)})
+
+@csrf_exempt
+def api_evidence_upload_complete(request):
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Invalid method'}, status=405)
+    student, error = _session_student(request)
+    if error:
+        return error
+    try:
+        upload_id = uuid.UUID(json.loads(request.body.decode('utf-8')).get('upload_id') or '')
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'upload_id required'}, status=400)
+    try:
+        upload = uploads.complete(student, upload_id)
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    sub = upload.submission
+    return JsonResponse({
+        'ok': True,
+        **_upload_payload(upload),
+        'evidence_url': sub.evidence_file.url if sub.evidence_file else None,
+    })
     
 def extras_page(request):
     return render(request, 'students_dash/extras.html', {
@@ -237,55 +228,7 @@ def api_dashboard_summary(request):
     if not student:
         return JsonResponse({'ok': False, 'error': 'Student not found'}, status=404)
 
-    courses_qs = Course.objects.filter(students=student).select_related('teacher').order_by('title')
-    courses = [{
-        'id': c.id,
-        'title': c.title,
-        'teacher_email': getattr(c.teacher, 'email', ''),
-        'enrolled_count': c.enrolled_count,
-    } for c in courses_qs]
-
-    exercises_qs = Exercise.objects.filter(course__in=list(courses_qs)).order_by('-created_at')
-    submitted_ex_ids = set(TAExerciseSessionSubmission.objects.filter(
-        student_id=student.student_id,
-        session__exercise__in=exercises_qs
-    ).values_list('session__exercise_id', flat=True))
-    uncompleted = [{
-        'id': e.id,
-        'title': e.title,
-        'course_id': e.course_id,
-        'course_title': e.course.title,
-        'deadline': e.deadline.isoformat() if e.deadline else None,
-        'start_time': e.start_time.isoformat() if e.start_time else None,
-    } for e in exercises_qs if e.id not in submitted_ex_ids]
-
-    selected_ex_ids = set(StudentExerciseGroupSelection.objects.filter(student=student).values_list('exercise_id', flat=True))
-    no_time_selected = [{
-        'id': e.id,
-        'title': e.title,
-        'course_id': e.course_id,
-        'course_title': e.course.title,
-    } for e in exercises_qs if e.id not in selected_ex_ids]
-
-    evidence_reqs_qs = TAExerciseSessionSubmission.objects.filter(
-        student_id=student.student_id,
-        evidence_requested_at__isnull=False,
-        evidence_received_at__isnull=True
-    ).select_related('session__course', 'session__exercise').order_by('-evidence_requested_at')
-    evidence_requests = [{
-        'session_slug': s.session.slug,
-        'course_title': s.session.course.title,
-        'exercise_title': s.session.exercise.title if s.session.exercise else '',
-        'requested_at': s.evidence_requested_at.isoformat() if s.evidence_requested_at else None,
-    } for s in evidence_reqs_qs]
-
-    return JsonResponse({
-        'ok': True,
-        'courses': courses,
-        'exercises_uncompleted': uncompleted,
-        'exercises_no_time_selected': no_time_selected,
-        'evidence_requests': evidence_requests,
-    })
+    return JsonResponse({'ok': True, **get_snapshot(student)['summary']})
 
 @csrf_exempt
 def api_exercise_group_times(request):
@@ -373,4 +316,16 @@ def students_login_api(request):
     request.session['student_email'] = student.email
     request.session['student_id'] = student.student_id
 
-    return JsonResponse({'ok': True, 'redirect': reverse('students_dashboard_direct')})
\ No newline at end of file
+    return JsonResponse({'ok': True, 'redirect': reverse('students_dashboard_direct')})
+
+def serve_evidence(request, name):
+    # Evidence download behind a signed URL (students_dash.serving); storage.url() makes them
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+    expires = serving.verify(name, request.GET.get('e'), request.GET.get('s'))
+    if expires is None:
+        return JsonResponse({'ok': False, 'error': 'Link is invalid or has expired'}, status=403)
+    response = serving.serve(request, evidence_storage(), name, expires)
+    if response is None:
+        return JsonResponse({'ok': False, 'error': 'File not found'}, status=404)
+    return response
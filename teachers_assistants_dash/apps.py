@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TeachersAssistantsDashConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'teachers_assistants_dash'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,54 @@
+try:
+    import numpy as np
+except ImportError:  # optional; the per-path counts fall back to a plain loop
+    np = None
+
+# Submission answers as a bitset over the session's path ids.
+# Bit n (byte n // 8, bit n % 8, least significant first) is set when the path with
+# id n is checked, so a submission costs one bit per path instead of a JSON list of
+# labels. Ids are stable across structure edits (see structure.py), so stored
+# bitsets stay valid; ids that no longer exist in the index are simply ignored.
+
+
+def encode(ids):
+    value = 0
+    for i in ids:
+        value |= 1 << i
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def _as_int(bits):
+    return int.from_bytes(bytes(bits or b''), 'little')  # BinaryField may hand back a memoryview
+
+
+def decode(bits):
+    value = _as_int(bits)
+    ids = []
+    i = 0
+    while value:
+        if value & 1:
+            ids.append(i)
+        value >>= 1
+        i += 1
+    return ids
+
+
+def count(bits):
+    return _as_int(bits).bit_count()
+
+
+def column_counts(blobs, ids):
+    # How many of the given bitsets have each path id set -> {id: count}.
+    # With numpy the whole session is unpacked into one bit matrix and summed per column.
+    blobs = [bytes(b or b'') for b in blobs]
+    if not ids:
+        return {}
+    if np is not None and blobs:
+        width = max((max(ids) // 8) + 1, max(len(b) for b in blobs))
+        matrix = np.zeros((len(blobs), width), dtype=np.uint8)
+        for row, b in enumerate(blobs):
+            matrix[row, :len(b)] = np.frombuffer(b, dtype=np.uint8)
+        totals = np.unpackbits(matrix, axis=1, bitorder='little').sum(axis=0)
+        return {i: int(totals[i]) for i in ids}
+    values = [int.from_bytes(b, 'little') for b in blobs]
+    return {i: sum((v >> i) & 1 for v in values) for i in ids}
@@ -0,0 +1,39 @@
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from .models import TAExerciseSession
+from .structure import paths
+
+# Cached public session descriptor.
+# api_session_get_public answers every student opening the form with the same body, so
+# the encoded JSON is kept and served as-is. The key carries the session's
+# descriptor_version, read from the row on every request (a one-row indexed lookup that
+# also checks the session is still active), so a structure edit handled by one worker
+# moves every worker to a new key even when each has its own cache.
+
+def _key(session_id, version):
+    return f'ta_public_descriptor:{session_id}:{version}'
+
+async def alookup(slug):
+    # (id, descriptor_version) of the active session with this slug, or None
+    return await TAExerciseSession.objects.filter(slug=slug, status='active').values_list('id', 'descriptor_version').afirst()
+
+def encode(sess):
+    return json.dumps({'ok': True, 'session': {
+        'title': sess.title or 'Session',
+        'slug': sess.slug,
+        'time_limit_minutes': sess.time_limit_minutes,
+        'structure': sess.structure_json or {},
+        'checkable_paths': paths(sess.path_index),
+        'path_ids': [p['id'] for p in sess.path_index or []],
+    }}).encode('utf-8')
+
+async def aget(session_id, version):
+    return await cache.aget(_key(session_id, version))
+
+async def aset(session_id, version, body):
+    await cache.aset(_key(session_id, version), body, settings.PUBLIC_SESSION_CACHE_SECONDS)
+
+def changed(sess):
+    TAExerciseSession.objects.filter(pk=sess.pk).update(descriptor_version=F('descriptor_version') + 1)
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from .models import TAExerciseSessionSubmission
+from students_dash import snapshot
+from . import feed
+
+def _int_or_none(value):
+    if value is None or str(value).strip() == '':
+        return None
+    return int(value)
+
+def apply_grades(sess, graded):
+    # Bulk-apply TA grading rows ({student_id, score, group_index}) to a session.
+    # All student ids are resolved in one query and written with a single bulk_update,
+    # so the cost stays flat as sections grow. Must run inside a transaction.
+    # Returns (updated_count, failures) where failures is a list of per-row errors.
+    failures = []
+    rows = {}
+    for idx, g in enumerate(graded):
+        if not isinstance(g, dict):
+            failures.append({'index': idx, 'student_id': None, 'error': 'Invalid grading row'})
+            continue
+        sid = str(g.get('student_id') or '').strip()
+        if not sid:
+            failures.append({'index': idx, 'student_id': None, 'error': 'student_id required'})
+            continue
+        try:
+            score = _int_or_none(g.get('score', None))
+            group_index = _int_or_none(g.get('group_index', None))
+        except (TypeError, ValueError):
+            failures.append({'index': idx, 'student_id': sid, 'error': 'score and group_index must be integers'})
+            continue
+        if group_index is not None and group_index < 0:
+            failures.append({'index': idx, 'student_id': sid, 'error': 'group_index must be >= 0'})
+            continue
+        # Last row wins for duplicate ids, matching the old one-by-one loop
+        rows[sid.lower()] = (idx, sid, score, group_index)
+
+    subs = TAExerciseSessionSubmission.objects.filter(session=sess).annotate(
+        student_key=Lower('student_id')
+    ).filter(student_key__in=list(rows)).only('id', 'student_id', 'score', 'group_index', 'updated_at')
+    subs_by_key = {}
+    for sub in subs:
+        subs_by_key.setdefault(sub.student_key, sub)
+
+    now = timezone.now()
+    to_update = []
+    for key, (idx, sid, score, group_index) in rows.items():
+        sub = subs_by_key.get(key)
+        if not sub:
+            failures.append({'index': idx, 'student_id': sid, 'error': 'Submission not found'})
+            continue
+        sub.score = score
+        sub.group_index = group_index
+        sub.updated_at = now  # bulk_update skips auto_now
+        to_update.append(sub)
+
+    if to_update:
+        TAExerciseSessionSubmission.objects.bulk_update(to_update, ['score', 'group_index', 'updated_at'], batch_size=500)
+        # bulk_update sends no post_save, so notify live feeds and student snapshots explicitly
+        student_ids = [sub.student_id for sub in to_update]
+        transaction.on_commit(lambda: feed.bump(sess.id))
+        snapshot.invalidate(student_ids)
+
+    failures.sort(key=lambda f: f['index'])
+    return len(to_update), failures
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from .models import TeachingAssistant
+
+# Resolve the TeachingAssistant behind an API call.
+# Identifiers are tried in the historical order (id, special_code, user_id, email) but
+# answered by a single OR query; hits are memoised on the request and kept in the cache
+# for TA_IDENTITY_CACHE_SECONDS. Saving or deleting an assistant drops its entries under
+# both its previous identifiers (read in pre_save, see signals.py) and its current ones.
+
+_FIELDS = ('id', 'special_code', 'user_id', 'email')
+
+def _key(field, value):
+    return f'ta_identity:{field}:{value}'
+
+def keys_for(ta):
+    return [_key(field, getattr(ta, field)) for field in _FIELDS if getattr(ta, field)]
+
+def resolve_assistant(request=None, assistant_id=0, assistant_code='', user_id='', email=''):
+    lookups = [
+        (field, value)
+        for field, value in zip(_FIELDS, (assistant_id, assistant_code, user_id, email))
+        if value
+    ]
+    if not lookups:
+        return None
+
+    memo = None
+    if request is not None:
+        memo = getattr(request, '_assistant_identity', None)
+        if memo is None:
+            memo = request._assistant_identity = {}
+        memo_key = tuple(lookups)
+        if memo_key in memo:
+            return memo[memo_key]
+
+    # Only the highest-priority identifier may be answered from cache; a lower one
+    # could point at a different assistant than the DB would return for the first.
+    field, value = lookups[0]
+    ta = cache.get(_key(field, value))
+    if ta is None:
+        cond = Q()
+        for field, value in lookups:
+            cond |= Q(**{field: value})
+        rows = list(TeachingAssistant.objects.filter(cond).order_by('pk'))
+        for field, value in lookups:
+            ta = next((r for r in rows if getattr(r, field) == value), None)
+            if ta:
+                cache.set(_key(field, value), ta, settings.TA_IDENTITY_CACHE_SECONDS)
+                break
+
+    if memo is not None:
+        memo[memo_key] = ta
+    return ta
+
+def assistant_from_payload(request, data):
+    return resolve_assistant(
+        request,
+        assistant_id=int(data.get('assistant_id') or 0),
+        assistant_code=(data.get('assistant_code') or '').strip(),
+        user_id=(data.get('supabase_user_id') or '').strip(),
+        email=(data.get('email') or '').strip(),
+    )
+
+def forget(ta, previous_keys=()):
+    keys = set(keys_for(ta)) | set(previous_keys)
+    cache.delete_many(keys)
+    # Again once committed: a lookup in between may have cached the old row
+    transaction.on_commit(lambda: cache.delete_many(keys))
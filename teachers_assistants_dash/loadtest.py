@@ -0,0 +1,253 @@
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from students_dash.models import Student
+from teachers_dash.models import Teacher, Course, Exercise
+from .models import TeachingAssistant, CourseAssistant
+
+# Lab-session load test: a TA opens a session, a class of students fetch the public
+# form and submit (some of them twice) while the TA page polls submissions, metrics
+# and the per-path heatmap.
+# Requests go either through Django's test Client (in-process) or over HTTP to a running
+# server; latencies are recorded per endpoint and summarised as p50/p95/p99 + throughput.
+# Used by the "loadtest_session" management command.
+
+ENDPOINTS = {
+    'session_create': 'ta_api_session_create',
+    'get_public': 'ta_api_session_get_public',
+    'submit_public': 'ta_api_session_submit_public',
+    'submissions': 'ta_api_session_submissions',
+    'metrics': 'ta_api_session_metrics',
+    'heatmap': 'ta_api_session_heatmap',
+}
+
+
+class ClientTransport:
+    # In-process requests; one test Client per thread (Client keeps per-instance state)
+    def __init__(self):
+        self._local = threading.local()
+
+    def post(self, name, payload, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (headers or {}).items()}
+        resp = client.post(reverse(ENDPOINTS[name]), json.dumps(payload), content_type='application/json', **extra)
+        body = b''.join(resp.streaming_content) if resp.streaming else resp.content
+        return resp.status_code, resp.headers, body
+
+
+class HttpTransport:
+    # Real HTTP against a running server (gunicorn/runserver) sharing the same database
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, name, payload, headers=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        resp = session.post(
+            self.base_url + reverse(ENDPOINTS[name]), json=payload, headers=headers or {}, timeout=self.timeout
+        )
+        return resp.status_code, resp.headers, resp.content
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def call(self, transport, name, payload, headers=None, ok_statuses=(200,)):
+        t0 = time.perf_counter()
+        try:
+            status, resp_headers, body = transport.post(name, payload, headers)
+        except Exception as e:
+            status, resp_headers, body = None, {}, str(e).encode()
+        elapsed = time.perf_counter() - t0
+        failed = status not in ok_statuses
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if failed:
+                self.errors.setdefault(name, []).append(f'{status}: {body[:200].decode("utf-8", "replace")}')
+        return status, resp_headers, body
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        rows = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            rows[name] = {
+                'count': len(ordered),
+                'errors': len(self.errors.get(name, [])),
+                'p50_ms': _percentile(ordered, 50) * 1000,
+                'p95_ms': _percentile(ordered, 95) * 1000,
+                'p99_ms': _percentile(ordered, 99) * 1000,
+                'max_ms': ordered[-1] * 1000,
+                'rps': len(ordered) / wall if wall else 0.0,
+            }
+        return {'wall_seconds': wall, 'endpoints': rows}
+
+
+def _percentile(ordered, pct):
+    # Nearest-rank percentile over an already sorted list
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def seed(students=200, prefix=None):
+    # Create a teacher, course, exercise, assistant and enrolled students for one run.
+    # Returns a dict of ids/codes the scenario needs; pass it to cleanup() afterwards.
+    prefix = prefix or 'LT' + uuid.uuid4().hex[:6].upper()
+    teacher = Teacher.objects.create(
+        first_name='Load', last_name='Test', title='Ms', special_code=prefix, email=f'{prefix.lower()}-teacher@loadtest.invalid'
+    )
+    course = Course.objects.create(teacher=teacher, title=f'{prefix} course', description='Load test course')
+    exercise = Exercise.objects.create(course=course, title=f'{prefix} exercise')
+    ta = TeachingAssistant.objects.create(name=f'{prefix} TA', special_code=f'{prefix}-TA')
+    CourseAssistant.objects.create(course=course, assistant=ta)
+
+    password_hash = make_password('loadtest')  # hashing once keeps seeding fast
+    rows = Student.objects.bulk_create([
+        Student(
+            name=f'{prefix} Student {i}',
+            email=f'{prefix.lower()}-{i}@loadtest.invalid',
+            student_id=f'{prefix}-{i:04d}',
+            password_hash=password_hash,
+        )
+        for i in range(students)
+    ], batch_size=500)
+    course.students.add(*Student.objects.filter(student_id__startswith=f'{prefix}-'))
+    course.enrolled_count = len(rows)
+    course.save(update_fields=['enrolled_count'])
+    return {
+        'prefix': prefix,
+        'teacher_id': teacher.id,
+        'course_id': course.id,
+        'exercise_id': exercise.id,
+        'assistant_id': ta.id,
+        'assistant_code': ta.special_code,
+        'students': [(f'{prefix}-{i:04d}', f'{prefix} Student {i}') for i in range(students)],
+    }
+
+
+def cleanup(seeded):
+    # Sessions and submissions go with the assistant/course cascade
+    Student.objects.filter(student_id__startswith=f"{seeded['prefix']}-").delete()
+    TeachingAssistant.objects.filter(id=seeded['assistant_id']).delete()
+    Teacher.objects.filter(id=seeded['teacher_id']).delete()
+
+
+def run_scenario(transport, seeded, concurrency=32, arrival_seconds=0.0, resubmit_ratio=0.3,
+                 poll_seconds=4.0, metrics_seconds=7.0, questions=6, subparts=3, rng_seed=1):
+    recorder = Recorder()
+    rng = random.Random(rng_seed)
+    ta_payload = {'assistant_code': seeded['assistant_code']}
+
+    status, _, body = recorder.call(transport, 'session_create', {
+        **ta_payload,
+        'course_id': seeded['course_id'],
+        'exercise_id': seeded['exercise_id'],
+        'mode': 'uniform_subparts',
+        'question_count': questions,
+        'subparts_count': subparts,
+    })
+    if status != 200:
+        raise RuntimeError(f'Session create failed ({status}): {body[:200]!r}')
+    slug = json.loads(body)['session']['slug']
+
+    done = threading.Event()
+
+    def poll_submissions():
+        cursor, etag = '', ''
+        while not done.is_set():
+            headers = {'If-None-Match': etag} if etag else None
+            status, headers_out, body = recorder.call(
+                transport, 'submissions', {**ta_payload, 'slug': slug, 'since': cursor}, headers, ok_statuses=(200, 304)
+            )
+            if status == 200:
+                cursor = json.loads(body).get('cursor') or cursor
+                etag = headers_out.get('ETag', '') or etag
+            done.wait(poll_seconds)
+        connections.close_all()
+
+    def poll_metrics():
+        while not done.is_set():
+            recorder.call(transport, 'metrics', {**ta_payload, 'slug': slug})
+            recorder.call(transport, 'heatmap', {**ta_payload, 'slug': slug})
+            done.wait(metrics_seconds)
+        connections.close_all()
+
+    # Arrival offsets are drawn up front so a given seed always replays the same run
+    students = seeded['students']
+    plan = [
+        (sid, name, rng.uniform(0, arrival_seconds) if arrival_seconds else 0.0, rng.random() < resubmit_ratio, rng.random())
+        for sid, name in students
+    ]
+    t_start = time.perf_counter()
+
+    def student(sid, name, offset, resubmit, fraction):
+        delay = offset - (time.perf_counter() - t_start)
+        if delay > 0:
+            time.sleep(delay)
+        status, _, body = recorder.call(transport, 'get_public', {'slug': slug})
+        if status != 200:
+            return
+        paths = json.loads(body)['session']['checkable_paths']
+        picked = paths[:max(1, int(len(paths) * fraction))]
+        recorder.call(transport, 'submit_public', {'slug': slug, 'student_id': sid, 'student_name': name, 'answers': picked})
+        if resubmit:
+            recorder.call(transport, 'submit_public', {'slug': slug, 'student_id': sid, 'student_name': name, 'answers': paths})
+
+    pollers = [threading.Thread(target=poll_submissions, daemon=True), threading.Thread(target=poll_metrics, daemon=True)]
+    for t in pollers:
+        t.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for args in plan:
+            pool.submit(student, *args)
+    recorder.stop()
+    done.set()
+    for t in pollers:
+        t.join()
+    result = recorder.summary()
+    result['slug'] = slug
+    result['error_samples'] = {name: errs[:5] for name, errs in recorder.errors.items()}
+    return result
+
+
+def format_report(result):
+    lines = [f"Wall time: {result['wall_seconds']:.2f}s  (session {result.get('slug', '-')})"]
+    lines.append(f"{'endpoint':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>9}")
+    for name in ENDPOINTS:
+        row = result['endpoints'].get(name)
+        if not row:
+            continue
+        lines.append(
+            f"{name:<16}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}{row['rps']:>9.1f}"
+        )
+    for name, samples in (result.get('error_samples') or {}).items():
+        for sample in samples:
+            lines.append(f'  ! {name}: {sample}')
+    return '\n'.join(lines)
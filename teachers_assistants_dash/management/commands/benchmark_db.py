@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Database modes compared by this benchmark: environment overrides applied to a fresh
+# "manage.py loadtest_session" process, so each run picks up its own DATABASES setting.
+MODES = {
+    'sqlite-legacy': {
+        'DATABASE_URL': '',
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_TRANSACTION_MODE': 'DEFERRED',
+        'SQLITE_BUSY_TIMEOUT': '5',
+        'DB_CONN_MAX_AGE': '0',
+    },
+    'sqlite-wal': {
+        'DATABASE_URL': '',
+        'SQLITE_JOURNAL_MODE': 'WAL',
+        'SQLITE_SYNCHRONOUS': 'NORMAL',
+        'SQLITE_TRANSACTION_MODE': 'IMMEDIATE',
+        'SQLITE_BUSY_TIMEOUT': '20',
+        'DB_CONN_MAX_AGE': '60',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent submit throughput across database modes (SQLite legacy, SQLite WAL, PostgreSQL).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--postgres-url', default='',
+                            help='Also benchmark PostgreSQL at this DATABASE_URL (a test database is created there)')
+        parser.add_argument('--modes', default='', help='Comma-separated subset of modes to run')
+
+    def handle(self, *args, **opts):
+        modes = dict(MODES)
+        if opts['postgres_url']:
+            modes['postgres'] = {'DATABASE_URL': opts['postgres_url'], 'DB_CONN_MAX_AGE': '60'}
+        if opts['modes']:
+            wanted = [m.strip() for m in opts['modes'].split(',') if m.strip()]
+            unknown = [m for m in wanted if m not in modes]
+            if unknown:
+                raise CommandError(f"Unknown mode(s): {', '.join(unknown)} (available: {', '.join(modes)})")
+            modes = {m: modes[m] for m in wanted}
+
+        results = {}
+        for name, overrides in modes.items():
+            self.stdout.write(f'Running {name}...')
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as fh:
+                out_path = fh.name
+            try:
+                proc = subprocess.run(
+                    [
+                        sys.executable, str(settings.BASE_DIR / 'manage.py'), 'loadtest_session',
+                        '--students', str(opts['students']),
+                        '--concurrency', str(opts['concurrency']),
+                        '--json', out_path,
+                    ],
+                    env={**os.environ, **overrides},
+                    capture_output=True,
+                    text=True,
+                )
+                if proc.returncode != 0:
+                    self.stderr.write(f'{name} failed:\n{proc.stderr[-2000:]}')
+                    continue
+                with open(out_path) as fh:
+                    results[name] = json.load(fh)
+            finally:
+                os.unlink(out_path)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'mode':<16}{'submits':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ok/s':>10}")
+        for name, result in results.items():
+            row = result['endpoints'].get('submit_public')
+            if not row:
+                continue
+            self.stdout.write(
+                f"{name:<16}{row['count']:>9}{row['errors']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                f"{row['p99_ms']:>10.1f}{(row['count'] - row['errors']) / result['wall_seconds']:>10.1f}"
+            )
@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Gunicorn configurations compared by this benchmark. Each one is started against its
+# own migrated SQLite file and driven by "manage.py loadtest_session --base-url".
+SERVERS = {
+    'wsgi-sync': ['--worker-class', 'sync', 'hackathon.wsgi:application'],
+    'wsgi-gthread': ['--worker-class', 'gthread', '--threads', '8', 'hackathon.wsgi:application'],
+    'asgi': ['--worker-class', 'uvicorn_worker.UvicornWorker', 'hackathon.asgi:application'],
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, proc, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Compare the session-burst workload across gunicorn sync, threaded and ASGI (Uvicorn) workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes per server')
+        parser.add_argument('--modes', default='', help='Comma-separated subset of: ' + ', '.join(SERVERS))
+
+    def handle(self, *args, **opts):
+        modes = [m.strip() for m in opts['modes'].split(',') if m.strip()] or list(SERVERS)
+        unknown = [m for m in modes if m not in SERVERS]
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(unknown)}")
+        manage = str(settings.BASE_DIR / 'manage.py')
+
+        results = {}
+        for name in modes:
+            self.stdout.write(f'Running {name}...')
+            tmpdir = tempfile.mkdtemp(prefix='benchmark-server-')
+            env = {
+                **os.environ, 'DATABASE_URL': '', 'SQLITE_PATH': os.path.join(tmpdir, 'db.sqlite3'),
+                'SERVER_MODE': 'asgi' if name == 'asgi' else 'wsgi',  # picks the DB_CONN_MAX_AGE default
+            }
+            out_path = os.path.join(tmpdir, 'result.json')
+            port = _free_port()
+            server = None
+            try:
+                subprocess.run([sys.executable, manage, 'migrate', '-v', '0'], env=env, check=True, capture_output=True)
+                server = subprocess.Popen(
+                    [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(opts['workers']),
+                     '--log-level', 'warning', *SERVERS[name]],
+                    cwd=str(settings.BASE_DIR), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                )
+                if not _wait_for_port(port, server):
+                    self.stderr.write(f'{name}: server did not start\n{server.stderr.read()[-2000:] if server.poll() is not None else ""}')
+                    continue
+                proc = subprocess.run(
+                    [sys.executable, manage, 'loadtest_session',
+                     '--base-url', f'http://127.0.0.1:{port}',
+                     '--students', str(opts['students']),
+                     '--concurrency', str(opts['concurrency']),
+                     '--json', out_path],
+                    env=env, capture_output=True, text=True,
+                )
+                if proc.returncode != 0:
+                    self.stderr.write(f'{name} failed:\n{proc.stderr[-2000:]}')
+                    continue
+                with open(out_path) as fh:
+                    results[name] = json.load(fh)
+            finally:
+                if server and server.poll() is None:
+                    server.terminate()
+                    try:
+                        server.wait(timeout=10)
+                    except subprocess.TimeoutExpired:
+                        server.kill()
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'mode':<14}{'endpoint':<15}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ok/s':>9}")
+        for name, result in results.items():
+            for endpoint in ('get_public', 'submit_public'):
+                row = result['endpoints'].get(endpoint)
+                if not row:
+                    continue
+                self.stdout.write(
+                    f"{name:<14}{endpoint:<15}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10.1f}"
+                    f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+                    f"{(row['count'] - row['errors']) / result['wall_seconds']:>9.1f}"
+                )
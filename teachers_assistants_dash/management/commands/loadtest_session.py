@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from teachers_assistants_dash import loadtest, spool
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a lab session (session create, students fetching/submitting the public form, '
+        'TA polling submissions and metrics) and report latency percentiles per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=32, help='Simultaneous student clients')
+        parser.add_argument('--arrival-seconds', type=float, default=0.0,
+                            help='Spread student arrivals over this many seconds (0 = as fast as possible)')
+        parser.add_argument('--resubmit-ratio', type=float, default=0.3, help='Share of students who submit twice')
+        parser.add_argument('--poll-seconds', type=float, default=4.0, help='TA submissions poll interval')
+        parser.add_argument('--metrics-seconds', type=float, default=7.0, help='TA metrics poll interval')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for arrivals and answers')
+        parser.add_argument('--base-url', default='',
+                            help='Run over HTTP against a server using the same database (e.g. http://127.0.0.1:8000)')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='In-process runs seed the configured database instead of a throwaway test database')
+        parser.add_argument('--keep-data', action='store_true', help='Leave the seeded rows in place')
+        parser.add_argument('--json', dest='json_path', default='', help='Also write the results to this file')
+
+    def handle(self, *args, **opts):
+        if opts['students'] <= 0 or opts['concurrency'] <= 0:
+            raise CommandError('--students and --concurrency must be > 0')
+        throwaway = not opts['base_url'] and not opts['use_current_db']
+
+        setup_test_environment()  # allows the "testserver" host used by the test Client
+        # Failed requests are counted in the report; don't also log a traceback for each one
+        request_logger = logging.getLogger('django.request')
+        old_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        old_name, tmpdir = None, None
+        if throwaway:
+            if connection.vendor == 'sqlite':
+                # A file-backed database, so worker threads share it like real server processes
+                tmpdir = tempfile.mkdtemp(prefix='loadtest-')
+                connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'loadtest.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            seeded = loadtest.seed(students=opts['students'])
+            transport = loadtest.HttpTransport(opts['base_url']) if opts['base_url'] else loadtest.ClientTransport()
+            try:
+                result = loadtest.run_scenario(
+                    transport,
+                    seeded,
+                    concurrency=opts['concurrency'],
+                    arrival_seconds=opts['arrival_seconds'],
+                    resubmit_ratio=opts['resubmit_ratio'],
+                    poll_seconds=opts['poll_seconds'],
+                    metrics_seconds=opts['metrics_seconds'],
+                    rng_seed=opts['seed'],
+                )
+                if not opts['base_url']:
+                    spool.flush()  # write-behind: land queued submissions before the data goes away
+            finally:
+                if not throwaway and not opts['keep_data']:
+                    loadtest.cleanup(seeded)
+        finally:
+            if throwaway:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                if tmpdir:
+                    shutil.rmtree(tmpdir, ignore_errors=True)
+            teardown_test_environment()
+            request_logger.setLevel(old_level)
+
+        result['config'] = {
+            'students': opts['students'],
+            'concurrency': opts['concurrency'],
+            'arrival_seconds': opts['arrival_seconds'],
+            'transport': opts['base_url'] or 'in-process',
+            'database': connection.vendor,
+        }
+        self.stdout.write(loadtest.format_report(result))
+        if opts['json_path']:
+            with open(opts['json_path'], 'w') as fh:
+                json.dump(result, fh, indent=2)
+            self.stdout.write(f"Results written to {opts['json_path']}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from teachers_assistants_dash.models import TAExerciseSession
+from teachers_assistants_dash.submissions import recount_path_counts
+
+
+class Command(BaseCommand):
+    help = "Rebuild sessions' per-path check counts (path_counts, read by the heatmap) from the stored answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help='Session slugs (default: every session)')
+
+    def handle(self, *args, **opts):
+        sessions = TAExerciseSession.objects.order_by('id')
+        if opts['slugs']:
+            sessions = sessions.filter(slug__in=opts['slugs'])
+        checked = repaired = 0
+        for sess in sessions.iterator():
+            before = {k: n for k, n in (sess.path_counts or {}).items() if n}
+            if recount_path_counts(sess) != before:
+                repaired += 1
+                self.stdout.write(f'{sess.slug}: repaired')
+            checked += 1
+        self.stdout.write(f'Recounted {checked} sessions; {repaired} repaired')
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0008_taexercisesessionsubmission_evidence_decision_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taexercisesessionsubmission',
+            index=models.Index(fields=['session', 'updated_at'], name='teachers_as_session_2a2a3e_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def _count_leaves(struct):
+    def walk(node):
+        children = node.get('children') or []
+        if children:
+            return sum(walk(ch) for ch in children)
+        return 1
+    return sum(walk(q) for q in (struct.get('questions') or []))
+
+
+def backfill_aggregates(apps, schema_editor):
+    TAExerciseSession = apps.get_model('teachers_assistants_dash', 'TAExerciseSession')
+    TAExerciseSessionSubmission = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+    totals = {
+        row['session_id']: row
+        for row in TAExerciseSessionSubmission.objects.values('session_id').annotate(
+            n=Count('id'), checks=Sum('total_checked_count')
+        )
+    }
+    for sess in TAExerciseSession.objects.all():
+        row = totals.get(sess.id) or {}
+        sess.checkable_count = _count_leaves(sess.structure_json or {})
+        sess.submissions_count = row.get('n') or 0
+        sess.total_checks = row.get('checks') or 0
+        sess.save(update_fields=['checkable_count', 'submissions_count', 'total_checks'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0009_taexercisesessionsubmission_teachers_as_session_2a2a3e_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='checkable_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='submissions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='total_checks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
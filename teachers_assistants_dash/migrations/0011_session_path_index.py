@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+def _leaf_paths(struct):
+    # Lenient flatten of legacy structures; the stricter compiler only applies to new edits
+    paths = []
+    def walk(node, prefix):
+        label = str(node.get('label') or '')
+        current = f'{prefix}.{label}' if prefix else label
+        children = node.get('children') or []
+        if children:
+            for ch in children:
+                walk(ch, current)
+        elif current not in paths:
+            paths.append(current)
+    for q in (struct.get('questions') or []):
+        walk(q, '')
+    return paths
+
+
+def build_path_index(apps, schema_editor):
+    TAExerciseSession = apps.get_model('teachers_assistants_dash', 'TAExerciseSession')
+    TAExerciseSessionSubmission = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+    for sess in TAExerciseSession.objects.all():
+        index = [{'id': i, 'path': p} for i, p in enumerate(_leaf_paths(sess.structure_json or {}), start=1)]
+        sess.path_index = index
+        sess.next_path_id = len(index) + 1
+        sess.checkable_count = len(index)
+        sess.save(update_fields=['path_index', 'next_path_id', 'checkable_count'])
+        by_path = {p['path']: p['id'] for p in index}
+        subs = list(TAExerciseSessionSubmission.objects.filter(session=sess))
+        for sub in subs:
+            picked = {by_path[a] for a in (sub.answers_json or []) if isinstance(a, str) and a in by_path}
+            sub.answer_ids = [p['id'] for p in index if p['id'] in picked]
+        TAExerciseSessionSubmission.objects.bulk_update(subs, ['answer_ids'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0010_taexercisesession_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='next_path_id',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='path_index',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='taexercisesessionsubmission',
+            name='answer_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(build_path_index, migrations.RunPython.noop),
+    ]
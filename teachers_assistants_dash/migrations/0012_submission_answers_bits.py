@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+def ids_to_bits(apps, schema_editor):
+    TAExerciseSessionSubmission = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+    subs = list(TAExerciseSessionSubmission.objects.only('id', 'answer_ids'))
+    for sub in subs:
+        value = 0
+        for i in sub.answer_ids or []:
+            value |= 1 << i
+        sub.answers_bits = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+    TAExerciseSessionSubmission.objects.bulk_update(subs, ['answers_bits'], batch_size=500)
+
+
+def bits_to_ids(apps, schema_editor):
+    TAExerciseSessionSubmission = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+    subs = list(TAExerciseSessionSubmission.objects.select_related('session'))
+    for sub in subs:
+        value = int.from_bytes(bytes(sub.answers_bits or b''), 'little')
+        picked = {i for i in range(value.bit_length()) if (value >> i) & 1}
+        index = [p for p in (sub.session.path_index or []) if p['id'] in picked]
+        sub.answer_ids = [p['id'] for p in index]
+        sub.answers_json = [p['path'] for p in index]
+    TAExerciseSessionSubmission.objects.bulk_update(subs, ['answer_ids', 'answers_json'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0011_session_path_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taexercisesessionsubmission',
+            name='answers_bits',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(ids_to_bits, bits_to_ids),
+        migrations.RemoveField(
+            model_name='taexercisesessionsubmission',
+            name='answer_ids',
+        ),
+        migrations.RemoveField(
+            model_name='taexercisesessionsubmission',
+            name='answers_json',
+        ),
+    ]
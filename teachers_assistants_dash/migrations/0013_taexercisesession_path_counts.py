@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+def backfill_path_counts(apps, schema_editor):
+    TAExerciseSession = apps.get_model('teachers_assistants_dash', 'TAExerciseSession')
+    TAExerciseSessionSubmission = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+    counts = {}
+    for session_id, bits in TAExerciseSessionSubmission.objects.values_list('session_id', 'answers_bits').iterator():
+        value = int.from_bytes(bytes(bits or b''), 'little')
+        row = counts.setdefault(session_id, {})
+        for i in range(value.bit_length()):
+            if (value >> i) & 1:
+                row[str(i)] = row.get(str(i), 0) + 1
+    for session_id, row in counts.items():
+        TAExerciseSession.objects.filter(pk=session_id).update(path_counts=row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0012_submission_answers_bits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='path_counts',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(backfill_path_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0013_taexercisesession_path_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taexercisesessionsubmission',
+            name='evidence_preview',
+            field=models.FileField(blank=True, null=True, upload_to='evidence/%Y/%m/%d/'),
+        ),
+        migrations.AddField(
+            model_name='taexercisesessionsubmission',
+            name='evidence_thumbnail',
+            field=models.FileField(blank=True, null=True, upload_to='evidence/%Y/%m/%d/'),
+        ),
+    ]
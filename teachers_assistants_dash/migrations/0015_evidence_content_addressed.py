@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+import students_dash.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0014_submission_evidence_previews'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taexercisesessionsubmission',
+            name='evidence_file',
+            field=models.FileField(blank=True, null=True, storage=students_dash.storage.evidence_storage, upload_to='evidence/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='taexercisesessionsubmission',
+            name='evidence_preview',
+            field=models.FileField(blank=True, null=True, storage=students_dash.storage.evidence_storage, upload_to='evidence/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='taexercisesessionsubmission',
+            name='evidence_thumbnail',
+            field=models.FileField(blank=True, null=True, storage=students_dash.storage.evidence_storage, upload_to='evidence/%Y/%m/%d/'),
+        ),
+    ]
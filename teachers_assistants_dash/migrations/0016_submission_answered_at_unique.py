@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def drop_duplicate_submissions(apps, schema_editor):
+    # Concurrent spool flushes could create two rows for one student; keep the newest and
+    # recompute the aggregates of the sessions involved before the constraint goes on
+    TAExerciseSession = apps.get_model('teachers_assistants_dash', 'TAExerciseSession')
+    TAExerciseSessionSubmission = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+    dupes = (TAExerciseSessionSubmission.objects.values('session_id', 'student_id')
+             .annotate(n=Count('id')).filter(n__gt=1))
+    sessions = set()
+    for row in dupes:
+        rows = TAExerciseSessionSubmission.objects.filter(
+            session_id=row['session_id'], student_id=row['student_id']
+        ).order_by('-updated_at', '-id')
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        sessions.add(row['session_id'])
+    for session_id in sessions:
+        subs = TAExerciseSessionSubmission.objects.filter(session_id=session_id)
+        totals = subs.aggregate(n=Count('id'), checks=Sum('total_checked_count'))
+        counts = {}
+        for bits in subs.values_list('answers_bits', flat=True):
+            value = int.from_bytes(bytes(bits or b''), 'little')
+            for i in range(value.bit_length()):
+                if (value >> i) & 1:
+                    counts[str(i)] = counts.get(str(i), 0) + 1
+        TAExerciseSession.objects.filter(pk=session_id).update(
+            submissions_count=totals['n'], total_checks=totals['checks'] or 0, path_counts=counts,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0015_evidence_content_addressed'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='taexercisesessionsubmission',
+            name='teachers_as_session_d3ec20_idx',
+        ),
+        migrations.AddField(
+            model_name='taexercisesessionsubmission',
+            name='answered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(drop_duplicate_submissions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taexercisesessionsubmission',
+            constraint=models.UniqueConstraint(fields=('session', 'student_id'), name='ta_submission_session_student_uniq'),
+        ),
+    ]
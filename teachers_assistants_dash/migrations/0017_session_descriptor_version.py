@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers_assistants_dash', '0016_submission_answered_at_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taexercisesession',
+            name='descriptor_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from . import bitset
+from .structure import labels_for
+from students_dash.storage import evidence_storage
 
 class TeachingAssistant(models.Model):
     # Global assistant directory (no course FK)
@@ -41,10 +44,19 @@ class TAExerciseSession(models.Model):
     title = models.CharField(max_length=200, blank=True)
     time_limit_minutes = models.PositiveIntegerField(default=0)
     structure_json = models.JSONField(default=dict)
+    # Flattened checkable paths [{"id", "path"}] compiled from structure_json (see structure.py)
+    path_index = models.JSONField(default=list)
+    next_path_id = models.PositiveIntegerField(default=1)
+    descriptor_version = models.PositiveIntegerField(default=0)  # bumped when the public form changes (descriptor.py)
     status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='draft')
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     ended_at = models.DateTimeField(null=True, blank=True)
+    # Maintained aggregates so the live metrics poll is a single row read
+    checkable_count = models.PositiveIntegerField(default=0)
+    submissions_count = models.PositiveIntegerField(default=0)
+    total_checks = models.PositiveIntegerField(default=0)
+    path_counts = models.JSONField(default=dict)  # {"<path id>": submissions with that path checked}
 
     def __str__(self):
         return f'{self.slug} — {self.course.title} ({self.assistant.name})'
@@ -53,14 +65,19 @@ class TAExerciseSessionSubmission(models.Model):
     session = models.ForeignKey('teachers_assistants_dash.TAExerciseSession', on_delete=models.CASCADE, related_name='submissions')
     student_id = models.CharField(max_length=50)
     student_name = models.CharField(max_length=150)
-    answers_json = models.JSONField(default=list)
+    answers_bits = models.BinaryField(default=b'')  # bitset over the session's path ids (see bitset.py)
     total_checked_count = models.PositiveIntegerField(default=0)
     group_index = models.PositiveIntegerField(null=True, blank=True)
     score = models.IntegerField(null=True, blank=True)
+    # When the current answers were received; updated_at also moves on evidence/grade changes
+    answered_at = models.DateTimeField(null=True, blank=True)
     evidence_requested_at = models.DateTimeField(null=True, blank=True)
     evidence_received_at = models.DateTimeField(null=True, blank=True)
     # New: stored evidence and teacher review state
-    evidence_file = models.FileField(upload_to='evidence/%Y/%m/%d/', null=True, blank=True)
+    evidence_file = models.FileField(upload_to='evidence/%Y/%m/%d/', storage=evidence_storage, null=True, blank=True)
+    # Content-addressed blobs (students_dash.storage); previews are built by students_dash.previews
+    evidence_preview = models.FileField(upload_to='evidence/%Y/%m/%d/', storage=evidence_storage, null=True, blank=True)
+    evidence_thumbnail = models.FileField(upload_to='evidence/%Y/%m/%d/', storage=evidence_storage, null=True, blank=True)
     evidence_decision = models.CharField(max_length=12, blank=True)  # 'accepted' | 'declined'
     evidence_reviewed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -68,8 +85,18 @@ class TAExerciseSessionSubmission(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=['session', 'student_id']),
+            models.Index(fields=['session', 'updated_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'student_id'], name='ta_submission_session_student_uniq'),
+        ]
+
+    @property
+    def answer_ids(self):
+        return bitset.decode(self.answers_bits)
+
+    def answer_labels(self, path_index):
+        return labels_for(path_index, self.answer_ids)
 
     def __str__(self):
-        return f'{self.student_name} — {self.session.slug}'
\ No newline at end of file
+        return f'{self.student_name} — {self.session.slug}'
@@ -0,0 +1,27 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import TeachingAssistant, TAExerciseSessionSubmission
+from .submissions import forget_submission
+from . import feed, identity
+
+@receiver(post_save, sender=TAExerciseSessionSubmission)
+def submission_saved(sender, instance, **kwargs):
+    feed.bump(instance.session_id)
+
+@receiver(post_delete, sender=TAExerciseSessionSubmission)
+def submission_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting a session (or its course / assistant) takes the aggregates with it
+    if getattr(origin, 'model', type(origin)) is TAExerciseSessionSubmission:
+        forget_submission(instance)
+        feed.bump(instance.session_id)
+
+@receiver(pre_save, sender=TeachingAssistant)
+def assistant_saving(sender, instance, **kwargs):
+    # Cache keys of the identifiers this save may replace (a new code, email or user_id)
+    old = TeachingAssistant.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_identity_keys = identity.keys_for(old) if old else []
+
+@receiver(post_save, sender=TeachingAssistant)
+@receiver(post_delete, sender=TeachingAssistant)
+def assistant_changed(sender, instance, **kwargs):
+    identity.forget(instance, getattr(instance, '_previous_identity_keys', ()))
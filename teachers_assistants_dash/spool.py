@@ -0,0 +1,310 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import TAExerciseSession
+from .structure import labels_for, resolve_answers
+from .submissions import record_submission_batch
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no orphan replay, spools are still flushed by their owner
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Write-behind queue for public submissions (SUBMISSION_WRITE_BEHIND).
+# A submission is appended to this process's spool file and fsynced, acknowledged with a
+# receipt id, and written to the database by a background thread in batched transactions
+# every SUBMISSION_SPOOL_FLUSH_SECONDS. Each process owns its own segment files and holds
+# an flock on them; segments left behind by a dead process are replayed by the next
+# flusher that starts. Until a row is flushed, pending() lets the TA feed show it, read
+# from this process's queue and from the live segments of the other workers.
+# Writing an entry twice is harmless (record_submission_batch skips answers that are not
+# newer than the stored ones), so closing a session also writes the entries still queued
+# in other workers' live segments; SUBMISSION_SPOOL_DIR must be shared by all workers.
+
+
+class SubmissionSpool:
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}  # (session_id, student key) -> latest record
+        self._flush_lock = threading.Lock()  # keeps batches landing in the order they were taken
+        self._segment = None
+        self._segment_path = None
+        self._old_segments = []
+        self._thread = None
+        self._pid = None
+
+    # Writing
+
+    def enqueue(self, sess, student, answer_ids):
+        record = {
+            'receipt': uuid.uuid4().hex,
+            'session_id': sess.id,
+            'student_id': student.student_id,
+            'student_name': student.name,
+            'answer_ids': answer_ids,
+            'answers': labels_for(sess.path_index, answer_ids),
+            'received_at': timezone.now().isoformat(),
+        }
+        with self._lock:
+            self._ensure_started()
+            line = json.dumps(record) + '\n'
+            self._segment.write(line)
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._pending[(sess.id, student.student_id.lower())] = record
+        return record['receipt']
+
+    def pending(self, session_id):
+        # The latest queued entry per student, whichever worker holds it
+        with self._lock:
+            latest = {key: r for (sid, key), r in self._pending.items() if sid == session_id}
+        for key, record in self._queued_elsewhere(session_id).items():
+            if key not in latest or _is_newer(record, latest[key]):
+                latest[key] = record
+        return list(latest.values())
+
+    def pending_version(self, session_id):
+        # Changes whenever this session's queued entries change: every enqueue gets a new
+        # receipt, and a flush (by any worker) drops its entries from the set
+        receipts = sorted(r['receipt'] for r in self.pending(session_id))
+        return hashlib.sha1(' '.join(receipts).encode()).hexdigest()[:16] if receipts else ''
+
+    def flush_session(self, sess):
+        # Write this process's queue, then the entries for this session still queued in the
+        # segments of other live workers, so grading/closing sees every acknowledged answer
+        self.flush_now()
+        latest = self._queued_elsewhere(sess.id)
+        if not latest:
+            return 0
+        with transaction.atomic():
+            return record_submission_batch(sess, [_batch_entry(sess, r) for r in latest.values()])
+
+    def flush_now(self):
+        # Synchronously write everything queued so far (used before grading/closing a session)
+        with self._lock:
+            if self._thread is None:
+                return 0
+        return self._flush()
+
+    # Internals
+
+    def _queued_elsewhere(self, session_id):
+        # Latest entry per student for the session in the segments other than the one this
+        # process is writing: other live workers' (and ours while a flush is in progress)
+        latest = {}
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.jsonl'))):
+            if path == self._segment_path:
+                continue
+            for record in _read_segment(path):
+                key = record['student_id'].lower()
+                if record.get('session_id') == session_id and (key not in latest or _is_newer(record, latest[key])):
+                    latest[key] = record
+        return latest
+
+    def _ensure_started(self):
+        # Called with the lock held; (re)starts after fork since threads and flocks don't survive it
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._pending = {}
+        self._old_segments = []
+        self._segment = self._segment_path = None  # a forked parent's segment is not ours
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name='submission-spool', daemon=True)
+        self._thread.start()
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex}.jsonl')
+        fh = open(path, 'a', encoding='utf-8')
+        if fcntl:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if self._segment is not None and self._segment_path:
+            self._old_segments.append((self._segment, self._segment_path))
+        self._segment, self._segment_path = fh, path
+
+    def _run(self):
+        self._replay_orphans()
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                close_old_connections()  # this thread never sees request_finished
+                self._flush()
+            except Exception:
+                logger.exception('Submission spool flush failed; will retry')
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = {}
+                self._open_segment()  # new writes go to a fresh segment
+                done_segments = self._old_segments
+                self._old_segments = []
+            try:
+                written = self._write(batch.values())
+            except Exception:
+                with self._lock:
+                    # Keep anything not superseded meanwhile; the old segments stay until it lands
+                    for key, record in batch.items():
+                        self._pending.setdefault(key, record)
+                    self._old_segments = done_segments + self._old_segments
+                raise
+            for fh, path in done_segments:
+                fh.close()
+                _remove(path)
+            return written
+
+    def _write(self, records):
+        by_session = {}
+        for record in records:
+            by_session.setdefault(record['session_id'], []).append(record)
+        written = 0
+        with transaction.atomic():
+            sessions = TAExerciseSession.objects.in_bulk(list(by_session))
+            for session_id, rows in by_session.items():
+                sess = sessions.get(session_id)
+                if sess is None:
+                    logger.warning('Dropping %d spooled submissions for deleted session %s', len(rows), session_id)
+                    continue
+                written += record_submission_batch(sess, [_batch_entry(sess, r) for r in rows])
+        return written
+
+    def _replay_orphans(self):
+        if not fcntl:
+            return
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.jsonl'))):
+            if path == self._segment_path:
+                continue
+            try:
+                fh = open(path, 'r', encoding='utf-8')
+            except OSError:
+                continue
+            try:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # still owned by a live process
+                latest = {}
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash mid-write
+                    latest[(record['session_id'], record['student_id'].lower())] = record
+                if latest:
+                    self._write(latest.values())
+                    logger.info('Replayed %d spooled submissions from %s', len(latest), path)
+                _remove(path)
+            except Exception:
+                logger.exception('Could not replay submission spool %s', path)
+            finally:
+                fh.close()
+
+
+def _read_segment(path):
+    # Records of a segment file; a torn final line (crash or a write in progress) is skipped
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            lines = fh.readlines()
+    except OSError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def _is_newer(record, other):
+    return parse_datetime(record['received_at']) >= parse_datetime(other['received_at'])
+
+
+def _batch_entry(sess, record):
+    return (record['student_id'], record['student_name'], _answer_ids(sess, record), parse_datetime(record['received_at']))
+
+
+def _answer_ids(sess, record):
+    # Segments written before path ids existed only carry labels
+    if 'answer_ids' in record:
+        return record['answer_ids']
+    return resolve_answers(sess.path_index, record.get('answers') or [], strict=False)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+def get_spool():
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = SubmissionSpool(settings.SUBMISSION_SPOOL_DIR, settings.SUBMISSION_SPOOL_FLUSH_SECONDS)
+        return _spool
+
+def enabled():
+    return settings.SUBMISSION_WRITE_BEHIND
+
+def pending_payloads(session_id):
+    # Queued-but-unflushed submissions of all workers, shaped like _submission_payload rows
+    if not enabled():
+        return []
+    return [{
+        'id': None,
+        'student_id': r['student_id'],
+        'student_name': r['student_name'],
+        'answers': r['answers'],
+        'answer_ids': r['answer_ids'],
+        'total_checked_count': len(r['answers']),
+        'submitted_at': r['received_at'],
+        'score': None,
+        'group_index': None,
+        'evidence_requested_at': None,
+        'evidence_received_at': None,
+        'evidence_url': None,
+        'evidence_preview_url': None,
+        'evidence_thumbnail_url': None,
+        'evidence_decision': '',
+        'evidence_reviewed_at': None,
+        'pending': True,
+        'receipt': r['receipt'],
+    } for r in get_spool().pending(session_id)]
+
+def pending_version(session_id):
+    if not enabled():
+        return ''
+    return get_spool().pending_version(session_id)
+
+def flush():
+    if enabled():
+        get_spool().flush_now()
+
+def flush_session(sess):
+    if enabled():
+        get_spool().flush_session(sess)
@@ -0,0 +1,120 @@
+import string
+
+# Session form structures.
+# A structure is {"questions": [{"label": "Q1", "children": [{"label": "a"}, ...]}, ...]};
+# every leaf is a checkable path such as "Q1.a". compile_structure() validates a tree
+# sent by a client and flattens it into a path index, [{"id": 3, "path": "Q1.a"}, ...],
+# which is stored on the session so readers never walk the tree again. Path ids are
+# stable: recompiling keeps the id of every path that still exists and hands out new
+# ids from the session's next_path_id. Answers are stored as these ids.
+
+MAX_DEPTH = 4
+MAX_NODES = 1000
+MAX_LEAVES = 400
+MAX_CHILDREN = 100
+MAX_LABEL_LENGTH = 32
+
+
+class StructureError(ValueError):
+    pass
+
+
+def from_counts(q_count, subparts_same_count=None):
+    def q_label(i): return f"Q{i}"
+    def sub_label(idx):
+        # a..z, then a1..z1, a2..z2, ...
+        base = string.ascii_lowercase
+        if idx < 26:
+            return base[idx]
+        times = (idx // 26)
+        rem = idx % 26
+        return f"{base[rem]}{times}"
+    questions = []
+    for i in range(1, q_count + 1):
+        node = {'label': q_label(i)}
+        if isinstance(subparts_same_count, int) and subparts_same_count > 0:
+            node['children'] = [{'label': sub_label(s)} for s in range(subparts_same_count)]
+        questions.append(node)
+    return {'questions': questions}
+
+
+def compile_structure(struct, previous_index=None, next_id=1):
+    # Returns (clean_structure, path_index, next_id). Raises StructureError for trees
+    # that are malformed or exceed the limits above; unknown keys are dropped.
+    if not isinstance(struct, dict) or not isinstance(struct.get('questions', []), list):
+        raise StructureError('structure must be an object with a "questions" list')
+    known = {p['path']: p['id'] for p in (previous_index or [])}
+    index = []
+    count = 0
+
+    def clean(nodes, prefix, depth):
+        nonlocal count, next_id
+        if depth > MAX_DEPTH:
+            raise StructureError(f'structure is nested deeper than {MAX_DEPTH} levels')
+        if len(nodes) > MAX_CHILDREN:
+            raise StructureError(f'a level may have at most {MAX_CHILDREN} entries')
+        out = []
+        seen = set()
+        for node in nodes:
+            if not isinstance(node, dict):
+                raise StructureError('structure entries must be objects')
+            label = str(node.get('label') or '').strip()
+            if not label:
+                raise StructureError('every entry needs a label')
+            if len(label) > MAX_LABEL_LENGTH or '.' in label:
+                raise StructureError(f'invalid label "{label[:MAX_LABEL_LENGTH]}" (max {MAX_LABEL_LENGTH} characters, no ".")')
+            if label in seen:
+                raise StructureError(f'duplicate label "{label}"' + (f' under {prefix}' if prefix else ''))
+            seen.add(label)
+            count += 1
+            if count > MAX_NODES:
+                raise StructureError(f'structure has more than {MAX_NODES} entries')
+            path = f'{prefix}.{label}' if prefix else label
+            children = node.get('children') or []
+            if not isinstance(children, list):
+                raise StructureError(f'children of {path} must be a list')
+            if children:
+                out.append({'label': label, 'children': clean(children, path, depth + 1)})
+                continue
+            pid = known.get(path)
+            if pid is None:
+                pid = next_id
+                next_id += 1
+            index.append({'id': pid, 'path': path})
+            if len(index) > MAX_LEAVES:
+                raise StructureError(f'structure has more than {MAX_LEAVES} checkable parts')
+            out.append({'label': label})
+        return out
+
+    questions = clean(struct.get('questions') or [], '', 1)
+    return {'questions': questions}, index, next_id
+
+
+def paths(index):
+    return [p['path'] for p in index or []]
+
+
+def resolve_answers(index, answers, strict=True):
+    # Map submitted answers (path strings or path ids) to ids in index order, dropping
+    # duplicates. Unknown entries raise StructureError, or are skipped when not strict.
+    by_path = {p['path']: p['id'] for p in index or []}
+    valid_ids = set(by_path.values())
+    picked = set()
+    unknown = []
+    for answer in answers:
+        if isinstance(answer, int) and not isinstance(answer, bool):
+            pid = answer if answer in valid_ids else None
+        else:
+            pid = by_path.get(str(answer).strip())
+        if pid is None:
+            unknown.append(str(answer))
+        else:
+            picked.add(pid)
+    if unknown and strict:
+        raise StructureError('Unknown answer(s): ' + ', '.join(unknown[:5]) + '. Reload the form and try again.')
+    return [p['id'] for p in index if p['id'] in picked]
+
+
+def labels_for(index, ids):
+    picked = set(ids)
+    return [p['path'] for p in index or [] if p['id'] in picked]
@@ -1,3 +1,627 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import profiling
+from core.testing import FixtureTestCase
+from students_dash.models import Student
+from . import bitset, descriptor, identity, spool
+from .identity import resolve_assistant
+from .models import TAExerciseSession, TAExerciseSessionSubmission, TeachingAssistant
+from .structure import StructureError, compile_structure, from_counts, labels_for, resolve_answers
+from .submissions import record_submission, record_submission_batch
+
+
+class StructureTests(SimpleTestCase):
+    def test_rejects_bad_labels(self):
+        for label in ('', '   ', 'Q1.a', 'x' * 33):
+            with self.subTest(label=label), self.assertRaises(StructureError):
+                compile_structure({'questions': [{'label': label}]})
+        with self.assertRaisesMessage(StructureError, 'duplicate label "a" under Q1'):
+            compile_structure({'questions': [{'label': 'Q1', 'children': [{'label': 'a'}, {'label': 'a'}]}]})
+        with self.assertRaises(StructureError):
+            compile_structure({'questions': 'Q1'})
+
+    def test_ids_survive_edits(self):
+        _, index, next_id = compile_structure(from_counts(2, 2))
+        self.assertEqual([(p['id'], p['path']) for p in index], [(1, 'Q1.a'), (2, 'Q1.b'), (3, 'Q2.a'), (4, 'Q2.b')])
+        # Drop Q1.b, add Q3: kept paths keep their ids, new ones continue from next_id
+        edited = {'questions': [{'label': 'Q1', 'children': [{'label': 'a'}]}, *from_counts(2, 2)['questions'][1:], {'label': 'Q3'}]}
+        _, index, next_id = compile_structure(edited, index, next_id)
+        self.assertEqual([(p['id'], p['path']) for p in index], [(1, 'Q1.a'), (3, 'Q2.a'), (4, 'Q2.b'), (5, 'Q3')])
+        self.assertEqual(next_id, 6)
+
+    def test_resolve_answers(self):
+        _, index, _ = compile_structure(from_counts(2, 2))
+        # paths or ids, duplicates dropped, returned in index order
+        self.assertEqual(resolve_answers(index, ['Q2.a', 1, 'Q1.a', 3]), [1, 3])
+        with self.assertRaisesMessage(StructureError, 'Unknown answer(s): Q9, 7'):
+            resolve_answers(index, ['Q1.a', 'Q9', 7])
+        self.assertEqual(resolve_answers(index, ['Q1.a', 'Q9', True], strict=False), [1])
+        self.assertEqual(labels_for(index, [4, 1]), ['Q1.a', 'Q2.b'])
+
+
+class BitsetTests(SimpleTestCase):
+    def test_round_trip(self):
+        for ids in ([], [0], [1, 4], [7, 8], list(range(1, 400, 3))):
+            with self.subTest(ids=ids[:5]):
+                bits = bitset.encode(ids)
+                self.assertEqual(bitset.decode(bits), ids)
+                self.assertEqual(bitset.decode(memoryview(bits)), ids)  # as BinaryField may return it
+                self.assertEqual(bitset.count(bits), len(ids))
+        self.assertEqual(bitset.encode([]), b'')
+        self.assertEqual(bitset.encode([1, 1, 9]), b'\x02\x02')
+        self.assertEqual(bitset.decode(None), [])
+
+    def test_column_counts_with_and_without_numpy(self):
+        blobs = [bitset.encode([1, 2]), bitset.encode([2, 30]), b'', None, bitset.encode([1, 64])]
+        expected = {1: 2, 2: 2, 3: 0, 30: 1, 64: 1, 99: 0}
+        self.assertEqual(bitset.column_counts(blobs, list(expected)), expected)
+        with mock.patch.object(bitset, 'np', None):
+            self.assertEqual(bitset.column_counts(blobs, list(expected)), expected)
+        self.assertEqual(bitset.column_counts(blobs, []), {})
+
+
+class MigrationTestCase(TransactionTestCase):
+    # Migrates teachers_assistants_dash back to migrate_from for the test, then forward again
+    migrate_from = None
+
+    def setUp(self):
+        super().setUp()
+        self.apps = self.migrate(self.migrate_from)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def migrate(self, name):
+        target = [('teachers_assistants_dash', name)]
+        executor = MigrationExecutor(connection)
+        executor.migrate(target)
+        return executor.loader.project_state(target).apps
+
+    def make_session(self, structure):
+        Teacher = self.apps.get_model('teachers_dash', 'Teacher')
+        Course = self.apps.get_model('teachers_dash', 'Course')
+        TeachingAssistant = self.apps.get_model('teachers_assistants_dash', 'TeachingAssistant')
+        TAExerciseSession = self.apps.get_model('teachers_assistants_dash', 'TAExerciseSession')
+        teacher = Teacher.objects.create(first_name='Ada', last_name='Lovelace', special_code='T-1', email='ada@example.com')
+        course = Course.objects.create(teacher=teacher, title='Algebra', description='d')
+        assistant = TeachingAssistant.objects.create(name='Tim', special_code='TA-1')
+        return TAExerciseSession.objects.create(slug='algebra-1', assistant=assistant, course=course, structure_json=structure)
+
+
+class PathIndexMigrationTests(MigrationTestCase):
+    migrate_from = '0010_taexercisesession_aggregates'
+
+    def test_builds_path_index_and_maps_answers(self):
+        sess = self.make_session(from_counts(2, 2))
+        Submission = self.apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+        Submission.objects.create(session=sess, student_id='S1', student_name='One', answers_json=['Q2.b', 'Q1.a', 'Q9', 'Q1.a'])
+
+        apps = self.migrate('0011_session_path_index')
+        sess = apps.get_model('teachers_assistants_dash', 'TAExerciseSession').objects.get(pk=sess.pk)
+        self.assertEqual([p['path'] for p in sess.path_index], ['Q1.a', 'Q1.b', 'Q2.a', 'Q2.b'])
+        self.assertEqual((sess.next_path_id, sess.checkable_count), (5, 4))
+        sub = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission').objects.get()
+        self.assertEqual(sub.answer_ids, [1, 4])  # unknown labels and duplicates dropped
+
+
+class AnswerBitsMigrationTests(MigrationTestCase):
+    migrate_from = '0011_session_path_index'
+
+    def test_ids_become_bits_and_back(self):
+        sess = self.make_session(from_counts(2, 2))
+        _, index, next_id = compile_structure(from_counts(2, 2))
+        sess.path_index, sess.next_path_id = index, next_id
+        sess.save()
+        Submission = self.apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission')
+        Submission.objects.create(session=sess, student_id='S1', student_name='One', answer_ids=[1, 4])
+        Submission.objects.create(session=sess, student_id='S2', student_name='Two', answer_ids=[])
+
+        apps = self.migrate('0012_submission_answers_bits')
+        bits = dict(apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission').objects.values_list('student_id', 'answers_bits'))
+        self.assertEqual(bitset.decode(bits['S1']), [1, 4])
+        self.assertEqual(bytes(bits['S2']), b'')
+
+        apps = self.migrate('0011_session_path_index')
+        rows = apps.get_model('teachers_assistants_dash', 'TAExerciseSessionSubmission').objects.order_by('student_id')
+        self.assertEqual([(r.answer_ids, r.answers_json) for r in rows], [([1, 4], ['Q1.a', 'Q2.b']), ([], [])])
+
+
+class AssistantListingQueryCountTests(FixtureTestCase):
+    def _add_course(self, title, exercises):
+        self.make_course(title, exercises, questions=lambda i: i % 3 + 1, assign=True)
+
+    def _fetch(self, name):
+        return self.post_json(name, {'assistant_code': 'TA-1'}).json()['courses']
+
+    def _assert_constant(self, name):
+        self._add_course('Algebra', 1)
+        self._fetch(name)  # warm the assistant identity cache
+        # links with courses and teachers, exercises with annotated question counts
+        with self.assertNumQueries(2):
+            small = self._fetch(name)
+
+        self._add_course('Biology', 12)
+        self._add_course('Chemistry', 12)
+        with self.assertNumQueries(2):
+            large = self._fetch(name)
+
+        self.assertEqual(len(small), 1)
+        self.assertEqual(len(large), 3)
+        return large
+
+    def test_exercises_query_count_is_constant(self):
+        courses = self._assert_constant('ta_api_exercises')
+        counts = {c['course']['title']: [e['questions_count'] for e in c['exercises']] for c in courses}
+        self.assertEqual(counts['Biology'], [(i % 3) + 1 for i in reversed(range(12))])
+
+    def test_courses_assigned_query_count_is_constant(self):
+        courses = self._assert_constant('ta_api_courses_assigned')
+        self.assertEqual([c['title'] for c in courses], ['Algebra', 'Biology', 'Chemistry'])
+        self.assertEqual(sum(e['questions_count'] for e in courses[2]['exercises']), 24)
+
+
+class AssistantIdentityTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = TeachingAssistant.objects.create(
+            name='Ida', special_code='TA-2', user_id='sb-ida', email='ida@example.com')
+
+    def test_identifiers_are_tried_in_priority_order(self):
+        self.assertEqual(resolve_assistant(assistant_code='TA-1', user_id='sb-ida'), self.assistant)
+        self.assertEqual(resolve_assistant(assistant_id=self.other.pk, assistant_code='TA-1'), self.other)
+        self.assertEqual(resolve_assistant(assistant_code='TA-9', email='ida@example.com'), self.other)
+        self.assertIsNone(resolve_assistant(assistant_code='TA-9'))
+
+    def test_one_query_then_cache_and_request_memo(self):
+        with self.assertNumQueries(1):
+            ta = resolve_assistant(assistant_code='TA-2', user_id='sb-ida', email='ida@example.com')
+        self.assertEqual(ta, self.other)
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_assistant(request, assistant_code='TA-2'), self.other)
+        with mock.patch.object(identity.cache, 'get') as get:
+            self.assertEqual(resolve_assistant(request, assistant_code='TA-2'), self.other)
+        get.assert_not_called()
+
+    def test_renamed_identifiers_stop_resolving(self):
+        for field, value in (('special_code', 'TA-2'), ('user_id', 'sb-ida'), ('email', 'ida@example.com')):
+            lookup = {'special_code': 'assistant_code'}.get(field, field)
+            self.assertEqual(resolve_assistant(**{lookup: value}), self.other)
+            setattr(self.other, field, f'new-{value}')
+            self.other.save()
+            self.assertIsNone(resolve_assistant(**{lookup: value}))
+            self.assertEqual(resolve_assistant(**{lookup: f'new-{value}'}).pk, self.other.pk)
+
+    def test_deleted_assistant_stops_resolving(self):
+        self.assertEqual(resolve_assistant(email='ida@example.com'), self.other)
+        self.other.delete()
+        self.assertIsNone(resolve_assistant(email='ida@example.com'))
+
+
+class StreamingSubmissionListTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sess = self.make_session(self.make_course(), slug='algebra-1', questions=2)
+        for i in range(3):
+            record_submission(self.sess, self.make_student(f'S{i}'), [1])
+        profiling.reset()
+        self.addCleanup(profiling.reset)
+
+    def _queries(self):
+        return profiling.snapshot()[('ta_api_session_submissions', 'POST')]['queries']
+
+    def test_queries_run_while_streaming_are_profiled(self):
+        resp = self.post_json('ta_api_session_submissions', {'slug': 'algebra-1'})
+        self.assertEqual(profiling.snapshot(), {})  # recorded once the body has been sent
+        body = json.loads(b''.join(resp.streaming_content))
+        self.assertEqual(len(body['submissions']), 3)
+        # session, ETag aggregate, then the rows read by the body
+        self.assertEqual(self._queries(), 3)
+
+    async def test_asgi_body_is_streamed_asynchronously(self):
+        resp = await self.async_client.post(
+            reverse('ta_api_session_submissions'), json.dumps({'slug': 'algebra-1'}), content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        body = json.loads(b''.join([part async for part in resp]))
+        self.assertEqual([s['student_id'] for s in body['submissions']], ['S2', 'S1', 'S0'])
+        self.assertEqual(await sync_to_async(self._queries)(), 3)
+
+    def _list(self, status=200, etag=None, **payload):
+        extra = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        resp = self.post_json('ta_api_session_submissions', {'slug': 'algebra-1', **payload}, status=status, **extra)
+        body = json.loads(b''.join(resp.streaming_content)) if status == 200 else None
+        return resp, body
+
+    @override_settings(SESSION_FEED_OVERLAP_SECONDS=0)
+    def test_since_returns_only_changed_rows(self):
+        _, first = self._list()
+        self.assertTrue(first['full'])
+        _, body = self._list(since=first['cursor'])
+        self.assertEqual((body['submissions'], body['cursor'], body['full']), ([], first['cursor'], False))
+
+        record_submission(self.sess, Student.objects.get(student_id='S0'), [2])
+        _, body = self._list(since=first['cursor'])
+        self.assertEqual([(s['student_id'], s['answers']) for s in body['submissions']], [('S0', ['Q2'])])
+        self.assertNotEqual(body['cursor'], first['cursor'])
+        self._list(status=400, since='not-a-cursor')
+
+    def test_etag_answers_not_modified_until_something_changes(self):
+        resp, _ = self._list()
+        etag = resp['ETag']
+        resp, _ = self._list(status=304, etag=etag)
+        self.assertEqual(resp['ETag'], etag)
+
+        record_submission(self.sess, Student.objects.get(student_id='S1'), [2])
+        resp, _ = self._list(etag=etag)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    @override_settings(SUBMISSION_WRITE_BEHIND=True)
+    def test_etag_moves_with_queued_submissions(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        worker = spool.SubmissionSpool(directory, flush_seconds=3600)
+        self.enterContext(mock.patch.object(spool, '_spool', worker))
+        resp, _ = self._list()
+        etag = resp['ETag']
+
+        worker.enqueue(self.sess, Student.objects.get(student_id='S0'), [2])
+        resp, body = self._list(etag=etag)
+        queued = resp['ETag']
+        self.assertNotEqual(queued, etag)
+        s0 = [s for s in body['submissions'] if s['student_id'] == 'S0']
+        self.assertEqual([(s['answers'], s.get('pending')) for s in s0], [(['Q2'], True)])  # replaces the stored row
+
+        worker.flush_now()
+        resp, _ = self._list(etag=queued)
+        self.assertNotEqual(resp['ETag'], queued)
+
+
+@override_settings(SESSION_STREAM_SECONDS=0, SESSION_STREAM_POLL_SECONDS=0.01, SESSION_FEED_OVERLAP_SECONDS=0)
+class SubmissionStreamTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sess = self.make_session(self.make_course(), slug='algebra-1', questions=2)
+        self.students = [self.make_student(f'S{i}') for i in range(3)]
+        for student in self.students[:2]:
+            record_submission(self.sess, student, [1])
+
+    async def _stream(self, cursor=''):
+        headers = {'Last-Event-ID': cursor} if cursor else {}
+        resp = await self.async_client.get(reverse('ta_api_session_submissions_stream'), {'slug': 'algebra-1'}, headers=headers)
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        body = b''.join([part async for part in resp.streaming_content]).decode()  # ends after the lifetime
+        self.assertTrue(body.startswith('retry: 10\n\n'))
+        events = []
+        for block in body.split('\n\n')[1:-1]:
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            self.assertEqual(fields['event'], 'submissions')
+            data = json.loads(fields['data'])
+            self.assertEqual(fields.get('id', ''), data['cursor'])  # Last-Event-ID resumes from it
+            events.append(data)
+        return events
+
+    def test_not_streamed_under_wsgi(self):
+        resp = self.client.get(reverse('ta_api_session_submissions_stream'), {'slug': 'algebra-1'})
+        self.assertEqual(resp.status_code, 204)  # EventSource stops; the page polls the list instead
+
+    async def test_full_listing_then_resume_with_the_delta(self):
+        [first] = await self._stream()
+        self.assertTrue(first['full'])
+        self.assertEqual([s['student_id'] for s in first['submissions']], ['S0', 'S1'])
+
+        self.assertEqual(await self._stream(first['cursor']), [])  # nothing changed
+        await sync_to_async(record_submission)(self.sess, self.students[2], [2])
+        [delta] = await self._stream(first['cursor'])
+        self.assertFalse(delta['full'])
+        self.assertEqual([s['student_id'] for s in delta['submissions']], ['S2'])
+        self.assertNotEqual(delta['cursor'], first['cursor'])
+
+    async def test_resume_rereads_rows_that_committed_late(self):
+        [first] = await self._stream()
+        # A concurrent transaction stamped its row before the cursor but committed after it was served
+        late = await sync_to_async(record_submission)(self.sess, self.students[2], [2])
+        ts = timezone.now() - timedelta(seconds=2)
+        await TAExerciseSessionSubmission.objects.filter(pk=late.pk).aupdate(updated_at=ts)
+        self.assertEqual(await self._stream(first['cursor']), [])
+        with override_settings(SESSION_FEED_OVERLAP_SECONDS=5):
+            [delta] = await self._stream(first['cursor'])
+        self.assertEqual({s['student_id'] for s in delta['submissions']}, {'S0', 'S1', 'S2'})
+        self.assertEqual(delta['cursor'], first['cursor'])  # late rows never move the cursor back
+
+    @override_settings(SESSION_STREAM_SECONDS=0.05, SESSION_STREAM_RECHECK_SECONDS=0, SESSION_FEED_OVERLAP_SECONDS=5)
+    async def test_rows_are_sent_once_per_connection(self):
+        events = await self._stream()
+        self.assertEqual(len(events), 1)  # later rechecks find only rows already sent
+        self.assertEqual(len(events[0]['submissions']), 2)
+
+
+class PublicSubmitTests(FixtureTestCase):
+    # Path ids: 1 = Q1.a, 2 = Q1.b, 3 = Q2.a, 4 = Q2.b
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+        self.sess = self.make_session(self.course, slug='algebra-1', questions=2, subparts=2, status='active')
+        self.student = self.make_student('S0', name='Sam')
+
+    async def _submit(self, status=200, **payload):
+        payload = {'slug': 'algebra-1', 'student_id': 's0', 'student_name': 'Sam', 'answers': ['Q1.a', 'Q2.b'], **payload}
+        resp = await self.async_client.post(reverse('ta_api_session_submit_public'), payload, content_type='application/json')
+        self.assertEqual(resp.status_code, status, resp.content)
+        return resp.json()
+
+    async def test_records_the_submission(self):
+        with mock.patch('teachers_assistants_dash.views.record_submission', wraps=record_submission) as record:
+            data = await self._submit()
+        record.assert_called_once()
+        sub = await TAExerciseSessionSubmission.objects.aget(session=self.sess)
+        self.assertEqual(data, {'ok': True, 'submission_id': sub.id})
+        self.assertEqual((sub.student_id, sub.answer_ids), ('S0', [1, 4]))
+
+    async def test_rejects_unknown_labels_students_and_closed_sessions(self):
+        self.assertIn('Q9.z', (await self._submit(400, answers=['Q1.a', 'Q9.z']))['error'])
+        self.assertEqual((await self._submit(400, answers='Q1.a'))['ok'], False)
+        self.assertEqual((await self._submit(404, student_id='S404'))['error'], 'Invalid student_id')
+        await TAExerciseSession.objects.filter(pk=self.sess.pk).aupdate(status='closed')
+        self.assertEqual((await self._submit(404))['error'], 'Session not found or not active')
+        self.assertFalse(await TAExerciseSessionSubmission.objects.aexists())
+
+    @override_settings(SUBMISSION_WRITE_BEHIND=True)
+    async def test_queues_to_the_spool_when_write_behind(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        worker = spool.SubmissionSpool(directory, flush_seconds=3600)
+        self.enterContext(mock.patch.object(spool, '_spool', worker))
+        with mock.patch('teachers_assistants_dash.views.record_submission') as record:
+            data = await self._submit()
+        record.assert_not_called()
+        self.assertEqual((data['queued'], data['submission_id']), (True, None))
+        [queued] = worker.pending(self.sess.id)
+        self.assertEqual((queued['receipt'], queued['answers']), (data['receipt'], ['Q1.a', 'Q2.b']))
+        self.assertFalse(await TAExerciseSessionSubmission.objects.aexists())
+
+
+class GradeCloseTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+
+    def _session(self, slug, students):
+        sess = self.make_session(self.course, self.make_exercise(self.course, slug), slug=slug, questions=2)
+        for sid in students:
+            record_submission(sess, self.make_student(sid), [1])
+        return sess
+
+    def _grade(self, slug, graded):
+        payload = {'assistant_code': 'TA-1', 'slug': slug, 'graded': graded}
+        return self.post_json('ta_api_session_grade_close', payload).json()
+
+    def _scores(self, sess):
+        return dict(sess.submissions.values_list('student_id', 'score'))
+
+    def test_matches_ids_case_insensitively_and_reports_bad_rows(self):
+        sess = self._session('algebra-1', ['S0', 'S1', 'S2'])
+        data = self._grade('algebra-1', [
+            {'student_id': 's0', 'score': 5, 'group_index': 1},
+            {'student_id': 'NOPE', 'score': 1},
+            {'student_id': 'S1', 'score': 'x'},
+            'junk',
+            {'student_id': 'S2', 'score': '3'},
+        ])
+        self.assertEqual(data['updated_count'], 2)
+        self.assertEqual([(f['index'], f['student_id']) for f in data['failed']], [(1, 'NOPE'), (2, 'S1'), (3, None)])
+        self.assertEqual(self._scores(sess), {'S0': 5, 'S1': None, 'S2': 3})
+        self.assertEqual(sess.submissions.get(student_id='S0').group_index, 1)
+        sess.refresh_from_db()
+        self.assertEqual(sess.status, 'closed')
+        self.assertIsNotNone(sess.exercise.deadline)
+
+    @override_settings(SUBMISSION_WRITE_BEHIND=True)
+    def test_queued_submissions_are_flushed_before_grading(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        worker = spool.SubmissionSpool(directory, flush_seconds=3600)
+        self.enterContext(mock.patch.object(spool, '_spool', worker))
+        sess = self._session('algebra-1', [])
+        worker.enqueue(sess, self.make_student('S9'), [1, 2])
+        data = self._grade('algebra-1', [{'student_id': 'S9', 'score': 4}])
+        self.assertEqual((data['updated_count'], data['failed']), (1, []))
+        self.assertEqual(self._scores(sess), {'S9': 4})
+
+    def test_query_count_is_constant(self):
+        self._session('small', [f'A{i}' for i in range(2)])
+        large = self._session('large', [f'B{i}' for i in range(40)])
+        self.post_json('ta_api_session_list', {'assistant_code': 'TA-1'})  # warm the assistant identity cache
+        with CaptureQueriesContext(connection) as queries:
+            self._grade('small', [{'student_id': f'a{i}', 'score': i} for i in range(2)])
+        with self.assertNumQueries(len(queries)):
+            data = self._grade('large', [{'student_id': f'b{i}', 'score': i} for i in range(40)])
+        self.assertEqual(data['updated_count'], 40)
+        self.assertEqual(self._scores(large)['B39'], 39)
+
+
+class PathCountTests(FixtureTestCase):
+    # Path ids: 1 = Q1.a, 2 = Q1.b, 3 = Q2.a, 4 = Q2.b
+    def setUp(self):
+        super().setUp()
+        self.sess = self.make_session(self.make_course(), slug='algebra-1', questions=2, subparts=2)
+        self.students = [self.make_student(f'S{i}') for i in range(3)]
+
+    def _heatmap(self):
+        data = self.post_json('ta_api_session_heatmap', {'slug': 'algebra-1'}).json()
+        return data['total_submissions'], {p['path']: p['checked'] for p in data['paths']}
+
+    def _assert_counts(self, total, checked):
+        self.assertEqual(self._heatmap(), (total, checked))
+        self.sess.refresh_from_db()
+        stored = {k: n for k, n in self.sess.path_counts.items() if n}
+        call_command('recount_path_counts', 'algebra-1', stdout=io.StringIO())
+        self.sess.refresh_from_db()
+        self.assertEqual(self.sess.path_counts, stored)  # maintained counts match a full recount
+
+    def test_record_and_resubmit(self):
+        s0, s1, _ = self.students
+        record_submission(self.sess, s0, [1, 3])
+        record_submission(self.sess, s1, [1, 2])
+        self._assert_counts(2, {'Q1.a': 2, 'Q1.b': 1, 'Q2.a': 1, 'Q2.b': 0})
+        record_submission(self.sess, s0, [4])  # unchecks 1 and 3
+        self._assert_counts(2, {'Q1.a': 1, 'Q1.b': 1, 'Q2.a': 0, 'Q2.b': 1})
+
+    def test_batch(self):
+        s0, s1, s2 = self.students
+        record_submission(self.sess, s0, [1])
+        record_submission_batch(self.sess, [
+            (s0.student_id, s0.name, [2], None),
+            (s1.student_id, s1.name, [1, 2], None),
+            (s2.student_id, s2.name, [3], None),
+            (s2.student_id, s2.name, [2, 3], None),  # last entry per student wins
+        ])
+        self._assert_counts(3, {'Q1.a': 1, 'Q1.b': 3, 'Q2.a': 1, 'Q2.b': 0})
+
+    def test_delete(self):
+        s0, s1, _ = self.students
+        record_submission(self.sess, s0, [1, 3])
+        record_submission(self.sess, s1, [1, 2])
+        self.sess.submissions.get(student_id='S0').delete()
+        self._assert_counts(1, {'Q1.a': 1, 'Q1.b': 1, 'Q2.a': 0, 'Q2.b': 0})
+        self.sess.submissions.all().delete()
+        self._assert_counts(0, {'Q1.a': 0, 'Q1.b': 0, 'Q2.a': 0, 'Q2.b': 0})
+        self.sess.refresh_from_db()
+        self.assertEqual(self.sess.total_checks, 0)
+
+    def test_command_repairs_drifted_counts(self):
+        record_submission(self.sess, self.students[0], [2, 4])
+        TAExerciseSession.objects.filter(pk=self.sess.pk).update(path_counts={'1': 5})
+        out = io.StringIO()
+        call_command('recount_path_counts', stdout=out)
+        self.assertIn('algebra-1: repaired', out.getvalue())
+        self.assertEqual(self._heatmap(), (1, {'Q1.a': 0, 'Q1.b': 1, 'Q2.a': 0, 'Q2.b': 1}))
+
+
+class PublicDescriptorTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sess = self.make_session(self.make_course(), slug='algebra-1', questions=2, status='active')
+
+    def _paths(self, status=200):
+        resp = self.post_json('ta_api_session_get_public', {'slug': 'algebra-1'}, status=status)
+        return resp.json()['session']['checkable_paths'] if status == 200 else None
+
+    def test_structure_edit_on_another_worker_is_seen(self):
+        self.assertEqual(self._paths(), ['Q1', 'Q2'])
+        # Another worker's edit: the row changes but this process's cache is never touched
+        struct, index, next_id = compile_structure(from_counts(3), self.sess.path_index, self.sess.next_path_id)
+        TAExerciseSession.objects.filter(pk=self.sess.pk).update(structure_json=struct, path_index=index, next_path_id=next_id)
+        self.assertEqual(self._paths(), ['Q1', 'Q2'])  # cached under the unchanged version
+        descriptor.changed(self.sess)
+        self.assertEqual(self._paths(), ['Q1', 'Q2', 'Q3'])
+
+        self.post_json('ta_api_session_update_structure', {'slug': 'algebra-1', 'structure': from_counts(1)})
+        self.assertEqual(self._paths(), ['Q1'])
+
+    def test_closed_session_is_not_served_from_cache(self):
+        self._paths()
+        TAExerciseSession.objects.filter(pk=self.sess.pk).update(status='closed')
+        self._paths(status=404)
+
+
+class SubmissionSpoolTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.sess = self.make_session(self.make_course(), questions=2, subparts=2)
+        self.students = [self.make_student(f'S{i}') for i in range(2)]
+
+    def _spool(self):
+        return spool.SubmissionSpool(self.directory, flush_seconds=3600)  # flushed by hand below
+
+    def _refresh(self):
+        self.sess.refresh_from_db()
+        return {s.student_id: s.answer_labels(self.sess.path_index) for s in self.sess.submissions.all()}
+
+    def test_flush_writes_latest_entry_once(self):
+        worker = self._spool()
+        s0, s1 = self.students
+        worker.enqueue(self.sess, s0, [1])
+        worker.enqueue(self.sess, s0, [1, 2])
+        worker.enqueue(self.sess, s1, [3])
+        self.assertEqual(worker.flush_now(), 2)
+        self.assertEqual(self._refresh(), {'S0': ['Q1.a', 'Q1.b'], 'S1': ['Q2.a']})
+        self.assertEqual((self.sess.submissions_count, self.sess.total_checks), (2, 3))
+        self.assertEqual(self.sess.path_counts, {'1': 1, '2': 1, '3': 1})
+
+    def test_resubmission_survives_unrelated_row_updates(self):
+        s0 = self.students[0]
+        record_submission(self.sess, s0, [1])
+        worker = self._spool()
+        worker.enqueue(self.sess, s0, [4])
+        # An evidence request after the resubmission was queued moves updated_at past it
+        sub = self.sess.submissions.get()
+        sub.evidence_requested_at = timezone.now()
+        sub.save(update_fields=['evidence_requested_at', 'updated_at'])
+        worker.flush_now()
+        self.assertEqual(self._refresh(), {'S0': ['Q2.b']})
+        self.assertEqual(self.sess.path_counts, {'1': 0, '4': 1})
+
+    def test_close_flushes_other_workers_without_double_counting(self):
+        mine, other = self._spool(), self._spool()
+        s0, s1 = self.students
+        mine.enqueue(self.sess, s0, [1])
+        other.enqueue(self.sess, s1, [2, 3])
+        self.assertNotEqual(other.pending_version(self.sess.id), '')
+        mine.flush_session(self.sess)
+        self.assertEqual(self._refresh(), {'S0': ['Q1.a'], 'S1': ['Q1.b', 'Q2.a']})
+        # The owner flushes the same entry later; it is not newer, so nothing changes
+        self.assertEqual(other.flush_now(), 0)
+        self.sess.refresh_from_db()
+        self.assertEqual((self.sess.submissions_count, self.sess.total_checks), (2, 3))
+
+    def test_pending_version_moves_with_every_enqueue(self):
+        worker = self._spool()
+        s0 = self.students[0]
+        self.assertEqual(worker.pending_version(self.sess.id), '')
+        versions = []
+        for answers in ([1], [2], [1]):
+            worker.enqueue(self.sess, s0, answers)
+            versions.append(worker.pending_version(self.sess.id))
+        self.assertEqual(len(set(versions)), 3)
+        worker.flush_now()
+        self.assertEqual(worker.pending_version(self.sess.id), '')
+
+    @override_settings(SUBMISSION_WRITE_BEHIND=True)
+    def test_pending_includes_other_workers_queues(self):
+        mine, other = self._spool(), self._spool()
+        self.enterContext(mock.patch.object(spool, '_spool', mine))
+        s0, s1 = self.students
+        mine.enqueue(self.sess, s0, [1])
+        version = mine.pending_version(self.sess.id)
+        other.enqueue(self.sess, s1, [2])
+        other.enqueue(self.sess, s0, [4])  # supersedes the entry queued here
+        rows = {p['student_id']: p['answers'] for p in spool.pending_payloads(self.sess.id)}
+        self.assertEqual(rows, {'S0': ['Q2.b'], 'S1': ['Q1.b']})
+        self.assertNotEqual(mine.pending_version(self.sess.id), version)
+        self.assertEqual(other.pending_version(self.sess.id), mine.pending_version(self.sess.id))
+
+        other.flush_now()
+        self.assertEqual([p['answers'] for p in spool.pending_payloads(self.sess.id)], [['Q1.a']])
+        mine.flush_now()
+        self.assertEqual(spool.pending_payloads(self.sess.id), [])
+        self.assertEqual(mine.pending_version(self.sess.id), '')
+        self.assertEqual(self._refresh(), {'S0': ['Q2.b'], 'S1': ['Q1.b']})
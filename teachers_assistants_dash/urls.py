@@ -6,7 +6,9 @@ from .views import (
     api_session_get,
     api_session_update_structure,
     api_session_submissions_list,
+    api_session_submissions_stream,
     api_session_metrics,
+    api_session_heatmap,
     session_form_page,
     api_session_get_public,
     api_session_submit_public,
@@ -32,7 +34,9 @@ urlpatterns = [
     path('api/session/get/', api_session_get, name='ta_api_session_get'),
     path('api/session/update-structure/', api_session_update_structure, name='ta_api_session_update_structure'),
     path('api/session/submissions/', api_session_submissions_list, name='ta_api_session_submissions'),
+    path('api/session/submissions/stream/', api_session_submissions_stream, name='ta_api_session_submissions_stream'),
     path('api/session/metrics/', api_session_metrics, name='ta_api_session_metrics'),
+    path('api/session/heatmap/', api_session_heatmap, name='ta_api_session_heatmap'),
     path('session/<slug:slug>/form/', session_form_page, name='ta_session_form'),
     path('api/session/public/get/', api_session_get_public, name='ta_api_session_get_public'),
     path('api/session/public/submit/', api_session_submit_public, name='ta_api_session_submit_public'),
@@ -1,13 +1,18 @@
 # Top-level imports in views.py
-from django.http import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse, HttpResponseNotModified
+from core.http import JsonResponse, StreamingJsonResponse
+from core.pagination import KeysetPage, decode_cursor, encode_cursor, parse_limit
 from django.views.decorators.csrf import csrf_exempt
+import asyncio
 import json
+import time
 from helpers.supabase.supabase_client import get_supabase_service
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.shortcuts import render
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Count, Max, Prefetch
 from .models import TeachingAssistant
 from .models import CourseAssistant, TAExerciseSession, TAExerciseSessionSubmission
 from teachers_dash.models import Course, Exercise, ExerciseQuestion
@@ -15,28 +20,18 @@ import random
 import string
 from students_dash.models import Student
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from . import descriptor, feed, spool
+from .structure import StructureError, compile_structure, from_counts, paths as checkable_paths, resolve_answers
+from .submissions import record_submission
+from .grading import apply_grades
+from .identity import assistant_from_payload, resolve_assistant
 
 def _generate_slug(length=10):
     alphabet = string.ascii_letters + string.digits
     return ''.join(random.choice(alphabet) for _ in range(length))
 
-def _assistant_from_payload(data):
-    assistant_id = int(data.get('assistant_id') or 0)
-    assistant_code = (data.get('assistant_code') or '').strip()
-    supabase_user_id = (data.get('supabase_user_id') or '').strip()
-    email = (data.get('email') or '').strip()
-
-    ta = None
-    if assistant_id:
-        ta = TeachingAssistant.objects.filter(id=assistant_id).first()
-    if not ta and assistant_code:
-        ta = TeachingAssistant.objects.filter(special_code=assistant_code).first()
-    if not ta and supabase_user_id:
-        ta = TeachingAssistant.objects.filter(user_id=supabase_user_id).first()
-    if not ta and email:
-        ta = TeachingAssistant.objects.filter(email=email).first()
-    return ta
-
 @csrf_exempt
 def api_assistant_lookup(request):
     if request.method != 'POST':
@@ -46,11 +41,7 @@ def api_assistant_lookup(request):
         supabase_user_id = (data.get('supabase_user_id') or '').strip()
         email = (data.get('email') or '').strip()
 
-        ta = None
-        if supabase_user_id:
-            ta = TeachingAssistant.objects.filter(user_id=supabase_user_id).first()
-        if not ta and email:
-            ta = TeachingAssistant.objects.filter(email=email).first()
+        ta = resolve_assistant(request, user_id=supabase_user_id, email=email)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
 
@@ -78,7 +69,7 @@ def api_session_list(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
 
@@ -113,7 +104,7 @@ def api_session_list_closed(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
 
@@ -152,7 +143,7 @@ def api_session_end_delete(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         slug = (data.get('slug') or '').strip()
         session_id = int(data.get('session_id') or 0)
         if not ta or (not slug and not session_id):
@@ -165,6 +156,7 @@ def api_session_end_delete(request):
             sess = TAExerciseSession.objects.filter(id=session_id, assistant=ta).select_related('exercise').first()
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
+        spool.flush_session(sess)
 
         # Mark exercise done by setting its deadline to now; this removes it from 'current' and 'ending soon'
         now = timezone.now()
@@ -188,20 +180,30 @@ def api_session_end_delete(request):
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
+def _listed_exercises():
+    # Exercises of every linked course in one query, newest first, with question counts
+    return Prefetch(
+        'course__exercises',
+        queryset=Exercise.objects.annotate(questions_count=Count('questions')).order_by('-created_at'),
+        to_attr='listed_exercises',
+    )
+
 @csrf_exempt
 def api_assistant_exercises(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
-        links = CourseAssistant.objects.filter(assistant=ta).select_related('course__teacher')
+        links = CourseAssistant.objects.filter(assistant=ta).select_related('course__teacher').prefetch_related(
+            _listed_exercises()
+        )
         payload = []
         for link in links:
             course = link.course
-            ex_qs = Exercise.objects.filter(course=course).order_by('-created_at')
+            ex_qs = course.listed_exercises
             payload.append({
                 'course': {
                     'id': course.id,
@@ -221,53 +223,20 @@ def api_assistant_exercises(request):
                     'total_points': e.total_points,
                     'start_time': e.start_time.isoformat() if e.start_time else None,
                     'deadline': e.deadline.isoformat() if e.deadline else None,
-                    'questions_count': e.questions.count(),
+                    'questions_count': e.questions_count,
                 } for e in ex_qs]
             })
         return JsonResponse({'ok': True, 'courses': payload})
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
-def _make_structure_from_counts(q_count, subparts_same_count=None):
-    def q_label(i): return f"Q{i}"
-    def sub_label(idx):
-        # a..z, then a1..z1, a2..z2, ...
-        base = string.ascii_lowercase
-        if idx < 26:
-            return base[idx]
-        times = (idx // 26)
-        rem = idx % 26
-        return f"{base[rem]}{times}"
-    questions = []
-    for i in range(1, q_count + 1):
-        node = {'label': q_label(i)}
-        if isinstance(subparts_same_count, int) and subparts_same_count > 0:
-            node['children'] = [{'label': sub_label(s)} for s in range(subparts_same_count)]
-        questions.append(node)
-    return {'questions': questions}
-
-def _flatten_paths(struct):
-    paths = []
-    def walk(node, prefix=None):
-        label = node.get('label')
-        current = label if not prefix else f"{prefix}.{label}"
-        children = node.get('children') or []
-        if children:
-            for ch in children:
-                walk(ch, current)
-        else:
-            paths.append(current)
-    for q in (struct.get('questions') or []):
-        walk(q, None)
-    return paths
-
 @csrf_exempt
 def api_session_create(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         course_id = int(data.get('course_id') or 0)
         exercise_id = int(data.get('exercise_id') or 0)
         time_limit_minutes = int(data.get('time_limit_minutes') or 0)
@@ -297,15 +266,15 @@ def api_session_create(request):
                 return JsonResponse({'ok': False, 'error': 'No exercise selected for existing mode'}, status=400)
             qs = ExerciseQuestion.objects.filter(exercise=exercise).order_by('order')
             q_count = qs.count()
-            struct_json = _make_structure_from_counts(q_count, None)
+            struct_json = from_counts(q_count, None)
         elif mode == 'count_only':
             if q_count_override <= 0:
                 return JsonResponse({'ok': False, 'error': 'question_count must be > 0'}, status=400)
-            struct_json = _make_structure_from_counts(q_count_override, None)
+            struct_json = from_counts(q_count_override, None)
         elif mode == 'uniform_subparts':
             if q_count_override <= 0 or subparts_count <= 0:
                 return JsonResponse({'ok': False, 'error': 'question_count and subparts_count must be > 0'}, status=400)
-            struct_json = _make_structure_from_counts(q_count_override, subparts_count)
+            struct_json = from_counts(q_count_override, subparts_count)
         elif mode == 'custom_structure':
             if not isinstance(structure, dict) or not structure.get('questions'):
                 return JsonResponse({'ok': False, 'error': 'structure with questions required'}, status=400)
@@ -313,6 +282,11 @@ def api_session_create(request):
         else:
             return JsonResponse({'ok': False, 'error': 'Invalid mode'}, status=400)
 
+        try:
+            struct_json, path_index, next_path_id = compile_structure(struct_json)
+        except StructureError as e:
+            return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+
         slug = _generate_slug(10)
         sess = TAExerciseSession.objects.create(
             slug=slug,
@@ -322,6 +296,9 @@ def api_session_create(request):
             title=title,
             time_limit_minutes=max(0, time_limit_minutes),
             structure_json=struct_json,
+            path_index=path_index,
+            next_path_id=next_path_id,
+            checkable_count=len(path_index),
             status='active',
             started_at=timezone.now(),
         )
@@ -349,7 +326,6 @@ def api_session_get(request):
         sess = TAExerciseSession.objects.filter(slug=slug).select_related('assistant', 'course', 'exercise').first()
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
-        paths = _flatten_paths(sess.structure_json or {})
         public_url = request.build_absolute_uri(reverse('ta_session_form', args=[sess.slug]))
         return JsonResponse({'ok': True, 'session': {
             'id': sess.id,
@@ -358,7 +334,8 @@ def api_session_get(request):
             'status': sess.status,
             'time_limit_minutes': sess.time_limit_minutes,
             'structure': sess.structure_json or {},
-            'checkable_paths': paths,
+            'checkable_paths': checkable_paths(sess.path_index),
+            'path_index': sess.path_index,
             'public_url': public_url,
         }})
     except Exception as e:
@@ -377,59 +354,221 @@ def api_session_update_structure(request):
         sess = TAExerciseSession.objects.filter(slug=slug).first()
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
-        sess.structure_json = structure
-        sess.save(update_fields=['structure_json', 'updated_at'] if hasattr(sess, 'updated_at') else ['structure_json'])
+        try:
+            # Paths that survive the edit keep their ids, so earlier answers still line up
+            clean, path_index, next_path_id = compile_structure(structure, sess.path_index, sess.next_path_id)
+        except StructureError as e:
+            return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+        sess.structure_json = clean
+        sess.path_index = path_index
+        sess.next_path_id = next_path_id
+        sess.checkable_count = len(path_index)
+        sess.save(update_fields=['structure_json', 'path_index', 'next_path_id', 'checkable_count'])
+        descriptor.changed(sess)
         return JsonResponse({'ok': True})
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
+def _file_url(request, f):
+    try:
+        if f and f.url:
+            return request.build_absolute_uri(f.url)
+    except Exception:
+        pass
+    return None
+
+def _submission_payload(request, s, path_index):
+    return {
+        'id': s.id,
+        'student_id': s.student_id,
+        'student_name': s.student_name,
+        'answers': s.answer_labels(path_index),
+        'answer_ids': s.answer_ids,
+        'total_checked_count': s.total_checked_count,
+        'submitted_at': s.updated_at.isoformat(),
+        'score': s.score if hasattr(s, 'score') else None,
+        'group_index': s.group_index if hasattr(s, 'group_index') else None,
+        'evidence_requested_at': s.evidence_requested_at.isoformat() if getattr(s, 'evidence_requested_at', None) else None,
+        'evidence_received_at': s.evidence_received_at.isoformat() if getattr(s, 'evidence_received_at', None) else None,
+        'evidence_url': _file_url(request, s.evidence_file),
+        'evidence_preview_url': _file_url(request, s.evidence_preview),
+        'evidence_thumbnail_url': _file_url(request, s.evidence_thumbnail),
+        'evidence_decision': s.evidence_decision or '',
+        'evidence_reviewed_at': s.evidence_reviewed_at.isoformat() if getattr(s, 'evidence_reviewed_at', None) else None,
+    }
+
+def _with_pending(items, pending):
+    # Queued write-behind submissions replace the stored row of the same student until flushed
+    if not pending:
+        return items
+    queued = {p['student_id'].lower() for p in pending}
+    return [i for i in items if i['student_id'].lower() not in queued] + pending
+
 @csrf_exempt
 def api_session_submissions_list(request):
+    # Optional "since" (or "cursor") returns the submissions changed since that cursor,
+    # re-reading a short overlap before it (see feed.py), so rows may repeat.
+    # A full listing may be paged with "limit" and "after" (the previous page's "next");
+    # keep the "cursor" of the first page for later "since" polls. Rows are streamed.
+    # The response carries an ETag over the session's submission state, so a client
+    # sending If-None-Match gets a 304 when nothing changed.
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
         slug = (data.get('slug') or '').strip()
+        since_raw = (data.get('since') or data.get('cursor') or '').strip()
         if not slug:
             return JsonResponse({'ok': False, 'error': 'slug required'}, status=400)
         sess = TAExerciseSession.objects.filter(slug=slug).first()
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
-        subs = TAExerciseSessionSubmission.objects.filter(session=sess).order_by('-updated_at', '-created_at')
-        items = []
-        for s in subs:
-            ev_url = None
-            try:
-                if s.evidence_file and hasattr(s.evidence_file, 'url') and s.evidence_file.url:
-                    ev_url = request.build_absolute_uri(s.evidence_file.url)
-            except Exception:
-                ev_url = None
-            items.append({
-                'id': s.id,
-                'student_id': s.student_id,
-                'student_name': s.student_name,
-                'answers': s.answers_json,
-                'total_checked_count': s.total_checked_count,
-                'submitted_at': s.updated_at.isoformat(),
-                'score': s.score if hasattr(s, 'score') else None,
-                'group_index': s.group_index if hasattr(s, 'group_index') else None,
-                'evidence_requested_at': s.evidence_requested_at.isoformat() if getattr(s, 'evidence_requested_at', None) else None,
-                'evidence_received_at': s.evidence_received_at.isoformat() if getattr(s, 'evidence_received_at', None) else None,
-                'evidence_url': ev_url,
-                'evidence_decision': s.evidence_decision or '',
-                'evidence_reviewed_at': s.evidence_reviewed_at.isoformat() if getattr(s, 'evidence_reviewed_at', None) else None,
-            })
-        return JsonResponse({'ok': True, 'submissions': items})
+        since = decode_cursor(since_raw)
+        if since_raw and not since:
+            return JsonResponse({'ok': False, 'error': 'Invalid since cursor'}, status=400)
+        try:
+            limit = parse_limit(data.get('limit'))
+        except (TypeError, ValueError):
+            return JsonResponse({'ok': False, 'error': 'limit must be a non-negative integer'}, status=400)
+        after = decode_cursor(data.get('after'))
+        if data.get('after') and not after:
+            return JsonResponse({'ok': False, 'error': 'Invalid after cursor'}, status=400)
+
+        subs = TAExerciseSessionSubmission.objects.filter(session=sess)
+        state = subs.aggregate(count=Count('id'), last=Max('updated_at'))
+        pending_version = spool.pending_version(sess.id)  # read first: a later enqueue only makes the body newer
+        pending = spool.pending_payloads(sess.id)
+        etag = '"%s-%s-%s-%s"' % (
+            sess.id, state['count'], state['last'].timestamp() if state['last'] else 0, pending_version,
+        )
+        if request.headers.get('If-None-Match') == etag:
+            resp = HttpResponseNotModified()
+            resp['ETag'] = etag
+            return resp
+
+        queued = {p['student_id'].lower() for p in pending}
+        if since:
+            seen = {'last': None}
+            def items():
+                for s in feed.changed_since(subs.order_by('updated_at', 'id'), since).iterator(chunk_size=settings.STREAMING_CHUNK_SIZE):
+                    seen['last'] = s
+                    if s.student_id.lower() not in queued:
+                        yield _submission_payload(request, s, sess.path_index)
+                yield from pending
+            tail = lambda: {'cursor': encode_cursor(seen['last'], 'updated_at') or since_raw, 'full': False, 'next': ''}
+        else:
+            page = KeysetPage(subs, 'updated_at', after, limit)
+            def items():
+                for s in page:
+                    if s.student_id.lower() not in queued:
+                        yield _submission_payload(request, s, sess.path_index)
+                if not page.has_more:
+                    yield from pending  # queued rows go out with the last page
+            tail = lambda: {'cursor': '' if after else encode_cursor(page.first, 'updated_at'), 'full': not after, 'next': page.next_cursor}
+        resp = StreamingJsonResponse('submissions', items(), tail=tail)
+        resp['ETag'] = etag
+        return resp
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
+def _sse_event(event, data, event_id=None):
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+def _stream_batch(request, sess, cursor_raw, sent):
+    # One read of the feed for a stream: rows changed since the cursor that this
+    # connection has not sent in their current version (sent maps id -> updated_at), the
+    # session's queued write-behind entries, and the cursor to continue from.
+    cursor = decode_cursor(cursor_raw)
+    qs = TAExerciseSessionSubmission.objects.filter(session=sess).order_by('updated_at', 'id')
+    rows = [s for s in feed.changed_since(qs, cursor) if sent.get(s.id) != s.updated_at]
+    for s in rows:
+        sent[s.id] = s.updated_at
+    if rows and (cursor is None or (rows[-1].updated_at, rows[-1].id) > cursor):
+        # Late rows from the overlap window are sent but never move the cursor back
+        cursor_raw = encode_cursor(rows[-1], 'updated_at')
+        cursor = (rows[-1].updated_at, rows[-1].id)
+    if cursor:
+        start = feed.overlap_start(cursor)
+        for pk in [pk for pk, ts in sent.items() if ts < start]:
+            del sent[pk]  # before the overlap window, so never re-read
+    pending = spool.pending_payloads(sess.id)
+    submissions = _with_pending([_submission_payload(request, s, sess.path_index) for s in rows], pending)
+    return submissions, cursor_raw
+
+async def _stream_events(request, sess, cursor_raw):
+    lifetime = settings.SESSION_STREAM_SECONDS
+    poll = settings.SESSION_STREAM_POLL_SECONDS
+    # Feed versions live in the cache, which is per-process unless a shared backend is
+    # configured, so also re-read the (indexed) delta every few seconds to catch writes
+    # handled by other workers.
+    recheck = settings.SESSION_STREAM_RECHECK_SECONDS
+    full = not cursor_raw
+    sent = {}
+    deadline = time.monotonic() + lifetime
+    seen_version = None
+    last_check = 0.0
+    last_sent = time.monotonic()
+    yield f'retry: {int(poll * 1000)}\n\n'
+    while True:
+        now = time.monotonic()
+        current = await feed.aversion(sess.id)
+        if current != seen_version or now - last_check >= recheck:
+            seen_version = current
+            last_check = now
+            submissions, cursor_raw = await sync_to_async(_stream_batch)(request, sess, cursor_raw, sent)
+            if submissions or full:
+                yield _sse_event('submissions', {
+                    'full': full,
+                    'cursor': cursor_raw,
+                    'submissions': submissions,
+                }, cursor_raw)
+                full = False
+                last_sent = now
+        if now >= deadline:
+            break
+        if now - last_sent >= 15:
+            yield ': keepalive\n\n'
+            last_sent = now
+        await asyncio.sleep(poll)
+
+async def api_session_submissions_stream(request):
+    # Server-Sent Events feed of new/changed submissions for one session.
+    # A connection lives for SESSION_STREAM_SECONDS and then ends; EventSource reconnects
+    # by itself and sends Last-Event-ID, so a resumed client only receives the delta.
+    # The stream waits on the event loop, so it is only served under ASGI: a WSGI worker
+    # would hold a thread per open TA page. There the view answers 204, which stops
+    # EventSource from reconnecting, and the page polls api_session_submissions_list.
+    if request.method != 'GET':
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    slug = (request.GET.get('slug') or '').strip()
+    if not slug:
+        return JsonResponse({'ok': False, 'error': 'slug required'}, status=400)
+    sess = await TAExerciseSession.objects.filter(slug=slug).afirst()
+    if not sess:
+        return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
+
+    cursor_raw = (request.headers.get('Last-Event-ID') or request.GET.get('cursor') or '').strip()
+    if not decode_cursor(cursor_raw):
+        cursor_raw = ''  # unreadable: start over with a full listing
+    resp = StreamingHttpResponse(_stream_events(request, sess, cursor_raw), content_type='text/event-stream')
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
 @csrf_exempt
 def api_submission_evidence_decision(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         submission_id = int(data.get('submission_id') or 0)
         decision = (data.get('decision') or '').strip().lower()
         new_score = data.get('new_score', None)
@@ -482,7 +621,7 @@ def api_submission_request_evidence(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         slug = (data.get('slug') or '').strip()
         student_id = (data.get('student_id') or '').strip()
         if not ta or not slug or not student_id:
@@ -509,7 +648,7 @@ def api_session_grade_close(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        ta = _assistant_from_payload(data)
+        ta = assistant_from_payload(request, data)
         slug = (data.get('slug') or '').strip()
         graded = data.get('graded') or []
         if not ta or not slug:
@@ -519,39 +658,29 @@ def api_session_grade_close(request):
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
 
-        updated = 0
-        for g in graded:
-            sid = (g.get('student_id') or '').strip()
-            if not sid:
-                continue
-            score = g.get('score', None)
-            group_index = g.get('group_index', None)
-
-            sub = TAExerciseSessionSubmission.objects.filter(session=sess, student_id__iexact=sid).first()
-            if not sub:
-                continue
-            # Persist grading fields
-            sub.score = int(score) if (score is not None and str(score).strip() != '') else None
-            sub.group_index = int(group_index) if (group_index is not None and str(group_index).strip() != '') else None
-            sub.save(update_fields=['score', 'group_index', 'updated_at'])
-            updated += 1
-
-        # Mark exercise as completed (set deadline to now) but do not delete session
-        now = timezone.now()
-        if sess.exercise:
-            ex = sess.exercise
-            if (ex.deadline is None) or (ex.deadline and ex.deadline > now):
-                ex.deadline = now
-                if ex.start_time is None:
-                    ex.start_time = now
-                ex.save()
-
-        # Close session
-        sess.ended_at = now
-        sess.status = 'closed'
-        sess.save(update_fields=['ended_at', 'status'])
-
-        return JsonResponse({'ok': True, 'updated_count': updated, 'session': {'slug': sess.slug, 'status': sess.status}})
+        if not isinstance(graded, list):
+            return JsonResponse({'ok': False, 'error': 'graded must be a list'}, status=400)
+
+        spool.flush_session(sess)  # grade against every acknowledged submission, from any worker
+        with transaction.atomic():
+            updated, failed = apply_grades(sess, graded)
+
+            # Mark exercise as completed (set deadline to now) but do not delete session
+            now = timezone.now()
+            if sess.exercise:
+                ex = sess.exercise
+                if (ex.deadline is None) or (ex.deadline and ex.deadline > now):
+                    ex.deadline = now
+                    if ex.start_time is None:
+                        ex.start_time = now
+                    ex.save()
+
+            # Close session
+            sess.ended_at = now
+            sess.status = 'closed'
+            sess.save(update_fields=['ended_at', 'status'])
+
+        return JsonResponse({'ok': True, 'updated_count': updated, 'failed': failed, 'session': {'slug': sess.slug, 'status': sess.status}})
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
@@ -564,13 +693,12 @@ def api_session_metrics(request):
         slug = (data.get('slug') or '').strip()
         if not slug:
             return JsonResponse({'ok': False, 'error': 'slug required'}, status=400)
-        sess = TAExerciseSession.objects.filter(slug=slug).first()
+        sess = TAExerciseSession.objects.filter(slug=slug).values('checkable_count', 'submissions_count', 'total_checks').first()
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
-        total_checkable = len(_flatten_paths(sess.structure_json or {}))
-        subs = TAExerciseSessionSubmission.objects.filter(session=sess)
-        total_submissions = subs.count()
-        total_checks = sum(s.total_checked_count for s in subs)
+        total_checkable = sess['checkable_count']
+        total_submissions = sess['submissions_count']
+        total_checks = sess['total_checks']
         percent = 0.0
         if total_submissions > 0 and total_checkable > 0:
             percent = round((total_checks / (total_submissions * total_checkable)) * 100.0, 1)
@@ -583,14 +711,47 @@ def api_session_metrics(request):
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
+@csrf_exempt
+def api_session_heatmap(request):
+    # Per-path check counts for a session. The counts are maintained on the session row
+    # as submissions are written (see submissions.py), so a poll is a single row read.
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        slug = (data.get('slug') or '').strip()
+        if not slug:
+            return JsonResponse({'ok': False, 'error': 'slug required'}, status=400)
+        sess = TAExerciseSession.objects.filter(slug=slug).values('path_index', 'path_counts', 'submissions_count').first()
+        if not sess:
+            return JsonResponse({'ok': False, 'error': 'Session not found'}, status=404)
+        total = sess['submissions_count']
+        counts = sess['path_counts'] or {}
+        paths = []
+        for p in sess['path_index']:
+            checked = counts.get(str(p['id']), 0)
+            paths.append({
+                'id': p['id'],
+                'path': p['path'],
+                'checked': checked,
+                'percent': round(checked * 100.0 / total, 1) if total else 0.0,
+            })
+        return JsonResponse({'ok': True, 'total_submissions': total, 'paths': paths})
+    except Exception as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=500)
+
 def session_form_page(request, slug):
     return render(
             request,
             'teachers_assistants_dash/menu/exercise_management/excercise_question_form.html',
             { 'slug': slug }
         )
+# The two public endpoints take the whole class at once when a session opens, so they
+# are async: under ASGI a burst of students waits on the database without holding a
+# worker thread each.
+
 @csrf_exempt
-def api_session_get_public(request):
+async def api_session_get_public(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
@@ -598,22 +759,22 @@ def api_session_get_public(request):
         slug = (data.get('slug') or '').strip()
         if not slug:
             return JsonResponse({'ok': False, 'error': 'slug required'}, status=400)
-        sess = TAExerciseSession.objects.filter(slug=slug, status__in=['active']).first()
-        if not sess:
+        found = await descriptor.alookup(slug)
+        if not found:
             return JsonResponse({'ok': False, 'error': 'Session not found or not active'}, status=404)
-        paths = _flatten_paths(sess.structure_json or {})
-        return JsonResponse({'ok': True, 'session': {
-            'title': sess.title or 'Session',
-            'slug': sess.slug,
-            'time_limit_minutes': sess.time_limit_minutes,
-            'structure': sess.structure_json or {},
-            'checkable_paths': paths,
-        }})
+        body = await descriptor.aget(*found)
+        if body is None:
+            sess = await TAExerciseSession.objects.filter(pk=found[0]).afirst()
+            if not sess:
+                return JsonResponse({'ok': False, 'error': 'Session not found or not active'}, status=404)
+            body = descriptor.encode(sess)
+            await descriptor.aset(*found, body)
+        return HttpResponse(body, content_type='application/json')
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
 @csrf_exempt
-def api_session_submit_public(request):
+async def api_session_submit_public(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
@@ -627,23 +788,27 @@ def api_session_submit_public(request):
             return JsonResponse({'ok': False, 'error': 'slug, student_id, student_name, answers required'}, status=400)
 
         # Only allow students present in the database to submit
-        student = Student.objects.filter(student_id__iexact=student_id).first()
+        student = await Student.objects.filter(student_id__iexact=student_id).afirst()
         if not student:
             return JsonResponse({'ok': False, 'error': 'Invalid student_id'}, status=404)
 
-        sess = TAExerciseSession.objects.filter(slug=slug, status__in=['active']).first()
+        sess = await TAExerciseSession.objects.filter(slug=slug, status__in=['active']).afirst()
         if not sess:
             return JsonResponse({'ok': False, 'error': 'Session not found or not active'}, status=404)
 
-        sub, _ = TAExerciseSessionSubmission.objects.update_or_create(
-            session=sess,
-            student_id=student.student_id,  # use canonical ID
-            defaults={
-                'student_name': student.name,  # use canonical name from DB
-                'answers_json': answers,
-                'total_checked_count': len(answers),
-            }
-        )
+        try:
+            answer_ids = resolve_answers(sess.path_index, answers)
+        except StructureError as e:
+            return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+
+        if spool.enabled():
+            # Acknowledge now; the spool flusher writes it (and the aggregates) in a batch
+            receipt = await sync_to_async(spool.get_spool().enqueue)(sess, student, answer_ids)
+            await sync_to_async(feed.bump)(sess.id)
+            return JsonResponse({'ok': True, 'submission_id': None, 'receipt': receipt, 'queued': True})
+
+        # The row lock and aggregate update need a transaction, which the async ORM can't hold
+        sub = await sync_to_async(record_submission)(sess, student, answer_ids)
         return JsonResponse({'ok': True, 'submission_id': sub.id})
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
@@ -654,20 +819,7 @@ def api_assistant_dashboard_counts(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        assistant_id = int(data.get('assistant_id') or 0)
-        assistant_code = (data.get('assistant_code') or '').strip()
-        supabase_user_id = (data.get('supabase_user_id') or '').strip()
-        email = (data.get('email') or '').strip()
-
-        ta = None
-        if assistant_id:
-            ta = TeachingAssistant.objects.filter(id=assistant_id).first()
-        if not ta and assistant_code:
-            ta = TeachingAssistant.objects.filter(special_code=assistant_code).first()
-        if not ta and supabase_user_id:
-            ta = TeachingAssistant.objects.filter(user_id=supabase_user_id).first()
-        if not ta and email:
-            ta = TeachingAssistant.objects.filter(email=email).first()
+        ta = assistant_from_payload(request, data)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
 
@@ -745,24 +897,13 @@ def api_assistant_courses_assigned(request):
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
         data = json.loads(request.body.decode('utf-8'))
-        assistant_id = int(data.get('assistant_id') or 0)
-        assistant_code = (data.get('assistant_code') or '').strip()
-        supabase_user_id = (data.get('supabase_user_id') or '').strip()
-        email = (data.get('email') or '').strip()
-
-        ta = None
-        if assistant_id:
-            ta = TeachingAssistant.objects.filter(id=assistant_id).first()
-        if not ta and assistant_code:
-            ta = TeachingAssistant.objects.filter(special_code=assistant_code).first()
-        if not ta and supabase_user_id:
-            ta = TeachingAssistant.objects.filter(user_id=supabase_user_id).first()
-        if not ta and email:
-            ta = TeachingAssistant.objects.filter(email=email).first()
+        ta = assistant_from_payload(request, data)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
 
-        links = CourseAssistant.objects.filter(assistant=ta).select_related('course__teacher').order_by('course__title')
+        links = CourseAssistant.objects.filter(assistant=ta).select_related('course__teacher').prefetch_related(
+            _listed_exercises()
+        ).order_by('course__title')
         courses = [link.course for link in links]
 
         def ex_payload(e):
@@ -772,11 +913,10 @@ def api_assistant_courses_assigned(request):
                 'total_points': e.total_points,
                 'start_time': e.start_time.isoformat() if e.start_time else None,
                 'deadline': e.deadline.isoformat() if e.deadline else None,
-                'questions_count': e.questions.count(),
+                'questions_count': e.questions_count,
             }
 
         def course_payload(c):
-            exercises = Exercise.objects.filter(course=c).order_by('-created_at')
             return {
                 'id': c.id,
                 'title': c.title,
@@ -790,7 +930,7 @@ def api_assistant_courses_assigned(request):
                     'last_name': c.teacher.last_name,
                     'email': c.teacher.email,
                 },
-                'exercises': [ex_payload(e) for e in exercises],
+                'exercises': [ex_payload(e) for e in c.listed_exercises],
             }
 
         return JsonResponse({'ok': True, 'courses': [course_payload(c) for c in courses]})
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TeachersDashConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'teachers_dash'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,140 @@
+import csv
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, OuterRef, Subquery
+from students_dash.models import Student
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+from .models import Course, Exercise
+
+# Course gradebook: one row per student, one column per exercise.
+# build() reads the course's exercises, roster and graded submissions in three queries
+# whatever the course size. A student's score for an exercise is their best graded
+# submission across that exercise's sessions. get() caches the result under a
+# fingerprint of everything build() reads: the course's submissions (count, latest
+# updated_at), its exercises (count, latest updated_at, so renames and re-scoring count)
+# and its roster (count and highest enrollment row id, which moves on every add, plus the
+# latest Student.updated_at for renames). Grading, a roster swap or an edit produce a new
+# key and nothing has to be invalidated explicitly.
+# CSV cells starting with =, +, -, @ (or a tab/CR) are prefixed with ' so a spreadsheet
+# opening the export does not evaluate student-supplied names as formulas.
+
+
+class ParquetUnavailable(Exception):
+    pass
+
+
+def fingerprint(course_id):
+    def scalar(qs, aggregate):
+        return Subquery(qs.annotate(v=aggregate).values('v'))
+
+    subs = TAExerciseSessionSubmission.objects.filter(session__course_id=OuterRef('pk')).order_by().values('session__course_id')
+    exercises = Exercise.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id')
+    roster = Course.students.through.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id')
+    row = Course.objects.filter(pk=course_id).annotate(
+        last_sub=scalar(subs, Max('updated_at')),
+        n_subs=scalar(subs, Count('id')),
+        last_exercise=scalar(exercises, Max('updated_at')),
+        n_exercises=scalar(exercises, Count('id')),
+        last_student=scalar(roster, Max('student__updated_at')),
+        last_enrollment=scalar(roster, Max('id')),
+        n_students=scalar(roster, Count('id')),
+    ).values(
+        'last_sub', 'n_subs', 'last_exercise', 'n_exercises', 'last_student', 'last_enrollment', 'n_students',
+    ).first()
+    if row is None:
+        return None
+    return '-'.join(str(v.timestamp() if hasattr(v, 'timestamp') else v or 0) for v in row.values())
+
+
+def build(course_id):
+    exercises = list(
+        Exercise.objects.filter(course_id=course_id).order_by('created_at', 'id').values('id', 'title', 'total_points')
+    )
+    students = list(
+        Student.objects.filter(courses__id=course_id).order_by('student_id').values('student_id', 'name')
+    )
+    graded = TAExerciseSessionSubmission.objects.filter(
+        session__course_id=course_id, session__exercise__isnull=False, score__isnull=False
+    ).values_list('student_id', 'student_name', 'session__exercise_id', 'score')
+
+    column = {ex['id']: i for i, ex in enumerate(exercises)}
+    rows = {}
+    for s in students:
+        rows[s['student_id'].lower()] = {'student_id': s['student_id'], 'name': s['name'], 'enrolled': True, 'scores': [None] * len(exercises)}
+    for student_id, student_name, exercise_id, score in graded:
+        row = rows.get(student_id.lower())
+        if row is None:
+            # Graded in a session but no longer (or never) on the roster; keep the grade visible
+            row = rows[student_id.lower()] = {'student_id': student_id, 'name': student_name, 'enrolled': False, 'scores': [None] * len(exercises)}
+        i = column[exercise_id]
+        if row['scores'][i] is None or score > row['scores'][i]:
+            row['scores'][i] = score
+    for row in rows.values():
+        row['total'] = sum(s for s in row['scores'] if s is not None)
+    return {
+        'exercises': exercises,
+        'students': sorted(rows.values(), key=lambda r: (not r['enrolled'], r['student_id'].lower())),
+    }
+
+
+def get(course_id):
+    fp = fingerprint(course_id)
+    if fp is None:
+        return None
+    key = f'teachers_dash:gradebook:{course_id}:{fp}'
+    book = cache.get(key)
+    if book is None:
+        book = build(course_id)
+        cache.set(key, book, settings.GRADEBOOK_CACHE_SECONDS)
+    return book
+
+
+def _header(book):
+    return ['student_id', 'name', 'enrolled'] + [ex['title'] for ex in book['exercises']] + ['total']
+
+
+def _cell(value):
+    if isinstance(value, str) and value.startswith(('=', '+', '-', '@', '\t', '\r')):
+        return "'" + value
+    return value
+
+
+def iter_csv(book):
+    # Yields the CSV one line at a time, for StreamingHttpResponse or a file
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def line(values):
+        writer.writerow([_cell(v) for v in values])
+        out = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return out
+
+    yield line(_header(book))
+    for row in book['students']:
+        yield line([row['student_id'], row['name'], 'yes' if row['enrolled'] else 'no'] +
+                   ['' if s is None else s for s in row['scores']] + [row['total']])
+
+
+def to_parquet(book):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ParquetUnavailable('Parquet export requires pyarrow (pip install pyarrow)')
+    rows = book['students']
+    columns = {
+        'student_id': pa.array([r['student_id'] for r in rows], pa.string()),
+        'name': pa.array([r['name'] for r in rows], pa.string()),
+        'enrolled': pa.array([r['enrolled'] for r in rows], pa.bool_()),
+    }
+    for i, ex in enumerate(book['exercises']):
+        # Exercise titles need not be unique, so the id keeps column names distinct
+        columns[f"{ex['id']}: {ex['title']}"] = pa.array([r['scores'][i] for r in rows], pa.int64())
+    columns['total'] = pa.array([r['total'] for r in rows], pa.int64())
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.table(columns), sink)
+    return sink.getvalue().to_pybytes()
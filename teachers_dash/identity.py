@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import Teacher
+
+# Cached user_id/email -> Teacher lookups for the teachers_dash APIs.
+# Entries are dropped when the teacher (or their TeacherCode) is saved or deleted.
+# The email is tried when no teacher has the user_id (or none is given); callers pass
+# it only for the endpoints that historically accepted "user_email".
+
+def _key(field, value):
+    return f'teacher_identity:{field}:{value}'
+
+def _lookup(field, value, lookup):
+    key = _key(field, value)
+    teacher = cache.get(key)
+    if teacher is None:
+        teacher = Teacher.objects.filter(**{lookup: value}).select_related('code').first()
+        if teacher:
+            cache.set(key, teacher, settings.TEACHER_IDENTITY_CACHE_SECONDS)
+    return teacher
+
+def resolve_teacher(user_id='', email=''):
+    teacher = _lookup('user_id', user_id, 'user_id') if user_id else None
+    if not teacher and email:
+        teacher = _lookup('email', email.lower(), 'email__iexact')
+    return teacher
+
+def forget(teacher):
+    keys = [_key('email', (teacher.email or '').lower())]
+    if teacher.user_id:
+        keys.append(_key('user_id', teacher.user_id))
+    cache.delete_many(keys)
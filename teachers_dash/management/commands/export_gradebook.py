@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from teachers_dash import gradebook
+
+
+class Command(BaseCommand):
+    help = 'Export a course gradebook (student x exercise scores) as CSV or Parquet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', '-o', default='', help='File to write (default: stdout for CSV)')
+        parser.add_argument('--no-cache', action='store_true', help='Rebuild instead of using the cached matrix')
+
+    def handle(self, *args, **opts):
+        course_id = opts['course_id']
+        if gradebook.fingerprint(course_id) is None:
+            raise CommandError(f'Course {course_id} not found')
+        book = gradebook.build(course_id) if opts['no_cache'] else gradebook.get(course_id)
+
+        if opts['format'] == 'parquet':
+            if not opts['output']:
+                raise CommandError('--output is required for Parquet')
+            try:
+                body = gradebook.to_parquet(book)
+            except gradebook.ParquetUnavailable as e:
+                raise CommandError(str(e))
+            with open(opts['output'], 'wb') as fh:
+                fh.write(body)
+        elif opts['output']:
+            with open(opts['output'], 'w', newline='', encoding='utf-8') as fh:
+                fh.writelines(gradebook.iter_csv(book))
+        else:
+            for line in gradebook.iter_csv(book):
+                self.stdout.write(line, ending='')
+
+        if opts['output']:
+            self.stderr.write(f"Wrote {len(book['students'])} students x {len(book['exercises'])} exercises to {opts['output']}")
@@ -0,0 +1,43 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from core.http import json_body
+from .identity import resolve_teacher
+
+class TeacherIdentityMiddleware:
+    # Resolves the calling teacher once per request for teachers_dash views and exposes
+    # it as request.teacher (None when the payload names no known teacher). Teachers are
+    # identified by "user_id" (Supabase id). Only the course list/create endpoints accept
+    # "user_email" as well, tried when the user_id matches no teacher (as they did before
+    # the middleware). A JSON body is parsed once and shared with the view (json_body).
+
+    EMAIL_VIEWS = ('api_list_courses', 'api_create_course')
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # In async mode get_response returns the coroutine, which is awaited by the caller
+        request.teacher = None
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method != 'POST' or not view_func.__module__.startswith('teachers_dash.'):
+            return None
+        if request.content_type == 'application/json':
+            try:
+                data = json_body(request)
+            except Exception:
+                return None
+        else:
+            data = request.POST
+        if not hasattr(data, 'get'):
+            return None
+        email = ''
+        if view_func.__name__ in self.EMAIL_VIEWS:
+            email = str(data.get('user_email') or '').strip()
+        request.teacher = resolve_teacher(user_id=str(data.get('user_id') or '').strip(), email=email)
+        return None
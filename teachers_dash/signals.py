@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Teacher, TeacherCode
+from . import identity
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def teacher_changed(sender, instance, **kwargs):
+    identity.forget(instance)
+
+@receiver(post_save, sender=TeacherCode)
+def teacher_code_changed(sender, instance, **kwargs):
+    # Cached teachers carry their code (select_related), so refresh them too
+    for teacher in instance.teachers.all():
+        identity.forget(teacher)
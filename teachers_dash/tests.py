@@ -1,3 +1,133 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from core.testing import FixtureTestCase
+from teachers_assistants_dash.models import TAExerciseSessionSubmission
+from . import gradebook
+
+
+class TeacherIdentityMiddlewareTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+
+    def test_user_id_resolves_teacher(self):
+        resp = self.post_json('teachers_api_exercise_list', {'user_id': 'sb-ada', 'course_id': self.course.id})
+        self.assertTrue(resp.json()['ok'])
+
+    def test_email_is_ignored_outside_course_endpoints(self):
+        self.post_json('teachers_api_exercise_list', {'user_email': 'ada@example.com', 'course_id': self.course.id}, status=400)
+        self.post_json('teachers_api_evidence_list', {'user_id': 'x', 'user_email': 'ada@example.com'}, status=404)
+
+    def test_course_endpoints_fall_back_to_email_without_user_id(self):
+        resp = self.post_json('teachers_api_list_courses', {'user_email': 'ADA@example.com'})
+        self.assertEqual([c['id'] for c in resp.json()['courses']], [self.course.id])
+
+    def test_course_endpoints_fall_back_to_email_for_unknown_user_id(self):
+        resp = self.post_json('teachers_api_list_courses', {'user_id': 'sb-unlinked', 'user_email': 'ada@example.com'})
+        self.assertEqual([c['id'] for c in resp.json()['courses']], [self.course.id])
+        self.post_json('teachers_api_create_course', {'user_id': 'sb-unlinked', 'user_email': 'ada@example.com', 'title': 'X', 'description': 'd'})
+        self.assertEqual(self.teacher.courses.count(), 2)
+
+    def test_body_is_parsed_once(self):
+        with mock.patch('core.http.json.loads', wraps=json.loads) as loads:
+            self.post_json('teachers_api_exercise_list', {'user_id': 'sb-ada', 'course_id': self.course.id})
+        loads.assert_called_once()
+
+
+class ExerciseListQueryCountTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+
+    def _add_exercises(self, count, questions=3):
+        for i in range(count):
+            self.make_exercise(self.course, f'Ex {i}', questions)
+
+    def _fetch(self):
+        resp = self.post_json('teachers_api_exercise_list', {'user_id': 'sb-ada', 'course_id': self.course.id})
+        return resp.json()['exercises']
+
+    def test_query_count_is_constant(self):
+        self._add_exercises(1)
+        self._fetch()  # warm the teacher identity cache
+        # course, exercises with annotated question counts
+        with self.assertNumQueries(2):
+            small = self._fetch()
+
+        self._add_exercises(30, questions=2)
+        with self.assertNumQueries(2):
+            large = self._fetch()
+
+        self.assertEqual(len(small), 1)
+        self.assertEqual(len(large), 31)
+        self.assertEqual(sorted(e['questions_count'] for e in large), [2] * 30 + [3])
+
+
+class GradebookTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+        self.students = [self.make_student(f'S{i}', course=self.course) for i in range(3)]
+
+    def _grade(self, exercise, scores):
+        sess = self.make_session(self.course, exercise)
+        for student, score in scores.items():
+            TAExerciseSessionSubmission.objects.create(
+                session=sess, student_id=student.student_id, student_name=student.name, score=score
+            )
+
+    def test_matrix_query_count_is_constant(self):
+        for i in range(5):
+            ex = self.make_exercise(self.course, f'Ex {i}')
+            self._grade(ex, {s: i for s in self.students})
+        # exercises, roster, graded submissions
+        with self.assertNumQueries(3):
+            book = gradebook.build(self.course.id)
+        self.assertEqual([r['total'] for r in book['students']], [10, 10, 10])
+
+    def test_best_score_wins_and_csv_streams(self):
+        ex = self.make_exercise(self.course, 'Lab 1')
+        s0, s1, _ = self.students
+        self._grade(ex, {s0: 2, s1: 5})
+        self._grade(ex, {s0: 4})
+        resp = self.post_json('teachers_api_course_gradebook', {'user_id': 'sb-ada', 'course_id': self.course.id, 'format': 'csv'})
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            'student_id,name,enrolled,Lab 1,total',
+            'S0,S0,yes,4,4',
+            'S1,S1,yes,5,5',
+            'S2,S2,yes,,0',
+        ])
+
+        # A new grade changes the fingerprint, so the cached matrix is not reused
+        self._grade(ex, {s1: 7})
+        self.assertEqual(gradebook.get(self.course.id)['students'][1]['scores'], [7])
+
+    def test_fingerprint_sees_roster_swaps_and_renames(self):
+        ex = self.make_exercise(self.course, 'Lab 1')
+        names = lambda: [r['name'] for r in gradebook.get(self.course.id)['students']]
+        self.assertEqual(names(), ['S0', 'S1', 'S2'])
+
+        s0, s1, s2 = self.students
+        self.course.students.remove(s2)
+        self.course.students.add(self.make_student('S3'))  # same roster size
+        self.assertEqual(names(), ['S0', 'S1', 'S3'])
+
+        s0.name = 'Zoe'
+        s0.save()
+        self.assertEqual(names(), ['Zoe', 'S1', 'S3'])
+
+        ex.title = 'Lab one'
+        ex.save()
+        self.assertEqual([e['title'] for e in gradebook.get(self.course.id)['exercises']], ['Lab one'])
+
+    def test_csv_cells_cannot_start_formulas(self):
+        self.make_exercise(self.course, '=SUM(A1:A9)')
+        s0 = self.students[0]
+        s0.name = '@cmd'
+        s0.save()
+        resp = self.post_json('teachers_api_course_gradebook', {'user_id': 'sb-ada', 'course_id': self.course.id, 'format': 'csv'})
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "student_id,name,enrolled,'=SUM(A1:A9),total")
+        self.assertEqual(lines[1], "S0,'@cmd,yes,,0")
@@ -27,6 +27,7 @@ from .views import (
     api_exercise_group_time_create,
     api_evidence_list,
     api_evidence_decision,
+    api_course_gradebook,
 )
 
 urlpatterns = [
@@ -54,6 +55,7 @@ urlpatterns = [
     path('api/courses/tas/all/', api_ta_all, name='teachers_api_ta_all'),
     path('api/courses/tas/assign/', api_ta_assign, name='teachers_api_ta_assign'),
     path('api/courses/delete/', api_delete_course, name='teachers_api_delete_course'),
+    path('api/courses/gradebook/', api_course_gradebook, name='teachers_api_course_gradebook'),
 
     path('menu/courses/<int:course_id>/exercises/', course_exercises_page, name='teachers_course_exercises'),
     path('api/courses/exercises/create/', api_exercise_create, name='teachers_api_exercise_create'),
@@ -1,4 +1,6 @@
-from django.http import JsonResponse
+from core.http import JsonResponse, StreamingJsonResponse, json_body
+from core.pagination import KeysetPage, decode_cursor, parse_limit
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 import json
@@ -7,8 +9,11 @@ from .models import Teacher, TeacherCode, Course, Exercise, ExerciseQuestion
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from teachers_assistants_dash.models import TeachingAssistant, CourseAssistant
+from teachers_assistants_dash.identity import resolve_assistant
 from .models import ExerciseGroupTime
+from . import gradebook
 from django.utils import timezone
+from django.db.models import Count
 from teachers_assistants_dash.models import TAExerciseSessionSubmission
 
 @csrf_exempt
@@ -16,7 +21,7 @@ def api_exercise_group_time_list(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         exercise_id = int(data.get('exercise_id') or 0)
@@ -24,7 +29,7 @@ def api_exercise_group_time_list(request):
         if not user_id or not course_id or not exercise_id:
             return JsonResponse({'ok': False, 'error': 'user_id, course_id, exercise_id required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -46,7 +51,7 @@ def api_exercise_group_time_create(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         exercise_id = int(data.get('exercise_id') or 0)
@@ -56,7 +61,7 @@ def api_exercise_group_time_create(request):
         if not user_id or not course_id or not exercise_id or not name or not scheduled_at_str:
             return JsonResponse({'ok': False, 'error': 'user_id, course_id, exercise_id, name, scheduled_at required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -104,7 +109,7 @@ def api_exercise_create(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         title = (data.get('title') or '').strip()
@@ -122,7 +127,7 @@ def api_exercise_create(request):
         if not user_id or not course_id or not title:
             return JsonResponse({'ok': False, 'error': 'user_id, course_id, title required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -193,7 +198,7 @@ def api_exercise_delete(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         exercise_id = int(data.get('exercise_id') or 0)
@@ -201,7 +206,7 @@ def api_exercise_delete(request):
         if not user_id or not course_id or not exercise_id:
             return JsonResponse({'ok': False, 'error': 'user_id, course_id, exercise_id required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -223,13 +228,13 @@ def api_exercise_list(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         if not user_id or not course_id:
             return JsonResponse({'ok': False, 'error': 'user_id and course_id required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -240,7 +245,9 @@ def api_exercise_list(request):
         def dt_str(dt):
             return dt.isoformat() if dt else None
 
-        ex_qs = Exercise.objects.filter(course=course).order_by('-created_at')
+        ex_qs = Exercise.objects.filter(course=course).annotate(
+            questions_count=Count('questions')
+        ).order_by('-created_at')
         exercises = [{
             'id': e.id,
             'title': e.title,
@@ -248,7 +255,7 @@ def api_exercise_list(request):
             'total_points': e.total_points,
             'start_time': dt_str(e.start_time),
             'deadline': dt_str(e.deadline),
-            'questions_count': e.questions.count(),
+            'questions_count': e.questions_count,
         } for e in ex_qs]
         return JsonResponse({'ok': True, 'exercises': exercises})
     except Exception as e:
@@ -259,7 +266,7 @@ def api_exercise_get(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         exercise_id = int(data.get('exercise_id') or 0)
         course_id = int(data.get('course_id') or 0)
         user_id = (data.get('user_id') or '').strip()
@@ -274,15 +281,11 @@ def api_exercise_get(request):
             return JsonResponse({'ok': False, 'error': 'Course not found'}, status=404)
 
         if user_id:
-            teacher = Teacher.objects.filter(user_id=user_id).first()
+            teacher = request.teacher
             if not teacher or course.teacher_id != teacher.id:
                 return JsonResponse({'ok': False, 'error': 'Unauthorized'}, status=403)
         else:
-            ta = None
-            if assistant_id:
-                ta = TeachingAssistant.objects.filter(id=assistant_id).first()
-            if not ta and assistant_code:
-                ta = TeachingAssistant.objects.filter(special_code=assistant_code).first()
+            ta = resolve_assistant(request, assistant_id=assistant_id, assistant_code=assistant_code)
             if not ta:
                 return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
             if not CourseAssistant.objects.filter(course=course, assistant=ta).exists():
@@ -313,7 +316,7 @@ def api_exercise_update(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         exercise_id = int(data.get('exercise_id') or 0)
         course_id = int(data.get('course_id') or 0)
         user_id = (data.get('user_id') or '').strip()
@@ -339,15 +342,11 @@ def api_exercise_update(request):
             return JsonResponse({'ok': False, 'error': 'Course not found'}, status=404)
 
         if user_id:
-            teacher = Teacher.objects.filter(user_id=user_id).first()
+            teacher = request.teacher
             if not teacher or course.teacher_id != teacher.id:
                 return JsonResponse({'ok': False, 'error': 'Unauthorized'}, status=403)
         else:
-            ta = None
-            if assistant_id:
-                ta = TeachingAssistant.objects.filter(id=assistant_id).first()
-            if not ta and assistant_code:
-                ta = TeachingAssistant.objects.filter(special_code=assistant_code).first()
+            ta = resolve_assistant(request, assistant_id=assistant_id, assistant_code=assistant_code)
             if not ta:
                 return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
             if not CourseAssistant.objects.filter(course=course, assistant=ta).exists():
@@ -402,19 +401,53 @@ def api_exercise_update(request):
 def dashboard(request):
     return render(request, 'teachers_dash/teachers_dash.html')
 
+def _evidence_item(s):
+    sess = s.session
+    ex = sess.exercise
+    return {
+        'id': s.id,
+        'student_id': s.student_id,
+        'student_name': s.student_name,
+        'course': {'id': sess.course_id, 'title': sess.course.title},
+        'exercise': {
+            'id': ex.id if ex else None,
+            'title': ex.title if ex else None,
+            'total_points': ex.total_points if ex else None,
+        },
+        'assistant_name': getattr(sess.assistant, 'name', None),
+        'group_index': s.group_index,
+        'score': s.score,
+        'requested_at': s.evidence_requested_at.isoformat() if s.evidence_requested_at else None,
+        'received_at': s.evidence_received_at.isoformat() if s.evidence_received_at else None,
+        'evidence_url': (s.evidence_file.url if s.evidence_file else None),
+        'preview_url': (s.evidence_preview.url if s.evidence_preview else None),
+        'thumbnail_url': (s.evidence_thumbnail.url if s.evidence_thumbnail else None),
+        'decision': s.evidence_decision or '',
+        'reviewed_at': s.evidence_reviewed_at.isoformat() if s.evidence_reviewed_at else None,
+    }
+
 @csrf_exempt
 def api_evidence_list(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
     except Exception:
         data = request.POST
     user_id = (data.get('user_id') or '').strip()
     if not user_id:
         return JsonResponse({'ok': False, 'error': 'user_id required'}, status=400)
 
-    teacher = Teacher.objects.filter(user_id=user_id).first()
+    # Optional keyset pagination: "limit" rows per page, "after" = previous page's "next"
+    try:
+        limit = parse_limit(data.get('limit'))
+    except (TypeError, ValueError):
+        return JsonResponse({'ok': False, 'error': 'limit must be a non-negative integer'}, status=400)
+    after = decode_cursor(data.get('after'))
+    if data.get('after') and not after:
+        return JsonResponse({'ok': False, 'error': 'Invalid after cursor'}, status=400)
+
+    teacher = request.teacher
     if not teacher:
         return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -423,39 +456,16 @@ def api_evidence_list(request):
     ).filter(
         session__course__teacher=teacher,
         evidence_requested_at__isnull=False
-    ).order_by('-evidence_requested_at', '-updated_at')
-
-    items = []
-    for s in subs:
-        sess = s.session
-        ex = sess.exercise
-        items.append({
-            'id': s.id,
-            'student_id': s.student_id,
-            'student_name': s.student_name,
-            'course': {'id': sess.course_id, 'title': sess.course.title},
-            'exercise': {
-                'id': ex.id if ex else None,
-                'title': ex.title if ex else None,
-                'total_points': ex.total_points if ex else None,
-            },
-            'assistant_name': getattr(sess.assistant, 'name', None),
-            'group_index': s.group_index,
-            'score': s.score,
-            'requested_at': s.evidence_requested_at.isoformat() if s.evidence_requested_at else None,
-            'received_at': s.evidence_received_at.isoformat() if s.evidence_received_at else None,
-            'evidence_url': (s.evidence_file.url if s.evidence_file else None),
-            'decision': s.evidence_decision or '',
-            'reviewed_at': s.evidence_reviewed_at.isoformat() if s.evidence_reviewed_at else None,
-        })
-    return JsonResponse({'ok': True, 'items': items})
+    )
+    page = KeysetPage(subs, 'evidence_requested_at', after, limit)
+    return StreamingJsonResponse('items', (_evidence_item(s) for s in page), tail=lambda: {'next': page.next_cursor})
 
 @csrf_exempt
 def api_evidence_decision(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
     except Exception:
         data = request.POST
     user_id = (data.get('user_id') or '').strip()
@@ -470,7 +480,7 @@ def api_evidence_decision(request):
     if not user_id or not submission_id or decision not in ('accept', 'decline'):
         return JsonResponse({'ok': False, 'error': 'user_id, submission_id, decision required'}, status=400)
 
-    teacher = Teacher.objects.filter(user_id=user_id).first()
+    teacher = request.teacher
     if not teacher:
         return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -520,13 +530,13 @@ def api_ta_list(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         if not user_id or not course_id:
             return JsonResponse({'ok': False, 'error': 'user_id and course_id required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -548,7 +558,7 @@ def api_ta_create(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         name = (data.get('name') or '').strip()
@@ -557,7 +567,7 @@ def api_ta_create(request):
         if not user_id or not course_id or not name or not special_code:
             return JsonResponse({'ok': False, 'error': 'user_id, course_id, name, special_code required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -582,11 +592,22 @@ def api_ta_all(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        tas = TeachingAssistant.objects.order_by('-created_at')
-        return JsonResponse({'ok': True, 'assistants': [
+        try:
+            data = json.loads(request.body.decode('utf-8') or '{}')
+        except ValueError:
+            data = {}
+        try:
+            limit = parse_limit(data.get('limit'))
+        except (TypeError, ValueError):
+            return JsonResponse({'ok': False, 'error': 'limit must be a non-negative integer'}, status=400)
+        after = decode_cursor(data.get('after'))
+        if data.get('after') and not after:
+            return JsonResponse({'ok': False, 'error': 'Invalid after cursor'}, status=400)
+        page = KeysetPage(TeachingAssistant.objects.only('id', 'name', 'special_code', 'created_at'), 'created_at', after, limit)
+        return StreamingJsonResponse('assistants', (
             {'id': ta.id, 'name': ta.name, 'special_code': ta.special_code}
-            for ta in tas
-        ]})
+            for ta in page
+        ), tail=lambda: {'next': page.next_cursor})
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
@@ -596,7 +617,7 @@ def api_ta_assign(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
         assistant_id = int(data.get('assistant_id') or 0)
@@ -604,7 +625,7 @@ def api_ta_assign(request):
         if not user_id or not course_id or not assistant_id:
             return JsonResponse({'ok': False, 'error': 'user_id, course_id, assistant_id required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -612,7 +633,7 @@ def api_ta_assign(request):
         if not course or course.teacher_id != teacher.id:
             return JsonResponse({'ok': False, 'error': 'Course not found or not owned by teacher'}, status=404)
 
-        ta = TeachingAssistant.objects.filter(id=assistant_id).first()
+        ta = resolve_assistant(request, assistant_id=assistant_id)
         if not ta:
             return JsonResponse({'ok': False, 'error': 'Assistant not found'}, status=404)
 
@@ -626,7 +647,7 @@ def validate_teacher_code(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         special_code = (data.get('special_code') or '').strip()
         if not special_code:
             return JsonResponse({'ok': False, 'error': 'special_code required'}, status=400)
@@ -642,7 +663,7 @@ def register_teacher(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         special_code = data.get('special_code')
         if not special_code:
             return JsonResponse({'ok': False, 'error': 'special_code required'}, status=400)
@@ -750,7 +771,7 @@ def resend_confirmation_email(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         email = (data.get('email') or '').strip()
         if not email:
             return JsonResponse({'ok': False, 'error': 'email required'}, status=400)
@@ -777,7 +798,7 @@ def confirm_teacher_signup(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         supabase_user_id = data.get('supabase_user_id')
         if not supabase_user_id:
             return JsonResponse({'ok': False, 'error': 'supabase_user_id required'}, status=400)
@@ -817,9 +838,7 @@ def api_dashboard_counts(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
-        user_id = (data.get('user_id') or '').strip()
-        teacher = Teacher.objects.filter(user_id=user_id).select_related('code').first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({
                 'ok': True,
@@ -863,18 +882,14 @@ def api_list_courses(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         user_email = (data.get('user_email') or '').strip().lower()
 
         if not user_id and not user_email:
             return JsonResponse({'ok': False, 'error': 'user_id or user_email required'}, status=400)
 
-        teacher = None
-        if user_id:
-            teacher = Teacher.objects.filter(user_id=user_id).first()
-        if not teacher and user_email:
-            teacher = Teacher.objects.filter(email__iexact=user_email).first()
+        teacher = request.teacher
 
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
@@ -899,20 +914,14 @@ def api_create_course(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
-        user_id = (data.get('user_id') or '').strip()
-        user_email = (data.get('user_email') or '').strip().lower()
+        data = json_body(request)
         title = (data.get('title') or '').strip()
         description = (data.get('description') or '').strip()
 
         if not title or not description:
             return JsonResponse({'ok': False, 'error': 'title and description required'}, status=400)
 
-        teacher = None
-        if user_id:
-            teacher = Teacher.objects.filter(user_id=user_id).first()
-        if not teacher and user_email:
-            teacher = Teacher.objects.filter(email__iexact=user_email).first()
+        teacher = request.teacher
 
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
@@ -927,14 +936,14 @@ def api_delete_course(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         course_id = int(data.get('course_id') or 0)
 
         if not user_id or not course_id:
             return JsonResponse({'ok': False, 'error': 'user_id and course_id required'}, status=400)
 
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
 
@@ -952,11 +961,11 @@ def api_teacher_info(request):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        data = json_body(request)
         user_id = (data.get('user_id') or '').strip()
         if not user_id:
             return JsonResponse({'ok': False, 'error': 'user_id required'}, status=400)
-        teacher = Teacher.objects.filter(user_id=user_id).first()
+        teacher = request.teacher
         if not teacher:
             return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
         full_name = f"{teacher.title} {teacher.first_name} {teacher.last_name}".strip()
@@ -969,4 +978,44 @@ def api_teacher_info(request):
             'email': teacher.email,
         })
     except Exception as e:
-        return JsonResponse({'ok': False, 'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'ok': False, 'error': str(e)}, status=500)
+
+@csrf_exempt
+def api_course_gradebook(request):
+    # Student x exercise score matrix for one course: format "json" (default), "csv"
+    # (streamed) or "parquet" (needs pyarrow)
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+    try:
+        data = json_body(request)
+        user_id = (data.get('user_id') or '').strip()
+        course_id = int(data.get('course_id') or 0)
+        fmt = (data.get('format') or 'json').strip().lower()
+        if not user_id or not course_id:
+            return JsonResponse({'ok': False, 'error': 'user_id and course_id required'}, status=400)
+        if fmt not in ('json', 'csv', 'parquet'):
+            return JsonResponse({'ok': False, 'error': 'format must be json, csv or parquet'}, status=400)
+
+        teacher = request.teacher
+        if not teacher:
+            return JsonResponse({'ok': False, 'error': 'Teacher not found'}, status=404)
+        if not Course.objects.filter(id=course_id, teacher=teacher).exists():
+            return JsonResponse({'ok': False, 'error': 'Course not found or not owned by teacher'}, status=404)
+
+        book = gradebook.get(course_id)
+        filename = f'gradebook-course-{course_id}'
+        if fmt == 'csv':
+            resp = StreamingHttpResponse(gradebook.iter_csv(book), content_type='text/csv; charset=utf-8')
+            resp['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return resp
+        if fmt == 'parquet':
+            try:
+                body = gradebook.to_parquet(book)
+            except gradebook.ParquetUnavailable as e:
+                return JsonResponse({'ok': False, 'error': str(e)}, status=501)
+            resp = HttpResponse(body, content_type='application/vnd.apache.parquet')
+            resp['Content-Disposition'] = f'attachment; filename="{filename}.parquet"'
+            return resp
+        return JsonResponse({'ok': True, 'gradebook': book})
+    except Exception as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=500)